@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Book Assembly Benchmark
+Peak memory (tracemalloc) of writing a 2,000-page book as one string versus streaming it section by section
+"""
+
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add project directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import yaml
+
+from utils.citation_manager import CitationManager
+from utils.pdf_builder import PDFBuilder
+from utils.template_engine import load_template
+
+PAGES = 2000
+PAGE_CHARS = 3000  # about 450 words on a 6x9in page
+CHAPTERS = 40
+TEMPLATE = "---\ntitle: \"{{BOOK_TITLE}}\"\n---\n\n{{PREFACE}}\n\n{{MAIN_CONTENT}}\n\n{{BIBLIOGRAPHY}}\n"
+
+
+def make_book(manager: CitationManager) -> list:
+    key = manager.add_citation({'title': 'Storage Outlook', 'url': 'https://example.org/storage', 'authors': ['Jane Smith'], 'year': 2023})
+    paragraph = f"Grid batteries shift solar output into the evening peak [@{key}]. " * 8 + "\n\n"
+    chapter_text = paragraph * (PAGES * PAGE_CHARS // CHAPTERS // len(paragraph))
+    content = [{'section': {'title': 'Preface', 'type': 'preface'}, 'content': paragraph}]
+    for n in range(1, CHAPTERS + 1):
+        quiz = "## Chapter Quiz\n\n1. What shifts solar output?\n2. Why the evening peak?\n\n"
+        content.append({'section': {'title': f'Chapter {n}: Storage', 'type': 'chapter'}, 'content': chapter_text + quiz})
+    return content
+
+
+def legacy_assembly(builder: PDFBuilder, content: list, manager: CitationManager, md_path: Path):
+    """The old path: every section formatted, joined, resolved and rendered before one write"""
+    
+    template = load_template(builder.template_path)
+    main_parts = [builder._format_section(item) for item in content if item['section']['type'] == 'chapter']
+    replacements = {
+        'BOOK_TITLE': "Storage",
+        'PREFACE': builder._format_section(content[0]),
+        'MAIN_CONTENT': builder._resolve_citations("\n\n".join(main_parts), manager),
+        'BIBLIOGRAPHY': ""
+    }
+    final_markdown = template.render(replacements)
+    with open(md_path, 'w', encoding='utf-8') as f:
+        f.write(final_markdown)
+
+
+def streamed_assembly(builder: PDFBuilder, content: list, manager: CitationManager, md_path: Path):
+    """The build() path: template segments and sections go straight to a buffered file"""
+    
+    with open(md_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        builder._write_with_template(f, "Storage", "technical", content, manager)
+
+
+def measure(assemble, *args) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    assemble(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def run_benchmark():
+    config = yaml.safe_load((Path(__file__).parent.parent / "config.yaml").read_text(encoding='utf-8'))
+    manager = CitationManager("APA")
+    content = make_book(manager)
+    book_size = sum(len(item['content']) for item in content)
+    largest = max(len(item['content']) for item in content)
+    
+    print("=" * 60)
+    print(f"🧵 Assembly benchmark: {PAGES} pages, {book_size / 1e6:.1f} MB of markdown")
+    print(f"   Largest section: {largest / 1e6:.2f} MB")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        builder = PDFBuilder(config)
+        builder.template_path = tmp / "template.md"
+        builder.template_path.write_text(TEMPLATE, encoding='utf-8')
+        
+        legacy_peak, legacy_time = measure(legacy_assembly, builder, content, manager, tmp / "legacy.md")
+        streamed_peak, streamed_time = measure(streamed_assembly, builder, content, manager, tmp / "streamed.md")
+        assert (tmp / "legacy.md").read_bytes() == (tmp / "streamed.md").read_bytes()
+    
+    print(f"\n📦 Whole-string assembly: peak {legacy_peak / 1e6:.1f} MB in {legacy_time:.2f}s")
+    print(f"🌊 Streamed assembly:     peak {streamed_peak / 1e6:.1f} MB in {streamed_time:.2f}s")
+    print(f"📈 Peak memory: {legacy_peak / streamed_peak:.1f}x lower, {streamed_peak / largest:.1f}x the largest section")
+
+
+if __name__ == "__main__":
+    run_benchmark()
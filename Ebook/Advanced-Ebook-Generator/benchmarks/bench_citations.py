@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Citation Manager Benchmark
+Adds 10k citations (with duplicates) and times dedupe, keys and bibliography renders
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add project directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.citation_manager import CitationManager
+
+N_CITATIONS = 10_000
+SURNAMES = ["Smith", "Garcia", "Chen", "Okafor", "Müller", "Nguyen", "Kowalski", "Haddad"]
+
+
+def make_citation(i: int) -> dict:
+    return {
+        'title': f"Study number {i} on renewable energy systems",
+        'url': f"https://www.example.org/papers/{i}/?utm_source=newsletter",
+        'authors': [f"Author {SURNAMES[i % len(SURNAMES)]}"],
+        'year': 2000 + i % 25,
+        'source': 'Journal of Benchmarks'
+    }
+
+
+def run_benchmark():
+    print("=" * 60)
+    print(f"📚 CitationManager benchmark: {N_CITATIONS:,} citations")
+    print("=" * 60)
+    
+    manager = CitationManager("APA")
+    
+    start = time.perf_counter()
+    for i in range(N_CITATIONS):
+        manager.add_citation(make_citation(i))
+    add_time = time.perf_counter() - start
+    print(f"\n➕ Added {N_CITATIONS:,} unique citations in {add_time * 1000:.1f} ms")
+    
+    # Every source seen again, as when each section cites the same URLs
+    start = time.perf_counter()
+    for i in range(N_CITATIONS):
+        citation = make_citation(i)
+        citation['url'] = citation['url'].replace("https://www.", "http://").split("?")[0] + "/"
+        manager.add_citation(citation)
+    dedupe_time = time.perf_counter() - start
+    assert len(manager) == N_CITATIONS
+    print(f"🔁 Re-added {N_CITATIONS:,} duplicates in {dedupe_time * 1000:.1f} ms (kept {len(manager):,})")
+    
+    keys = {c['key'] for c in manager.citations}
+    assert len(keys) == N_CITATIONS
+    print(f"🔑 {len(keys):,} distinct citation keys, e.g. [@{manager.citations[0]['key']}]")
+    
+    start = time.perf_counter()
+    manager.generate_bibliography()
+    first_render = time.perf_counter() - start
+    print(f"\n📄 First bibliography render: {first_render * 1000:.1f} ms")
+    
+    for i in range(N_CITATIONS, N_CITATIONS + 10):
+        manager.add_citation(make_citation(i))
+    start = time.perf_counter()
+    manager.generate_bibliography()
+    incremental_render = time.perf_counter() - start
+    print(f"📄 Render after 10 new citations: {incremental_render * 1000:.1f} ms")
+    
+    # The pre-index implementation: re-format and re-sort every entry each time
+    start = time.perf_counter()
+    naive = "".join(
+        f"- {manager.format_citation(c)}\n\n"
+        for c in sorted(manager.citations, key=lambda x: x.get('authors', [''])[0])
+    )
+    naive_render = time.perf_counter() - start
+    assert naive in manager.generate_bibliography()
+    print(f"📄 Full re-format (old behaviour): {naive_render * 1000:.1f} ms")
+    
+    # Inline citation resolution over a ~100k-word book
+    keys = [c['key'] for c in manager.citations[:200]]
+    paragraph = "Renewable energy adoption keeps accelerating across many markets worldwide. " * 4
+    book = "\n\n".join(
+        f"{paragraph}As shown in recent work [@{keys[i % len(keys)]}; @{keys[(i + 1) % len(keys)]}]."
+        for i in range(3_000)
+    )
+    words = len(book.split())
+    for mode in ("footnote", "author-date"):
+        start = time.perf_counter()
+        resolved = manager.resolve_citations(book, mode=mode)
+        elapsed = time.perf_counter() - start
+        assert "[@" not in resolved
+        print(f"🔗 Resolved citations in {words:,} words ({mode}): {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Format Export Benchmark
+Times one pandoc run per format from markdown against one parse plus parallel renders from the AST
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pypandoc
+
+from utils.format_export import FORMAT_WRITERS, FormatExporter
+
+FILTER_PATH = Path(__file__).parent.parent / "filters" / "boxify.lua"
+FORMATS = ["html", "epub", "docx", "latex"]
+CHAPTERS = 40
+
+
+def make_book() -> str:
+    chapters = []
+    for n in range(1, CHAPTERS + 1):
+        paragraphs = "\n\n".join(
+            f"Paragraph {p} of chapter {n} covers *indexes*, **pages** and `WAL` records in some detail. " * 6
+            for p in range(1, 25)
+        )
+        chapters.append(
+            f"# Chapter {n}\n\n## Section {n}.1\n\n{paragraphs}\n\n"
+            f"::: quiz\nWhat changed in chapter {n}?\n:::\n\n"
+            f"| Key | Value |\n|-----|-------|\n| a | {n} |\n"
+        )
+    return "---\ntitle: \"Benchmark Book\"\n---\n\n" + "\n\n".join(chapters)
+
+
+def run_benchmark():
+    try:
+        version = pypandoc.get_pandoc_version()
+    except OSError:
+        print("⚠️  pandoc not found; install it to run this benchmark")
+        return
+    
+    print("=" * 60)
+    print(f"📚 Format export benchmark: {CHAPTERS} chapters, pandoc {version}")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        md_path = tmp / "book.md"
+        md_path.write_text(make_book(), encoding='utf-8')
+        exporter = FormatExporter(tmp / "ast", FILTER_PATH)
+        
+        start = time.perf_counter()
+        exporter.export(md_path, FORMATS[:1], str(tmp / "single"))
+        single = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        for fmt in FORMATS:
+            writer, extension = FORMAT_WRITERS[fmt]
+            pypandoc.convert_file(str(md_path), writer, outputfile=str(tmp / f"sequential{extension}"), extra_args=exporter.writer_args(fmt, []))
+        sequential = time.perf_counter() - start
+        
+        # Fresh cache so the parse is timed too
+        exporter = FormatExporter(tmp / "ast_fresh", FILTER_PATH)
+        start = time.perf_counter()
+        exporter.export(md_path, FORMATS, str(tmp / "parallel"))
+        parallel = time.perf_counter() - start
+        
+        print(f"\n⏱️  One format (parse + HTML):        {single:.2f}s")
+        print(f"⏱️  {len(FORMATS)} formats, one pandoc run each: {sequential:.2f}s")
+        print(f"⏱️  {len(FORMATS)} formats, parse once + parallel: {parallel:.2f}s")
+        print(f"📈 Speedup: {sequential / parallel:.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
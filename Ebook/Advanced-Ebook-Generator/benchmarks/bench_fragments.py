@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+LaTeX Fragment Benchmark
+Times markdown-to-LaTeX for the whole book versus cached per-section fragments
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pypandoc
+
+# Add project directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.latex_fragments import FragmentCache
+from utils.pdf_builder import PDFBuilder
+
+N_CHAPTERS = 20
+PARAGRAPHS_PER_CHAPTER = 60
+
+CONFIG = {
+    'pdf_settings': {
+        'default_engine': 'xelatex',
+        'fallback_engine': 'pdflatex',
+        'page_size': '6in x 9in',
+        'margin': '1in',
+        'font': {'main': 'Georgia', 'sans': 'Arial', 'mono': 'Courier New'},
+        'toc_depth': 3
+    }
+}
+
+
+def make_content(edited_chapter: int = None) -> list:
+    paragraph = "Renewable energy adoption keeps accelerating across many markets worldwide. " * 6
+    content = []
+    for n in range(1, N_CHAPTERS + 1):
+        body = "\n\n".join(
+            f"## Part {i}\n\n{paragraph}" if i % 10 == 0 else paragraph
+            for i in range(PARAGRAPHS_PER_CHAPTER)
+        )
+        body += "\n\n**Did You Know?**\nSolar output doubled in a decade.\n\n## 📝 Chapter Quiz\n1. What doubled?\n"
+        if n == edited_chapter:
+            body += "\n\nOne more sentence added during review."
+        content.append({'section': {'title': f"Chapter {n}", 'type': 'chapter'}, 'content': body})
+    return content
+
+
+def run_benchmark():
+    try:
+        pandoc_version = pypandoc.get_pandoc_version()
+    except OSError:
+        print("⚠️  pandoc not found; install it to run this benchmark")
+        return
+    
+    print("=" * 60)
+    print(f"🧩 Fragment benchmark: {N_CHAPTERS} chapters, pandoc {pandoc_version}")
+    print("=" * 60)
+    
+    builder = PDFBuilder(CONFIG)
+    topic, genre = "Renewable Energy", "science"
+    
+    # Monolithic: the whole compiled book through one pandoc run
+    markdown = builder._compile_markdown(topic, genre, make_content(), None)
+    start = time.perf_counter()
+    pypandoc.convert_text(
+        markdown, 'latex', format='markdown',
+        extra_args=['--standalone', f'--lua-filter={builder.filter_path}', '--highlight-style=tango']
+    )
+    monolithic = time.perf_counter() - start
+    print(f"\n📄 Monolithic conversion: {monolithic * 1000:.0f} ms")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        def build(content) -> tuple:
+            cache = FragmentCache(Path(tmp) / "fragments", builder.filter_path, fragment_args=['--highlight-style=tango'])
+            start = time.perf_counter()
+            yaml_header, segments = builder._compile_segments(topic, genre, content, None)
+            paths = cache.fragments(segments)
+            cache.stitch(yaml_header, paths, Path(tmp) / "book.tex")
+            return time.perf_counter() - start, cache.stats
+        
+        cold, stats = build(make_content())
+        print(f"🧊 Cold fragment build: {cold * 1000:.0f} ms ({stats['misses']} conversions)")
+        
+        warm, stats = build(make_content())
+        print(f"♻️  Unchanged rebuild: {warm * 1000:.0f} ms ({stats['misses']} conversions)")
+        
+        edited, stats = build(make_content(edited_chapter=7))
+        assert stats['misses'] == 1
+        print(f"✏️  Rebuild after editing one chapter: {edited * 1000:.0f} ms ({stats['misses']} conversion)")
+        print(f"\n⚡ Speedup over monolithic: {monolithic / edited:.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
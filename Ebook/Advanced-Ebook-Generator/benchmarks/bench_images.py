@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Image Optimization Benchmark
+Times the image stage cold and cached, and compares PDF size and build time with and without it
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pypandoc
+from PIL import Image
+
+from utils.image_optimizer import ImageOptimizer, max_image_pixels
+
+# Model output saved by image_generation_system.py
+IMAGE_DIR = Path(__file__).parent.parent.parent / "ebook_images"
+PDF_SETTINGS = {'page_size': "6in x 9in", 'margin': "1in", 'image_dpi': 300}
+UPSCALE = 3  # newer image models return far larger frames than these samples
+
+
+def make_images(directory: Path) -> list:
+    """The sample images, upscaled to the size current models return"""
+    
+    paths = []
+    for source in sorted(IMAGE_DIR.glob("*.png")):
+        with Image.open(source) as image:
+            image = image.convert('RGB').resize((image.width * UPSCALE, image.height * UPSCALE), Image.BICUBIC)
+            image.save(directory / source.name)
+        paths.append(directory / source.name)
+    return paths
+
+
+def build_pdf(markdown: str, pdf_path: Path, engine: str) -> float:
+    """Seconds pandoc + the engine take for one PDF"""
+    
+    start = time.perf_counter()
+    pypandoc.convert_text(
+        markdown, 'pdf', format='markdown', outputfile=str(pdf_path),
+        extra_args=[f'--pdf-engine={engine}', '-V', 'geometry:paperwidth=6in,paperheight=9in,margin=1in']
+    )
+    return time.perf_counter() - start
+
+
+def run_benchmark():
+    images = sorted(IMAGE_DIR.glob("*.png"))
+    if not images:
+        print(f"⚠️  No sample images in {IMAGE_DIR}")
+        return
+    
+    print("=" * 60)
+    print(f"🖼️  Image benchmark: {len(images)} images x{UPSCALE}, 6x9in page at 300 DPI")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "images").mkdir()
+        sources = make_images(tmp / "images")
+        markdown = "\n\n".join(f"# Figure {n}\n\n![Figure {n}](images/{path.name})" for n, path in enumerate(sources, 1))
+        
+        optimizer = ImageOptimizer(tmp / "cache", max_image_pixels(PDF_SETTINGS))
+        optimized_markdown = optimizer.optimize_markdown([markdown], [tmp])[0]
+        print(f"\n⏱️  Cold: {optimizer.report()}")
+        
+        cached = ImageOptimizer(tmp / "cache", max_image_pixels(PDF_SETTINGS))
+        cached.optimize_markdown([markdown], [tmp])
+        print(f"⏱️  Cached: {cached.report()}")
+        
+        engine = next((name for name in ('xelatex', 'pdflatex') if shutil.which(name)), None)
+        try:
+            pypandoc.get_pandoc_version()
+        except OSError:
+            engine = None
+        if engine is None:
+            print("\n⚠️  pandoc or a LaTeX engine not found; skipping the PDF comparison")
+            return
+        
+        # pandoc resolves relative image paths from the working directory
+        original_pdf, optimized_pdf = tmp / "original.pdf", tmp / "optimized.pdf"
+        cwd = Path.cwd()
+        try:
+            os.chdir(tmp)
+            original_time = build_pdf(markdown, original_pdf, engine)
+            optimized_time = build_pdf(optimized_markdown, optimized_pdf, engine)
+        finally:
+            os.chdir(cwd)
+        
+        print(f"\n📄 Original images:  {original_pdf.stat().st_size / 1e6:.1f} MB PDF in {original_time:.2f}s ({engine})")
+        print(f"📄 Optimized images: {optimized_pdf.stat().st_size / 1e6:.1f} MB PDF in {optimized_time:.2f}s ({engine})")
+        original_size, optimized_size = original_pdf.stat().st_size, optimized_pdf.stat().st_size
+        print(f"📉 PDF {(original_size - optimized_size) / 1e6:.1f} MB smaller ({(1 - optimized_size / original_size) * 100:.0f}%), "
+              f"built {original_time - optimized_time:.2f}s faster")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Preamble Format Benchmark
+Times engine startup on a pandoc preamble with and without the precompiled format
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.latex_format import PreambleFormat, SUPPORTED_ENGINES
+from utils.parallel_build import run_latex
+
+RUNS = 5
+
+# Book fonts swapped for ones every TeX Live ships, so xelatex finds them anywhere
+FONTS = {"Georgia": "TeX Gyre Pagella", "Arial": "TeX Gyre Heros", "Courier New": "TeX Gyre Cursor"}
+BODY = "\\chapter{Startup}\n\nOne short paragraph, so the time is almost all preamble.\n\n\\end{document}\n"
+
+
+def load_head() -> str:
+    head = (Path(__file__).parent.parent / "test_data" / "pandoc_head.tex").read_text(encoding='utf-8')
+    for font, substitute in FONTS.items():
+        head = head.replace(font, substitute)
+    return head
+
+
+def time_runs(tex_path: Path, engine: str, fmt: Path = None) -> float:
+    start = time.perf_counter()
+    run_latex(tex_path, engine, RUNS, fmt)
+    return (time.perf_counter() - start) / RUNS
+
+
+def run_benchmark():
+    engines = [engine for engine in SUPPORTED_ENGINES if shutil.which(engine)]
+    if not engines:
+        print("⚠️  Neither xelatex nor pdflatex found; install TeX Live to run this benchmark")
+        return
+    
+    print("=" * 60)
+    print(f"🧱 Preamble format benchmark: {RUNS} runs per engine")
+    print("=" * 60)
+    
+    head = load_head()
+    for engine in engines:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            plain_path = tmp / "plain.tex"
+            plain_path.write_text(head + BODY, encoding='utf-8')
+            plain = time_runs(plain_path, engine)
+            
+            formats = PreambleFormat(tmp / "formats")
+            start = time.perf_counter()
+            engine_head, fmt = formats.prepare(head, engine)
+            build = time.perf_counter() - start
+            if fmt is None:
+                print(f"\n⚠️  {engine}: no format (is mylatexformat installed?)")
+                continue
+            
+            dumped_path = tmp / "dumped.tex"
+            dumped_path.write_text(engine_head + BODY, encoding='utf-8')
+            dumped = time_runs(dumped_path, engine, fmt)
+            
+            print(f"\n🔧 {engine}")
+            print(f"   Format build (once): {build:.2f}s")
+            print(f"   Per run without format: {plain:.2f}s")
+            print(f"   Per run with format:    {dumped:.2f}s")
+            print(f"   📈 Saved per run: {plain - dumped:.2f}s ({(1 - dumped / plain) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    run_benchmark()
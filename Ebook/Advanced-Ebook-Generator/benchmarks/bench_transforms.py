@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Markdown Transform Benchmark
+Times the old regex/line pre-passes plus pandoc against pandoc with the single boxify.lua AST pass
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add project directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pypandoc
+
+FILTER_PATH = Path(__file__).parent.parent / "filters" / "boxify.lua"
+CHAPTERS = 60
+
+BOX_PATTERNS = [
+    (r'##\s*📝\s*Chapter Quiz\s*\n(.*?)(?=\n##|\n---|\Z)', r'::: quiz\n\n\1\n:::\n'),
+    (r'\n\*\*Did You Know\?\*\*\s*\n((?:(?!\n\*\*).)*?)(?=\n\n|\Z)', r'\n::: didyouknow\n\n\1\n:::\n\n'),
+    (r'\*\*Key Takeaways?:\*\*\s*\n((?:(?!\n\*\*).)*?)(?=\n\n|\Z)', r'::: keytakeaway\n\n\1\n:::\n\n'),
+    (r'\*\*Case Study:\s*(.*?)\*\*\s*\n\n((?:(?!\n\*\*Case Study).)*?)(?=\n\n\*\*|\n##|\Z)', r'::: casestudy\n\n**\1**\n\n\2\n:::\n\n'),
+]
+
+
+def format_special_boxes(content: str) -> str:
+    """The box pre-pass pdf_builder.py used to run"""
+    for pattern, replacement in BOX_PATTERNS:
+        content = re.sub(pattern, replacement, content, flags=re.DOTALL)
+    return content
+
+
+def escape_latex_in_tables(content: str) -> str:
+    """The table pre-pass recompile_existing.py used to run"""
+    result = []
+    in_table = False
+    for line in content.split('\n'):
+        if '|' in line and not line.strip().startswith('```'):
+            in_table = True
+            line = '|'.join(part.replace('&', '\\&').replace('%', '\\%').replace('#', '\\#') for part in line.split('|'))
+        elif in_table and line.strip() == '':
+            in_table = False
+        result.append(line)
+    return '\n'.join(result)
+
+
+def add_chapter_page_breaks(content: str) -> str:
+    """The page-break pre-pass recompile_existing.py used to run"""
+    return re.sub(r'(^|\n)(#{1,2}\s+Chapter\s+\d+:)', r'\1\\newpage\n\n\2', content, flags=re.MULTILINE)
+
+
+def make_book() -> str:
+    chapter = (Path(__file__).parent.parent / "test_data" / "box_chapter.txt").read_text(encoding='utf-8')
+    table = "| Metric | Value |\n|--------|-------|\n| Cost & margin | 40% |\n\n"
+    return "\n\n".join(f"# Chapter {n}: Storage\n\n" + (chapter + table) * 8 for n in range(1, CHAPTERS + 1))
+
+
+def timed(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def legacy(book: str):
+    prepared = add_chapter_page_breaks(escape_latex_in_tables(format_special_boxes(book)))
+    pypandoc.convert_text(prepared, 'latex', format='markdown', extra_args=[f'--lua-filter={FILTER_PATH}'])
+
+
+def single_pass(book: str):
+    pypandoc.convert_text(book, 'latex', format='markdown', extra_args=[f'--lua-filter={FILTER_PATH}'])
+
+
+def run_benchmark():
+    try:
+        version = pypandoc.get_pandoc_version()
+    except OSError:
+        print("⚠️  pandoc not found; install it to run this benchmark")
+        return
+    
+    book = make_book()
+    print("=" * 60)
+    print(f"🌳 Transform benchmark: {CHAPTERS} chapters, {len(book) / 1e6:.1f} MB, pandoc {version}")
+    print("=" * 60)
+    
+    passes = timed(lambda: add_chapter_page_breaks(escape_latex_in_tables(format_special_boxes(book))))
+    old = timed(legacy, book)
+    new = timed(single_pass, book)
+    
+    print(f"\n🐢 Pre-passes alone:            {passes:.2f}s")
+    print(f"🐢 Pre-passes + pandoc:         {old:.2f}s")
+    print(f"🌳 pandoc with boxify.lua only: {new:.2f}s")
+    print(f"📈 Saved: {old - new:.2f}s ({(1 - new / old) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Vector Index Benchmark
+Indexes 20k research chunks, reopens the index memory-mapped and times retrieval
+"""
+
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.vector_index import VectorIndex
+
+N_CHUNKS = 20_000
+WORDS = (
+    "solar wind battery grid turbine silicon inverter storage hydrogen carbon "
+    "policy market efficiency panel reactor nuclear tidal geothermal demand "
+    "transmission emissions subsidy lithium cobalt recycling forecast"
+).split()
+
+
+def make_chunk(rng: random.Random, i: int) -> dict:
+    return {
+        'title': f"Source {i}",
+        'link': f"https://example.org/{i}",
+        'source': 'Benchmark',
+        'text': " ".join(rng.choice(WORDS) for _ in range(40))
+    }
+
+
+def run_benchmark():
+    print("=" * 60)
+    print(f"🧭 VectorIndex benchmark: {N_CHUNKS:,} chunks")
+    print("=" * 60)
+    
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = VectorIndex(tmp)
+        start = time.perf_counter()
+        index.add([make_chunk(rng, i) for i in range(N_CHUNKS)])
+        index.save()
+        print(f"\n📥 Embedded and saved {len(index):,} chunks in {time.perf_counter() - start:.1f} s")
+        
+        start = time.perf_counter()
+        index = VectorIndex(tmp)
+        print(f"📂 Reopened memory-mapped in {(time.perf_counter() - start) * 1000:.1f} ms")
+        
+        start = time.perf_counter()
+        hits = index.search(["solar panel efficiency"], k=5)
+        single = time.perf_counter() - start
+        assert len(hits[0]) == 5
+        print(f"\n🔎 One query, top 5: {single * 1000:.1f} ms")
+        
+        sections = [
+            {'title': f"Chapter {n}", 'subsections': [" ".join(rng.sample(WORDS, 3)) for _ in range(4)]}
+            for n in range(8)
+        ]
+        start = time.perf_counter()
+        retrieved = index.retrieve_for_sections(sections, k=3)
+        batched = time.perf_counter() - start
+        assert len(retrieved) == len(sections)
+        print(f"🔎 {sum(len(s['subsections']) for s in sections)} subsections in one batch: {batched * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    run_benchmark()
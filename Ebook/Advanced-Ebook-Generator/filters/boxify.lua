@@ -1,43 +1,209 @@
 --[[
 Pandoc Lua filter to convert fenced divs to styled boxes
 Converts semantic divs to LaTeX environments for PDF, keeps as divs for HTML
+
+This is the whole transform stage, run in one pass over the parsed
+document: each block list is scanned once to convert fenced divs, detect
+quiz / Did You Know / Key Takeaway / Case Study blocks, put a page break
+before "Chapter N:" headings and keep table cells literal, so the markdown
+needs no regex preprocessing.
 ]]
 
-function Div(el)
-  local class = el.classes[1]
-  
-  -- Only process if the div has a recognized class
-  if not class then
-    return el
+local stringify = pandoc.utils.stringify
+
+-- Map div classes to LaTeX environments
+local env_map = {
+  didyouknow = "didyouknowbox",
+  quiz = "quizbox",
+  summary = "summarybox",
+  casestudy = "casestudybox",
+  keytakeaway = "summarybox"
+}
+
+local QUIZ_TITLES = { ["📝 Chapter Quiz"] = true, ["Chapter Quiz"] = true }
+local DID_YOU_KNOW = { ["Did You Know?"] = true }
+local KEY_TAKEAWAYS = { ["Key Takeaway:"] = true, ["Key Takeaways:"] = true }
+local CASE_STUDY = "Case Study:"
+
+-- A box in its final form: LaTeX environment for PDF, div with class for
+-- HTML/EPUB (styled with CSS)
+local function box(class, content, out)
+  if FORMAT:match 'latex' then
+    out:insert(pandoc.RawBlock('latex', '\\begin{' .. env_map[class] .. '}'))
+    out:extend(content)
+    out:insert(pandoc.RawBlock('latex', '\\end{' .. env_map[class] .. '}'))
+  else
+    out:insert(pandoc.Div(content, pandoc.Attr('', {class})))
   end
+end
+
+local function is_break(inline)
+  return inline.t == 'Space' or inline.t == 'SoftBreak' or inline.t == 'LineBreak'
+end
+
+-- For a paragraph with a bold label from `labels` at its start or at the
+-- end of one of its lines: the label, the inlines before it and the inlines
+-- after it (breaks around the label dropped); nil otherwise
+local function labelled(block, labels)
+  if block.t ~= 'Para' and block.t ~= 'Plain' then
+    return nil
+  end
+  local content = block.content
+  for k, el in ipairs(content) do
+    local at_line_end = content[k + 1] == nil or content[k + 1].t == 'SoftBreak' or content[k + 1].t == 'LineBreak'
+    if el.t == 'Strong' and (k == 1 or at_line_end) and labels(stringify(el)) then
+      local before, rest = pandoc.Inlines({}), pandoc.Inlines({})
+      for i = 1, k - 1 do
+        before:insert(content[i])
+      end
+      while #before > 0 and is_break(before[#before]) do
+        before:remove(#before)
+      end
+      for i = k + 1, #content do
+        if #rest > 0 or not is_break(content[i]) then
+          rest:insert(content[i])
+        end
+      end
+      return stringify(el), before, rest
+    end
+  end
+  return nil
+end
+
+-- Box text that follows its label on the next lines; "- item" lines (a
+-- list with no blank line before it, so pandoc kept it in the paragraph)
+-- become a list again
+local function box_body(inlines)
+  local lines, line = {}, pandoc.Inlines({})
+  for _, el in ipairs(inlines) do
+    if el.t == 'SoftBreak' or el.t == 'LineBreak' then
+      table.insert(lines, line)
+      line = pandoc.Inlines({})
+    else
+      line:insert(el)
+    end
+  end
+  table.insert(lines, line)
   
-  -- Map div classes to LaTeX environments
-  local env_map = {
-    didyouknow = "didyouknowbox",
-    quiz = "quizbox",
-    summary = "summarybox",
-    casestudy = "casestudybox",
-    keytakeaway = "summarybox"
-  }
-  
-  local latex_env = env_map[class]
+  local items, numbered = {}, nil
+  for _, item in ipairs(lines) do
+    local marker = item[1] and item[1].t == 'Str' and item[1].text or ''
+    local is_number = marker:match('^%d+[.)]$') ~= nil
+    local is_bullet = marker == '-' or marker == '*' or marker == '+'
+    if #lines < 2 or not (is_number or is_bullet) or not (item[2] and item[2].t == 'Space') then
+      return pandoc.Blocks({pandoc.Para(inlines)})
+    end
+    if numbered == nil then
+      numbered = is_number
+    elseif numbered ~= is_number then
+      return pandoc.Blocks({pandoc.Para(inlines)})
+    end
+    local text = pandoc.Inlines({})
+    for i = 3, #item do
+      text:insert(item[i])
+    end
+    table.insert(items, {pandoc.Plain(text)})
+  end
+  return pandoc.Blocks({numbered and pandoc.OrderedList(items) or pandoc.BulletList(items)})
+end
+
+local function starts_bold(block)
+  return (block.t == 'Para' or block.t == 'Plain') and block.content[1] ~= nil and block.content[1].t == 'Strong'
+end
+
+-- Raw TeX in a table cell is generated text that happened to look like a
+-- command; print it as written
+local literal_cells = {
+  RawInline = function(el)
+    if el.format:match 'tex' then
+      return pandoc.Str(el.text)
+    end
+  end
+}
+
+function Blocks(blocks)
+  local out = pandoc.Blocks({})
+  local skip_boxes = false
+  local i = 1
   
-  if latex_env then
-    if FORMAT:match 'latex' then
-      -- For LaTeX/PDF output: convert to LaTeX environment
-      local begin_env = '\\begin{' .. latex_env .. '}'
-      local end_env = '\\end{' .. latex_env .. '}'
+  while i <= #blocks do
+    local block = blocks[i]
+    local next_block = blocks[i + 1]
+    i = i + 1
+    
+    if block.t == 'Header' then
+      local title = stringify(block)
+      if block.level == 1 then
+        -- No boxes in the Preface or Prologue
+        skip_boxes = title:find('Preface') ~= nil or title:lower():find('prologue') ~= nil
+      end
+      if block.level <= 2 and title:match('^Chapter%s+%d+:') and FORMAT:match 'latex' then
+        out:insert(pandoc.RawBlock('latex', '\\newpage'))
+      end
+    end
+    
+    if block.t == 'Div' and env_map[block.classes[1]] then
+      -- Fenced ::: quiz etc. divs written in the markdown
+      if FORMAT:match 'latex' then
+        box(block.classes[1], block.content, out)
+      else
+        out:insert(block)
+      end
+    
+    elseif block.t == 'Table' then
+      out:insert(block:walk(literal_cells))
+    
+    elseif skip_boxes then
+      out:insert(block)
+    
+    elseif block.t == 'Header' and block.level >= 2 and QUIZ_TITLES[stringify(block)] and next_block then
+      -- Quiz heading: the blocks up to the next heading or rule
+      local content = pandoc.Blocks({})
+      while blocks[i] and blocks[i].t ~= 'Header' and blocks[i].t ~= 'HorizontalRule' do
+        content:insert(blocks[i])
+        i = i + 1
+      end
+      box('quiz', content, out)
+    
+    else
+      local label, before, rest = labelled(block, function(text)
+        return DID_YOU_KNOW[text] or KEY_TAKEAWAYS[text] or text:sub(1, #CASE_STUDY) == CASE_STUDY
+      end)
       
-      -- Insert environment tags around the content
-      table.insert(el.content, 1, pandoc.RawBlock('latex', begin_env))
-      table.insert(el.content, pandoc.RawBlock('latex', end_env))
+      if label and #before > 0 then
+        out:insert(pandoc.Para(before))
+      end
       
-      return el.content
-    else
-      -- For HTML/EPUB: keep as div with class (can be styled with CSS)
-      return el
+      if not label then
+        out:insert(block)
+      
+      elseif label:sub(1, #CASE_STUDY) == CASE_STUDY then
+        -- Case study: bold title, then text up to a heading or bold paragraph
+        local title = label:sub(#CASE_STUDY + 1):gsub('^%s+', '')
+        local content = pandoc.Blocks({pandoc.Para({pandoc.Strong(pandoc.Str(title))})})
+        if #rest > 0 then
+          content:insert(pandoc.Para(rest))
+        end
+        while blocks[i] and blocks[i].t ~= 'Header' and not starts_bold(blocks[i]) do
+          content:insert(blocks[i])
+          i = i + 1
+        end
+        box('casestudy', content, out)
+      
+      else
+        -- Did You Know / Key Takeaway: the rest of the paragraph, or the next block
+        local class = DID_YOU_KNOW[label] and 'didyouknow' or 'keytakeaway'
+        if #rest > 0 then
+          box(class, box_body(rest), out)
+        elseif next_block and next_block.t ~= 'Header' then
+          box(class, pandoc.Blocks({next_block}), out)
+          i = i + 1
+        else
+          out:insert(pandoc.Para({pandoc.Strong(pandoc.Str(label))}))
+        end
+      end
     end
   end
   
-  return el
+  return out
 end
@@ -24,8 +24,14 @@ import yaml
 # Import custom modules
 from utils.content_generator import ContentGenerator
 from utils.research_engine import ResearchEngine
+from utils.scholarly_sources import ArxivSource
 from utils.citation_manager import CitationManager
+from utils.citation_store import CitationStore
 from utils.pdf_builder import PDFBuilder
+from utils.vector_index import VectorIndex
+from utils.query_planner import QueryPlanner, QueryBudget
+from utils.pdf_optimizer import available_backend, optimize_batch, print_report as print_pdf_report
+from utils.recompiler import Recompiler
 
 # Load environment variables
 load_dotenv()
@@ -249,7 +255,8 @@ def configure_content_features() -> dict:
 @app.command()
 def create(
     topic: Optional[str] = typer.Option(None, "--topic", "-t", help="E-book topic"),
-    output_dir: Optional[str] = typer.Option("output", "--output", "-o", help="Output directory")
+    output_dir: Optional[str] = typer.Option("output", "--output", "-o", help="Output directory"),
+    formats: Optional[List[str]] = typer.Option(None, "--format", "-f", help="Output format (pdf, html, epub, docx, latex); repeat for several")
 ):
     """
     Create a new e-book with advanced AI generation
@@ -314,12 +321,30 @@ def create(
             config=CONFIG
         )
         
+        research_settings = CONFIG.get('research_settings', {})
+        research_index = VectorIndex(research_settings.get('index_dir', 'research_index'))
+        cache_dir = Path(research_settings.get('cache_dir', 'research_cache'))
+        
         research_engine = ResearchEngine(
             api_key=os.getenv('GOOGLE_API_KEY'),
-            search_engine_id=os.getenv('SEARCH_ENGINE_ID')
+            search_engine_id=os.getenv('SEARCH_ENGINE_ID'),
+            budget=QueryBudget(
+                cache_dir / 'search_budget.json',
+                daily_limit=research_settings.get('daily_query_limit', 100),
+                reserve=research_settings.get('query_reserve', 10)
+            ),
+            cache_dir=cache_dir / 'search',
+            scholarly_sources=[ArxivSource(cache_dir=cache_dir, cache_ttl=research_settings.get('cache_ttl_days', 7) * 24 * 3600)],
+            local_index=research_index,
+            cache_ttl=research_settings.get('cache_ttl_days', 7) * 24 * 3600,
+            min_interval=research_settings.get('search_interval', 2.0)
         )
         
-        citation_manager = CitationManager(style=citation_style)
+        store_path = CONFIG.get('citation_settings', {}).get('store_path')
+        citation_manager = CitationManager(
+            style=citation_style,
+            store=CitationStore(store_path) if store_path else None
+        )
         
         # Phase 1: Generate Outline
         with Progress(
@@ -348,18 +373,45 @@ def create(
             console.print()
             
             # Phase 2: Research Integration
-            task2 = progress.add_task("[cyan]Conducting research...", total=len(outline))
-            research_data = {}
+            # Cluster sections into a few broad queries, then fan results out
+            planner = QueryPlanner(sections_per_query=research_settings.get('sections_per_query', 3))
+            query_plan = planner.plan(topic, outline)
             
-            for section in outline:
-                if section['type'] in ['chapter', 'introduction']:
-                    search_query = f"{topic} {section['title']}"
-                    research_results = research_engine.search(search_query, max_results=5)
-                    research_data[section['title']] = research_results
-                    progress.update(task2, advance=1)
-                    time.sleep(2)  # Rate limiting
-                else:
-                    progress.update(task2, advance=1)
+            task2 = progress.add_task("[cyan]Conducting research...", total=len(query_plan))
+            
+            # Searches run side by side; identical queries in flight share one request
+            planned_results = research_engine.search_many(
+                [planned['query'] for planned in query_plan],
+                max_results=planner.results_per_query,
+                max_workers=research_settings.get('search_workers', 4)
+            )
+            progress.update(task2, advance=len(query_plan))
+            
+            # arXiv papers for the same queries join the research and are recorded as citations
+            scholarly_results = research_settings.get('scholarly_results', 2)
+            if scholarly_results:
+                scholarly = research_engine.get_scholarly_articles_many(
+                    list(planned_results),
+                    max_results=scholarly_results,
+                    citation_manager=citation_manager
+                )
+                for query, articles in scholarly.items():
+                    planned_results[query] = planned_results[query] + articles
+            
+            research_data = planner.fan_out(query_plan, planned_results, outline)
+            plan_report = planner.report(query_plan)
+            console.print(
+                f"\n✓ Research used {plan_report['queries']} queries for "
+                f"{plan_report['sections']} sections ({plan_report['queries_saved']} saved)"
+            )
+            
+            # Index every research chunk locally for per-subsection retrieval
+            for research_results in planned_results.values():
+                research_index.add_research(research_results, book=topic)
+            research_index.save()
+            subsection_context = research_index.retrieve_for_sections(
+                outline, k=research_settings.get('subsection_top_k', 3)
+            )
             
             console.print("\n✓ [bold green]Research completed![/bold green]\n")
             
@@ -370,14 +422,15 @@ def create(
             for section in outline:
                 console.print(f"[yellow]Writing: {section['title']}...[/yellow]")
                 
-                research_context = research_data.get(section['title'], [])
+                research_context = research_data.get(section['title'], []) + subsection_context.get(section['title'], [])
                 
                 content = content_gen.generate_section(
                     topic=topic,
                     section=section,
                     research_context=research_context,
                     features=content_features,
-                    words_target=length_config['words_per_section']
+                    words_target=length_config['words_per_section'],
+                    citation_manager=citation_manager
                 )
                 
                 generated_content.append({
@@ -427,16 +480,22 @@ def create(
                 genre=genre,
                 content=generated_content,
                 citation_manager=citation_manager,
-                output_dir=output_dir
+                output_dir=output_dir,
+                formats=formats or None
             )
             
             progress.update(task5, advance=1)
         
         # Success message
+        other_outputs = "".join(
+            f"📄 {fmt.upper()}: [cyan]{path}[/cyan]\n"
+            for fmt, path in pdf_builder.outputs.items() if path != output_path
+        )
         console.print("\n")
         console.print(Panel(
             f"[bold green]✓ E-Book successfully created![/bold green]\n\n"
             f"📄 Output: [cyan]{output_path}[/cyan]\n"
+            f"{other_outputs}"
             f"📊 Chapters: {num_chapters}\n"
             f"📝 Total Sections: {len(generated_content)}",
             title="🎉 Success!",
@@ -450,6 +509,127 @@ def create(
         raise typer.Exit(code=1)
 
 
+def parse_chapter_range(chapters: str) -> tuple:
+    """Parse "3" or "2-4" into a (first, last) chapter range"""
+    first, _, last = chapters.partition('-')
+    first, last = int(first), int(last or first)
+    if first < 1 or last < first:
+        raise ValueError(chapters)
+    return first, last
+
+
+def detect_topic(output_dir: str) -> str:
+    """Book title from the compiled markdown in the output directory"""
+    for md_path in sorted(Path(output_dir).glob("*_ebook_final.md")):
+        for line in md_path.read_text(encoding='utf-8').splitlines()[:20]:
+            if line.startswith('title:'):
+                return line.split(':', 1)[1].strip().strip('"')
+    return "Preview"
+
+
+@app.command()
+def preview(
+    chapters: Optional[str] = typer.Option(None, "--chapters", "-c", help="Chapter or range to preview, e.g. 3 or 2-4"),
+    draft_format: Optional[str] = typer.Option(None, "--format", "-f", help="html or pdf (default: pdf_settings.draft_format)"),
+    topic: Optional[str] = typer.Option(None, "--topic", "-t", help="Book title (default: taken from the compiled markdown)"),
+    output_dir: Optional[str] = typer.Option("output", "--output", "-o", help="Output directory holding sections/")
+):
+    """
+    Quick draft of already generated sections, to check structure and boxes
+    """
+    sections_dir = Path(output_dir) / "sections"
+    content = PDFBuilder.load_sections(sections_dir)
+    if not content:
+        console.print(f"[bold red]Error: No section files in {sections_dir}; run create first[/bold red]")
+        raise typer.Exit(code=1)
+    
+    chapter_range = None
+    if chapters:
+        try:
+            chapter_range = parse_chapter_range(chapters)
+        except ValueError:
+            console.print(f"[bold red]Error: Invalid chapter range '{chapters}' (use 3 or 2-4)[/bold red]")
+            raise typer.Exit(code=1)
+    
+    try:
+        output_path = PDFBuilder(config=CONFIG).build(
+            topic=topic or detect_topic(output_dir),
+            genre="",
+            content=content,
+            citation_manager=None,
+            output_dir=output_dir,
+            formats=[draft_format] if draft_format else None,
+            mode="draft",
+            chapters=chapter_range
+        )
+    except Exception as e:
+        console.print(f"\n[bold red]Error: {str(e)}[/bold red]")
+        raise typer.Exit(code=1)
+    
+    console.print(f"\n📄 Draft: [cyan]{output_path}[/cyan]\n")
+
+
+@app.command()
+def recompile(
+    output_dir: Optional[str] = typer.Option("output", "--output", "-o", help="Output directory holding sections/"),
+    watch: bool = typer.Option(False, "--watch", "-w", help="Keep running and rebuild whenever a section file is saved"),
+    topic: Optional[str] = typer.Option(None, "--topic", "-t", help="Book title (default: from the section manifest)"),
+    genre: Optional[str] = typer.Option(None, "--genre", "-g", help="Genre (default: from the section manifest)"),
+    formats: Optional[List[str]] = typer.Option(None, "--format", "-f", help="Output format (default: the original build's); repeat for several"),
+    interval: Optional[float] = typer.Option(None, "--interval", help="Seconds between checks for edits (default: pdf_settings.watch_interval)"),
+    debounce: Optional[float] = typer.Option(None, "--debounce", help="Quiet seconds before a rebuild (default: pdf_settings.watch_debounce)")
+):
+    """
+    Rebuild the book from edited section files, without regenerating anything
+    """
+    try:
+        recompiler = Recompiler(CONFIG, output_dir, topic=topic, genre=genre, formats=formats or None)
+    except (FileNotFoundError, ValueError) as e:
+        console.print(f"[bold red]Error: {e}[/bold red]")
+        raise typer.Exit(code=1)
+    
+    console.print(f"\n🔄 Recompiling [cyan]{recompiler.topic}[/cyan] from {recompiler.sections_dir}...")
+    ok = recompiler.run_once()
+    if watch:
+        pdf_settings = CONFIG['pdf_settings']
+        recompiler.watch(
+            interval=interval or pdf_settings.get('watch_interval', 1.0),
+            debounce=debounce if debounce is not None else pdf_settings.get('watch_debounce', 1.0)
+        )
+    elif not ok:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def optimize(
+    pdfs: Optional[List[Path]] = typer.Argument(None, help="PDFs to optimize (default: every PDF in the output directory)"),
+    output_dir: Optional[str] = typer.Option("output", "--output", "-o", help="Output directory to take PDFs from"),
+    workers: int = typer.Option(0, "--workers", "-w", help="Books optimized at once; 0 = one per core"),
+    linearize: bool = typer.Option(True, "--linearize/--no-linearize", help="Linearize for fast web view")
+):
+    """
+    Shrink finished PDFs in place and audit their fonts, several books at a time
+    """
+    pdfs = pdfs or sorted(Path(output_dir).glob("*.pdf"))
+    if not pdfs:
+        console.print(f"[bold red]Error: No PDFs found in {output_dir}[/bold red]")
+        raise typer.Exit(code=1)
+    if available_backend() is None:
+        console.print("[yellow]⚠️  Neither pikepdf nor qpdf is installed; PDFs will only be inspected[/yellow]")
+    
+    console.print(f"\n🗜️  Optimizing {len(pdfs)} PDFs...")
+    reports = optimize_batch([str(path) for path in pdfs], max_workers=workers or None, linearize=linearize)
+    for report in reports:
+        print_pdf_report(report)
+    
+    before = sum(report['before']['size'] for report in reports)
+    after = sum(report['after']['size'] for report in reports)
+    if before:
+        console.print(f"\n✓ [bold green]{before / 1e6:.1f} MB → {after / 1e6:.1f} MB across {len(reports)} books[/bold green]\n")
+    if len(reports) < len(pdfs):
+        raise typer.Exit(code=1)
+
+
 @app.command()
 def version():
     """Display version information"""
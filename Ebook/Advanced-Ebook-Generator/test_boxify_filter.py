@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+boxify.lua test for the Advanced E-Book Generator
+Covers box detection, chapter page breaks and literal table cells in the single AST pass
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pypandoc
+import pytest
+
+FILTER_PATH = Path(__file__).parent / "filters" / "boxify.lua"
+TEST_DATA = Path(__file__).parent / "test_data"
+
+
+def convert(markdown: str, to: str) -> str:
+    return pypandoc.convert_text(markdown, to, format='markdown', extra_args=[f'--lua-filter={FILTER_PATH}'])
+
+
+def pandoc_available() -> bool:
+    try:
+        pypandoc.get_pandoc_version()
+        return True
+    except OSError:
+        return False
+
+
+def test_detects_boxes():
+    """Raw chapter through the filter gives one box per quiz, fact, takeaway and case study"""
+    
+    print("\n1️⃣  Detecting boxes in a raw chapter...")
+    if not pandoc_available():
+        pytest.skip("pandoc not found")
+    chapter = (TEST_DATA / "box_chapter.txt").read_text(encoding='utf-8')
+    for to in ("html", "latex"):
+        # A label at the end of a line is boxed too, not left as literal ":::" text
+        assert ":::" not in convert(chapter, to)
+    html = convert(chapter, "html")
+    for box, count in (("quiz", 1), ("didyouknow", 1), ("keytakeaway", 2), ("casestudy", 1)):
+        assert html.count(f'<div class="{box}">') == count, box
+    print("✅ Every box found, and the trailing label is boxed instead of broken")
+
+
+def test_single_pass_transforms():
+    """Preface skipped, page break before chapters only, table cells literal"""
+    
+    print("\n2️⃣  Running the transforms together...")
+    if not pandoc_available():
+        pytest.skip("pandoc not found")
+    markdown = (TEST_DATA / "ast_transforms.txt").read_text(encoding='utf-8')
+    latex = convert(markdown, "latex")
+    
+    preface, _, chapter = latex.partition("\\newpage")
+    assert "\\textbf{Did You Know?}" in preface and "box}" not in preface
+    assert latex.count("\\newpage") == 1 and chapter.lstrip().startswith("\\section{Chapter 1: Storage}")
+    for env in ("didyouknowbox", "summarybox", "casestudybox", "quizbox"):
+        assert f"\\begin{{{env}}}" in chapter, env
+    assert "\\texttt{a\\textbar{}b} & Q\\&A 50\\% \\#1 \\textbackslash textbf\\{x\\}" in latex
+    assert "\\textbf{Bold next paragraph} stays out." in latex.split("\\end{casestudybox}")[1]
+    assert "\\newpage" not in convert(markdown, "html")
+    print("✅ Boxes, page break and table cells handled in one pass")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🧪 Testing the boxify.lua transform pass")
+    print("=" * 60)
+    test_detects_boxes()
+    test_single_pass_transforms()
+    print("\n🎉 All boxify.lua tests passed!")
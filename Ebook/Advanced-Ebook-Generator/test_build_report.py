@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Build report test for the Advanced E-Book Generator
+Covers LaTeX log analytics and the JSON report a build leaves next to its PDF
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pypandoc
+import pytest
+import yaml
+
+from utils.build_report import merge_log_stats, parse_latex_log
+from utils.pdf_builder import PDFBuilder
+
+CONFIG = yaml.safe_load((Path(__file__).parent / "config.yaml").read_text(encoding='utf-8'))
+LOG_PATH = Path(__file__).parent / "test_data" / "xelatex_log.txt"
+
+# Stand-in engines: one that dies like a broken xelatex, one that leaves a log and a PDF
+BROKEN_ENGINE = f"""#!{sys.executable}
+import sys
+from pathlib import Path
+tex = Path(sys.argv[-1])
+tex.with_suffix('.log').write_text("! Fatal fontspec error: cannot-find-font\\n")
+print("! Fatal fontspec error: cannot-find-font")
+sys.exit(1)
+"""
+WORKING_ENGINE = f"""#!{sys.executable}
+import sys
+from pathlib import Path
+tex = Path(sys.argv[-1])
+tex.with_suffix('.log').write_text(Path({str(LOG_PATH)!r}).read_text(encoding='utf-8'))
+tex.with_suffix('.pdf').write_bytes(b"%PDF-1.4\\n")
+"""
+
+
+def make_engine(path: Path, source: str) -> str:
+    path.write_text(source)
+    path.chmod(0o755)
+    return str(path)
+
+
+def test_log_analytics():
+    """Pages, box warnings, font substitutions and reruns are read from the log"""
+    
+    print("\n1️⃣  Parsing a xelatex log...")
+    stats = parse_latex_log(LOG_PATH.read_text(encoding='utf-8'))
+    assert stats['pages'] == 42
+    assert (stats['overfull_hbox'], stats['overfull_vbox'], stats['underfull_hbox']) == (2, 1, 1)
+    assert stats['font_substitutions'] == ["TU/Georgia(0)/b/sc -> TU/Georgia(0)/b/n"]
+    assert sum(stats['missing_characters'].values()) == 2
+    assert stats['undefined_references'] == 1
+    assert stats['rerun_warnings'] == 1
+    assert stats['errors'] == []
+    
+    merged = merge_log_stats([stats, stats])
+    assert merged['pages'] == 84 and merged['overfull_hbox'] == 4
+    assert merged['font_substitutions'] == stats['font_substitutions']
+    print("✅ 42 pages, 2 overfull hboxes, 1 font substitution, 1 rerun warning")
+
+
+def test_report_records_fallback():
+    """A failed default engine and its fallback both appear in the report, with the log analysed"""
+    
+    print("\n2️⃣  Building with a broken default engine...")
+    try:
+        pypandoc.get_pandoc_version()
+    except OSError:
+        pytest.skip("pandoc not found")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        config = json.loads(json.dumps(CONFIG))
+        config['pdf_settings'].update({
+            'default_engine': make_engine(tmp / "brokentex", BROKEN_ENGINE),
+            'fallback_engine': make_engine(tmp / "worktex", WORKING_ENGINE),
+            'incremental': False,
+            'preflight': False
+        })
+        content = [{'section': {'title': "Getting Started", 'type': 'chapter'}, 'content': "First steps."}]
+        builder = PDFBuilder(config)
+        pdf_path = builder.build("Report Book", "technology", content, None, output_dir=str(tmp / "output"))
+        
+        assert pdf_path.endswith("report_book_ebook.pdf"), pdf_path
+        report = json.loads((tmp / "output" / "report_book_ebook.build.json").read_text(encoding='utf-8'))
+        assert [attempt['ok'] for attempt in report['engine_attempts']] == [False, True]
+        assert "cannot-find-font" in report['engine_attempts'][0]['error']
+        assert report['engine'] == config['pdf_settings']['fallback_engine']
+        
+        names = [stage['name'] for stage in report['stages']]
+        for name in ('section_writes', 'template_compile', 'pandoc_latex', 'latex'):
+            assert name in names, names
+        latex_stages = [stage for stage in report['stages'] if stage['name'] == 'latex']
+        assert [stage['ok'] for stage in latex_stages] == [False, True]
+        assert len(latex_stages[1]['runs']) >= 1
+        
+        # Only the successful attempt's log is analysed
+        assert report['latex']['pages'] == 42 and report['latex']['errors'] == []
+        assert report['total_seconds'] >= sum(stage['seconds'] for stage in latex_stages)
+    print("✅ Both attempts, every stage and the log analysis are in the report")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing build report...")
+    test_log_analytics()
+    test_report_records_fallback()
+    print("\n🎉 All build report tests passed!")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Citation test for the Advanced E-Book Generator
+Covers deduplication, citation keys, inline resolution, reading exports back and the shared store
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.citation_manager import CitationManager
+from utils.citation_store import CitationStore
+
+
+def test_dedupe_and_keys():
+    """The same source added from several sections is one entry with one key"""
+    
+    print("\n1️⃣  Deduplicating citations...")
+    manager = CitationManager("APA")
+    
+    first = manager.add_citation({
+        'title': 'Solar Outlook', 'url': 'https://www.example.org/solar/?utm_source=feed',
+        'authors': ['Jane Smith'], 'year': 2023
+    })
+    again = manager.add_citation({'title': 'Solar Outlook', 'url': 'http://example.org/solar#top'})
+    other = manager.add_citation({'title': 'Wind Outlook', 'doi': '10.1000/XYZ', 'authors': ['Ann Smith'], 'year': 2023})
+    same_doi = manager.add_citation({'title': 'Wind', 'doi': 'https://doi.org/10.1000/xyz'})
+    
+    assert first == again == "smith2023"
+    assert other == same_doi == "smith2023a"
+    assert len(manager) == 2
+    print(f"✅ Keys: {first}, {other}")
+
+
+def test_resolve_citations():
+    """Inline keys become footnotes or author-date references; unknown keys vanish"""
+    
+    print("\n2️⃣  Resolving inline citations...")
+    manager = CitationManager("APA")
+    key = manager.add_citation({'title': 'Solar Outlook', 'url': 'https://example.org/solar', 'authors': ['Jane Smith'], 'year': 2023})
+    text = f"Costs fell sharply [@{key}]. Invented claim [@madeup1999]."
+    
+    footnoted = manager.resolve_citations(text, mode="footnote")
+    assert footnoted.startswith("Costs fell sharply[^smith2023]. Invented claim.")
+    assert "[^smith2023]: Jane Smith (2023). *Solar Outlook*." in footnoted
+    
+    author_date = manager.resolve_citations(text, mode="author-date")
+    assert author_date == "Costs fell sharply (Smith, 2023). Invented claim."
+    
+    citeproc = manager.resolve_citations(text, mode="citeproc")
+    assert citeproc == "Costs fell sharply [@smith2023]. Invented claim."
+    print("✅ Footnote, author-date and citeproc modes resolved")
+
+
+def test_export_csl_and_bibtex():
+    """References are exported as CSL-JSON and BibTeX for pandoc --citeproc"""
+    
+    print("\n3️⃣  Exporting CSL-JSON and BibTeX...")
+    manager = CitationManager("APA")
+    manager.add_citation({
+        'title': 'Costs & Benefits', 'doi': '10.1000/ABC', 'authors': ['Jane Q. Smith', 'Li'],
+        'year': 2023, 'source': 'Energy Journal'
+    })
+    manager.add_web_source('Solar 101', 'https://example.org/solar')
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = manager.export(Path(tmp) / "book_references")
+        with open(paths['csl_json'], encoding='utf-8') as f:
+            items = json.load(f)
+        bibtex = paths['bibtex'].read_text(encoding='utf-8')
+    
+    assert items[0]['id'] == "smith2023"
+    assert items[0]['type'] == "article-journal"
+    assert items[0]['author'] == [{'family': 'Smith', 'given': 'Jane Q.'}, {'literal': 'Li'}]
+    assert items[0]['DOI'] == "10.1000/abc"
+    assert items[1]['type'] == "webpage" and 'author' not in items[1]
+    assert "@article{smith2023," in bibtex
+    assert "title = {{Costs \\& Benefits}}" in bibtex
+    assert "author = {Jane Q. Smith and Li}" in bibtex
+    print(f"✅ Exported {len(items)} references")
+
+
+def test_csl_json_round_trip():
+    """Citations read back from an export keep their keys, years and formatting"""
+    
+    print("\n4️⃣  Reading exported references back...")
+    manager = CitationManager("APA")
+    manager.add_citation({'title': 'Grid Storage', 'authors': ['Jane Smith'], 'year': 2023, 'source': 'Energy Journal', 'doi': '10.1000/grid'})
+    manager.add_citation({'title': 'Wind Farms', 'authors': ['Tom Smith'], 'year': 2023, 'url': 'https://example.org/wind'})
+    manager.add_web_source('Solar 101', 'https://example.org/solar', year=2020)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = manager.export(Path(tmp) / "book_references")
+        items = json.loads(paths['csl_json'].read_text(encoding='utf-8'))
+        items[2]['id'] = "solar-basics"
+        paths['csl_json'].write_text(json.dumps(items), encoding='utf-8')
+        loaded = CitationManager.from_csl_json(str(paths['csl_json']), style="APA")
+    
+    assert [entry['key'] for entry in loaded.citations] == ["smith2023", "smith2023a", "solar-basics"]
+    assert all(isinstance(entry['year'], int) for entry in loaded.citations)
+    for key in ("smith2023", "smith2023a"):
+        assert loaded.format_key(key) == manager.format_key(key)
+    # Loaded citations dedupe like added ones, and new keys avoid the loaded ones
+    assert loaded.add_citation({'title': 'Grid Storage', 'doi': '10.1000/GRID', 'authors': ['Jane Smith'], 'year': 2023}) == "smith2023"
+    assert loaded.add_citation({'title': 'Tides', 'authors': ['Ann Smith'], 'year': 2023}) == "smith2023b"
+    print(f"✅ {len(loaded.citations) - 1} references read back with their keys")
+
+
+def test_shared_store():
+    """A second book reuses metadata another run stored"""
+    
+    print("\n5️⃣  Sharing citations through the store...")
+    with tempfile.TemporaryDirectory() as tmp:
+        with CitationStore(Path(tmp) / "citations.sqlite3") as store:
+            first_book = CitationManager("APA", store=store)
+            first_book.add_citation({'title': 'Solar Outlook', 'url': 'https://example.org/solar', 'authors': ['Jane Smith'], 'year': 2023})
+            first_book.generate_bibliography()
+            
+            second_book = CitationManager("MLA", store=store)
+            second_book.add_web_source('Solar Outlook', 'http://www.example.org/solar/')
+            bibliography = second_book.generate_bibliography()
+            
+            assert 'Jane Smith. "Solar Outlook."' in bibliography
+            assert store.lookup_urls(['https://example.org/solar'])['https://example.org/solar']['usage_count'] == 2
+    print("✅ Metadata and pre-rendered styles reused across books")
+
+
+if __name__ == "__main__":
+    test_dedupe_and_keys()
+    test_resolve_citations()
+    test_export_csl_and_bibtex()
+    test_csl_json_round_trip()
+    test_shared_store()
+    print("\n✅ Citation tests passed!")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Context ranker test for the Advanced E-Book Generator
+Covers BM25 ordering, near-duplicate removal and token budget packing
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.context_ranker import ContextRanker, estimate_tokens, split_passages
+
+
+RESULTS = [
+    {'title': "Stock markets", 'link': "https://example.com/stocks", 'snippet': "Equity prices rose as traders bought bank shares."},
+    {'title': "Photovoltaics", 'link': "https://example.com/pv", 'snippet': "Solar panels convert sunlight into electricity; solar panel efficiency keeps improving."},
+    {'title': "Batteries", 'link': "https://example.com/batteries", 'snippet': "Home batteries store electricity from solar panels for the evening."},
+    {'title': "Photovoltaics mirror", 'link': "https://mirror.example.com/pv", 'snippet': "Solar panels convert sunlight into electricity; solar panel efficiency keeps improving!"},
+]
+
+
+def test_bm25_ordering():
+    """Passages sharing more (and rarer) terms with the section rank higher; unrelated ones are dropped"""
+    
+    print("\n1️⃣  Ranking passages for a section...")
+    ranker = ContextRanker(dedupe_threshold=1.01)
+    ranked = ranker.rank(RESULTS, "Solar Panel Efficiency", ["Storing electricity"])
+    titles = [passage['title'] for passage in ranked]
+    assert titles[:2] == ["Photovoltaics", "Photovoltaics mirror"], titles
+    assert titles[2] == "Batteries"
+    assert "Stock markets" not in titles
+    scores = [passage['score'] for passage in ranked]
+    assert scores == sorted(scores, reverse=True)
+    
+    # Subsection terms count half as much as title terms
+    weights = ranker.query_weights("Solar Panel Efficiency", ["Storing electricity"])
+    assert weights['solar'] == 1.0 and weights['electricity'] == 0.5
+    
+    # Nothing matches: the original order is kept rather than returning nothing
+    fallback = ranker.rank(RESULTS, "Medieval Poetry")
+    assert [passage['title'] for passage in fallback] == [result['title'] for result in RESULTS]
+    print(f"✅ Ranked {len(ranked)} passages: {', '.join(titles)}")
+
+
+def test_dedupe_and_budget():
+    """The mirrored copy is dropped and the selection never exceeds the budget"""
+    
+    print("\n2️⃣  Deduplicating and packing into a budget...")
+    ranker = ContextRanker()
+    ranked = ranker.rank(RESULTS, "Solar Panel Efficiency", ["Storing electricity"])
+    assert [passage['title'] for passage in ranked] == ["Photovoltaics", "Batteries"]
+    
+    budget = estimate_tokens(RESULTS[1]['snippet'])
+    selected = ranker.select(RESULTS, "Solar Panel Efficiency", ["Storing electricity"], token_budget=budget)
+    assert [passage['title'] for passage in selected] == ["Photovoltaics"]
+    assert sum(passage['tokens'] for passage in selected) <= budget
+    
+    # Long page text is cut into passages of about passage_words words
+    page = {'title': "Long", 'text': " ".join(f"Sentence number {n} about solar panels." for n in range(40))}
+    passages = split_passages([page], passage_words=30)
+    assert len(passages) > 1 and all(len(passage['text'].split()) <= 36 for passage in passages)
+    print(f"✅ Mirror dropped; {len(selected)} passage fits {budget} tokens")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing context ranker...")
+    test_bm25_ordering()
+    test_dedupe_and_budget()
+    print("\n🎉 All context ranker tests passed!")
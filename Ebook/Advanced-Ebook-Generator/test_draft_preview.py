@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Draft preview test for the Advanced E-Book Generator
+Covers reading sections back, chapter ranges and the HTML draft path
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pypandoc
+import pytest
+import yaml
+
+from utils.pdf_builder import PDFBuilder
+
+CONFIG = yaml.safe_load((Path(__file__).parent / "config.yaml").read_text(encoding='utf-8'))
+BOX_CHAPTER = (Path(__file__).parent / "test_data" / "box_chapter.txt").read_text(encoding='utf-8')
+
+
+def make_content() -> list:
+    content = [{'section': {'title': 'Preface', 'type': 'preface'}, 'content': 'Why this book exists.'}]
+    for n in range(1, 5):
+        content.append({'section': {'title': f'Chapter {n}: Part {n}', 'type': 'chapter'}, 'content': f'Body of chapter {n}.'})
+    content.append({'section': {'title': 'Glossary', 'type': 'back_matter'}, 'content': 'Terms.'})
+    return content
+
+
+def test_sections_round_trip():
+    """Section files read back in book order with their types and titles"""
+    
+    print("\n1️⃣  Reading section files back...")
+    builder = PDFBuilder(CONFIG)
+    with tempfile.TemporaryDirectory() as tmp:
+        builder._save_section_files(make_content(), Path(tmp), "Storage")
+        loaded = PDFBuilder.load_sections(tmp)
+    
+    assert [item['section']['type'] for item in loaded] == ['preface'] + ['chapter'] * 4 + ['back_matter']
+    assert [item['section']['title'] for item in loaded][:2] == ['Preface', 'Chapter 1: Part 1']
+    assert loaded[2]['content'] == "# Chapter 2: Part 2\n\nBody of chapter 2."
+    print(f"✅ {len(loaded)} sections restored")
+
+
+def test_chapter_range():
+    """A range keeps only those chapters, counted in book order"""
+    
+    print("\n2️⃣  Selecting a chapter range...")
+    builder = PDFBuilder(CONFIG)
+    selected = builder._select_chapters(make_content(), 2, 3)
+    assert [item['section']['title'] for item in selected] == ['Chapter 2: Part 2', 'Chapter 3: Part 3']
+    assert builder._select_chapters(make_content(), 7, 9) == []
+    print("✅ Chapters 2-3 selected")
+
+
+def test_html_draft():
+    """An HTML draft of one chapter keeps the boxes and skips the TOC"""
+    
+    print("\n3️⃣  Building an HTML draft...")
+    try:
+        pypandoc.get_pandoc_version()
+    except OSError:
+        pytest.skip("pandoc not found")
+    content = make_content()
+    content[2]['content'] = BOX_CHAPTER
+    builder = PDFBuilder(CONFIG)
+    with tempfile.TemporaryDirectory() as tmp:
+        output = builder.build("Storage", "", content, None, output_dir=tmp, formats=["html"], mode="draft", chapters=(2, 2))
+        html = Path(output).read_text(encoding='utf-8')
+        assert Path(output).parent.name == "draft"
+        assert 'class="quiz"' in html and "Body of chapter 1" not in html
+        assert 'id="TOC"' not in html and 'header-section-number' not in html
+        assert not (Path(tmp) / "sections").exists()
+    print("✅ One chapter, styled boxes, no TOC or numbering")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🧪 Testing draft previews")
+    print("=" * 60)
+    test_sections_round_trip()
+    test_chapter_range()
+    test_html_draft()
+    print("\n🎉 All draft preview tests passed!")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Format export test for the Advanced E-Book Generator
+Covers the parse-once AST cache and rendering several formats from it
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pypandoc
+import pytest
+
+from utils.format_export import FormatExporter
+
+FILTER_PATH = Path(__file__).parent / "filters" / "boxify.lua"
+BOOK = """---
+title: "Storage Engines"
+---
+
+# Chapter 1: Pages
+
+Databases keep rows in fixed-size pages.
+
+::: quiz
+What is stored in a page?
+:::
+
+::: didyouknow
+Most engines use 8 KB pages.
+:::
+"""
+
+
+def pandoc_available() -> bool:
+    try:
+        pypandoc.get_pandoc_version()
+        return True
+    except OSError:
+        return False
+
+
+def test_unknown_format_rejected():
+    """Formats without a writer fail before anything is submitted"""
+    
+    print("\n1️⃣  Rejecting unknown formats...")
+    with tempfile.TemporaryDirectory() as tmp:
+        exporter = FormatExporter(tmp, FILTER_PATH)
+        try:
+            exporter.start(Path(tmp) / "book.json", ["html", "mobi"], str(Path(tmp) / "book"))
+        except ValueError as e:
+            assert "mobi" in str(e)
+        else:
+            raise AssertionError("mobi should be rejected")
+        assert exporter._executor is None
+    print("✅ mobi rejected")
+
+
+def test_parse_once_render_many():
+    """The markdown is parsed once; HTML and EPUB come from the same AST with box styles"""
+    
+    print("\n2️⃣  Rendering HTML and EPUB from one parse...")
+    if not pandoc_available():
+        pytest.skip("pandoc not found")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        md_path = tmp / "book.md"
+        md_path.write_text(BOOK, encoding='utf-8')
+        exporter = FormatExporter(tmp / "ast", FILTER_PATH)
+        
+        ast_path = exporter.parse(md_path)
+        mtime = ast_path.stat().st_mtime_ns
+        assert exporter.parse(md_path) == ast_path and ast_path.stat().st_mtime_ns == mtime
+        
+        outputs = exporter.finish(exporter.start(ast_path, ["html", "epub"], str(tmp / "book"), ["--toc"]))
+        assert set(outputs) == {"html", "epub"}
+        html = Path(outputs["html"]).read_text(encoding='utf-8')
+        assert 'class="quiz"' in html and ".didyouknow" in html
+        assert Path(outputs["epub"]).read_bytes()[:2] == b"PK"
+        
+        # An edit gives a new AST and drops the old one
+        md_path.write_text(BOOK + "\nOne more line.\n", encoding='utf-8')
+        assert exporter.parse(md_path) != ast_path and not ast_path.exists()
+    print("✅ One parse, two formats, styled boxes")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🧪 Testing format export")
+    print("=" * 60)
+    test_unknown_format_rejected()
+    test_parse_once_render_many()
+    print("\n🎉 All format export tests passed!")
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Image optimizer test for the Advanced E-Book Generator
+Covers print-size downsampling, the JPEG/PNG choice, metadata stripping, the cache and reference rewriting
+"""
+
+import json
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pypandoc
+import pytest
+import yaml
+from PIL import Image
+
+from utils.image_optimizer import ImageOptimizer, max_image_pixels
+from utils.pdf_builder import PDFBuilder
+
+CONFIG = yaml.safe_load((Path(__file__).parent / "config.yaml").read_text(encoding='utf-8'))
+PDF_SETTINGS = {'page_size': "6in x 9in", 'margin': "1in", 'image_dpi': 300}
+# Stand-in engine that, like LaTeX, looks images up from its working directory and
+# writes a PDF holding the path of every image the .tex includes
+WORKING_ENGINE = f"""#!{sys.executable}
+import re, sys
+from pathlib import Path
+tex = Path(sys.argv[-1])
+images = re.findall(r'includegraphics(?:\\[[^]]*\\])?\\{{([^}}]*)\\}}', tex.read_text())
+for image in images:
+    if not Path(image).is_file():
+        print(f"! LaTeX Error: File `{{image}}' not found.")
+        sys.exit(1)
+tex.with_suffix('.pdf').write_text("%PDF-1.4\\n" + "\\n".join(images))
+"""
+
+
+def make_engine(path: Path) -> str:
+    path.write_text(WORKING_ENGINE)
+    path.chmod(0o755)
+    return str(path)
+
+
+def make_images(directory: Path) -> dict:
+    """A noisy photo with EXIF, a flat-colour diagram and a logo with transparency"""
+    
+    rng = random.Random(7)
+    photo = Image.frombytes('RGB', (3000, 2000), rng.randbytes(3000 * 2000 * 3))
+    exif = Image.Exif()
+    exif[0x010F] = "Camera Maker"
+    photo.save(directory / "photo.png", exif=exif)
+    
+    diagram = Image.new('RGB', (2400, 1600), 'white')
+    diagram.paste((30, 60, 200), (200, 200, 1200, 800))
+    diagram.save(directory / "diagram.png")
+    
+    logo = Image.new('RGBA', (400, 400), (0, 0, 0, 0))
+    logo.paste((200, 30, 30, 255), (100, 100, 300, 300))
+    logo.save(directory / "logo.png")
+    return {name: directory / f"{name}.png" for name in ("photo", "diagram", "logo")}
+
+
+def test_images_are_sized_for_print():
+    """Images shrink to the 4in x 7in text block at 300 DPI, in the right format"""
+    
+    print("\n1️⃣  Optimizing a photo, a diagram and a logo...")
+    assert max_image_pixels(PDF_SETTINGS) == (1200, 2100)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        sources = make_images(tmp)
+        optimizer = ImageOptimizer(tmp / "cache", max_image_pixels(PDF_SETTINGS), max_workers=2)
+        optimized = optimizer.optimize(list(sources.values()))
+        
+        photo = optimized[sources['photo']]
+        assert photo.suffix == '.jpg'
+        with Image.open(photo) as image:
+            assert image.size == (1200, 800)
+            assert not image.getexif()
+        assert optimized[sources['diagram']].suffix == '.png'
+        with Image.open(optimized[sources['logo']]) as image:
+            assert image.mode == 'RGBA' and image.size == (400, 400)
+        assert optimizer.stats['bytes_after'] < optimizer.stats['bytes_before'] / 4
+        
+        # A second run only hashes the sources
+        again = ImageOptimizer(tmp / "cache", max_image_pixels(PDF_SETTINGS))
+        assert again.optimize(list(sources.values())) == optimized
+        assert again.stats['cached'] == 3
+        print(optimizer.report())
+    print("✅ Photo -> 1200x800 JPEG without EXIF, diagram and logo kept as PNG, all cached")
+
+
+def test_references_are_rewritten():
+    """Local image references point at the optimized copies; URLs and missing files are left alone"""
+    
+    print("\n2️⃣  Rewriting image references...")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "images").mkdir()
+        make_images(tmp / "images")
+        optimizer = ImageOptimizer(tmp / "cache", max_image_pixels(PDF_SETTINGS), max_workers=1)
+        texts = optimizer.optimize_markdown([
+            "![A photo](images/photo.png \"Caption\")\n\n![Remote](https://example.com/a.png)",
+            "\\includegraphics[width=2in]{images/diagram.png}\n\n![Gone](images/missing.png)",
+        ], [tmp / "elsewhere", tmp])
+        
+        cache = (tmp / "cache").resolve().as_posix()
+        assert texts[0].startswith(f"![A photo]({cache}/") and texts[0].count(".jpg \"Caption\")") == 1
+        assert "(https://example.com/a.png)" in texts[0]
+        assert texts[1].startswith(f"\\includegraphics[width=2in]{{{cache}/") and ".png}" in texts[1]
+        assert "(images/missing.png)" in texts[1]
+        assert optimizer.stats['images'] == 2
+    print("✅ Two local images rewritten to absolute cache paths, the rest untouched")
+
+
+def test_build_keeps_final_markdown_portable():
+    """The PDF gets the optimized copies; the saved final markdown keeps the original references"""
+    
+    print("\n3️⃣  Building a book with an image...")
+    try:
+        pypandoc.get_pandoc_version()
+    except OSError:
+        pytest.skip("pandoc not found")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        output_dir = tmp / "output"
+        (output_dir / "images").mkdir(parents=True)
+        make_images(output_dir / "images")
+        config = json.loads(json.dumps(CONFIG))
+        config['pdf_settings'].update({'default_engine': make_engine(tmp / "worktex"), 'fallback_engine': None, 'preflight': False, 'max_workers': 1})
+        content = [{'section': {'title': "Pictures", 'type': 'chapter'}, 'content': "![A photo](images/photo.png)"}]
+        PDFBuilder(config).build("Picture Book", "technology", content, None, output_dir=str(output_dir))
+        
+        final_md = (output_dir / "picture_book_ebook_final.md").read_text(encoding='utf-8')
+        assert "](images/photo.png)" in final_md and "build/images" not in final_md
+        build_md = (output_dir / "build" / "picture_book" / "picture_book_ebook_final.md").read_text(encoding='utf-8')
+        assert "build/images/" in build_md
+        pdf = (output_dir / "picture_book_ebook.pdf").read_text()
+        assert "build/images/" in pdf and pdf.rstrip().endswith(".jpg")
+        
+        report = json.loads((output_dir / "picture_book_ebook.build.json").read_text(encoding='utf-8'))
+        stage = next(stage for stage in report['stages'] if stage['name'] == 'image_optimization')
+        assert stage['images'] == 1 and stage['bytes_after'] < stage['bytes_before']
+    print(f"✅ Final markdown portable; PDF built from {stage['bytes_before'] / 1e6:.1f} MB → {stage['bytes_after'] / 1e6:.2f} MB of images")
+
+
+def test_relative_images_without_optimization():
+    """With optimize_images off, relative images still resolve for an engine running in build/"""
+    
+    print("\n4️⃣  Building with optimize_images off...")
+    try:
+        pypandoc.get_pandoc_version()
+    except OSError:
+        pytest.skip("pandoc not found")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        engine = make_engine(tmp / "worktex")
+        for incremental in (False, True):
+            output_dir = tmp / f"output_{incremental}"
+            (output_dir / "images").mkdir(parents=True)
+            make_images(output_dir / "images")
+            config = json.loads(json.dumps(CONFIG))
+            config['pdf_settings'].update({
+                'default_engine': engine,
+                'fallback_engine': None,
+                'preflight': False,
+                'optimize_images': False,
+                'incremental': incremental,
+                'build_report': False
+            })
+            content = [{'section': {'title': "Pictures", 'type': 'chapter'}, 'content': "![A photo](images/photo.png)"}]
+            builder = PDFBuilder(config)
+            pdf_path = builder.build("Picture Book", "technology", content, None, output_dir=str(output_dir))
+            
+            assert 'pdf' in builder.outputs, incremental
+            assert Path(pdf_path).read_text().rstrip().endswith((output_dir / "images" / "photo.png").resolve().as_posix())
+            assert "](images/photo.png)" in (output_dir / "picture_book_ebook_final.md").read_text(encoding='utf-8')
+    print("✅ Relative image found by the engine, single and fragment builds")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing image optimizer...")
+    test_images_are_sized_for_print()
+    test_references_are_rewritten()
+    test_build_keeps_final_markdown_portable()
+    test_relative_images_without_optimization()
+    print("\n🎉 All image optimizer tests passed!")
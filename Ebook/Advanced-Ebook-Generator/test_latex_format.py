@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Preamble format test for the Advanced E-Book Generator
+Covers where the preamble is cut for dumping and the no-engine fallback
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.latex_format import PreambleFormat, split_preamble
+
+
+HEAD = (Path(__file__).parent / "test_data" / "pandoc_head.tex").read_text(encoding='utf-8')
+
+
+def test_split_before_fonts():
+    """The dumped prefix stops before fontspec (xelatex) or hyperref"""
+    
+    print("\n1️⃣  Splitting a pandoc preamble...")
+    prefix, rest = split_preamble(HEAD)
+    
+    assert prefix + rest == HEAD
+    assert prefix.rstrip().endswith("\\usepackage{iftex}")
+    assert rest.startswith("\\ifPDFTeX\n")
+    assert "unicode-math" not in prefix and "Georgia" not in prefix
+    
+    # pdflatex fonts can be dumped, so only hyperref and the metadata stay out
+    pdf_prefix, pdf_rest = split_preamble(HEAD, "pdflatex")
+    assert pdf_prefix.rstrip().endswith("\\makeatother")
+    assert pdf_rest.startswith("\\usepackage{bookmark}")
+    print(f"✅ Dumping {len(prefix.splitlines())} preamble lines for xelatex, {len(pdf_prefix.splitlines())} for pdflatex")
+
+
+def test_split_respects_groups():
+    """A stop command inside a multi-line group moves the cut before the group"""
+    
+    print("\n2️⃣  Keeping groups whole...")
+    head = "\\documentclass{book}\n\\usepackage{xcolor}\n\\AtBeginDocument{\n  \\hypersetup{hidelinks}\n}\n\\begin{document}\n"
+    prefix, rest = split_preamble(head)
+    assert prefix == "\\documentclass{book}\n\\usepackage{xcolor}\n"
+    assert split_preamble("\\usepackage{fontspec}\n\\begin{document}\n") == ("", "\\usepackage{fontspec}\n\\begin{document}\n")
+    print("✅ Cut lands between top-level lines only")
+
+
+def test_missing_engine_falls_back():
+    """Without a usable engine the head is compiled as is"""
+    
+    print("\n3️⃣  Falling back without an engine...")
+    with tempfile.TemporaryDirectory() as tmp:
+        formats = PreambleFormat(tmp)
+        assert formats.prepare(HEAD, "lualatex") == (HEAD, None)
+        head, fmt = formats.prepare(HEAD, "xelatex")
+        if fmt is None:
+            assert head == HEAD
+            print("✅ No format built; preamble loaded normally")
+        else:
+            assert "\\endofdump\n\\ifPDFTeX" in head and fmt.exists()
+            print(f"✅ Built {fmt.name}")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🧪 Testing the preamble format")
+    print("=" * 60)
+    test_split_before_fonts()
+    test_split_respects_groups()
+    test_missing_engine_falls_back()
+    print("\n🎉 All preamble format tests passed!")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Managed build test for the Advanced E-Book Generator
+Checks that engine runs repeat only while aux files change, using a stand-in engine
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.parallel_build import ParallelBuild, page_number, run_latex_until_stable, shift_aux_pages
+
+# Writes one \newlabel per \label in the .tex, like a real engine would
+FAKE_ENGINE = f"""#!{sys.executable}
+import re, sys
+from pathlib import Path
+tex = Path(sys.argv[-1])
+labels = re.findall(r'\\\\label\\{{([^}}]*)\\}}', tex.read_text())
+tex.with_suffix('.aux').write_text("".join(f"\\\\newlabel{{{{{{name}}}}}}{{{{{{{{1}}}}{{{{7}}}}}}}}\\n" for name in labels))
+tex.with_suffix('.pdf').write_bytes(b"%PDF-1.4")
+"""
+
+
+def make_engine(directory: Path) -> str:
+    engine = directory / "fakelatex"
+    engine.write_text(FAKE_ENGINE)
+    engine.chmod(0o755)
+    return str(engine)
+
+
+def test_runs_until_stable():
+    """Fresh builds settle in two runs, unchanged rebuilds in none, text edits in one"""
+    
+    print("\n1️⃣  Counting engine runs...")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        engine = make_engine(tmp)
+        tex_path = tmp / "book.tex"
+        
+        tex_path.write_text("\\chapter{One}\\label{one}\nText.\n")
+        assert run_latex_until_stable(tex_path, engine) == 2
+        assert run_latex_until_stable(tex_path, engine) == 0
+        
+        tex_path.write_text("\\chapter{One}\\label{one}\nEdited text.\n")
+        assert run_latex_until_stable(tex_path, engine) == 1
+        
+        tex_path.write_text("\\chapter{One}\\label{one}\n\\chapter{Two}\\label{two}\n")
+        assert run_latex_until_stable(tex_path, engine) == 2
+        
+        tex_path.with_suffix('.pdf').unlink()
+        assert run_latex_until_stable(tex_path, engine) == 1
+    print("✅ 2, 0, 1, 2 and 1 runs as expected")
+
+
+def test_shift_aux_pages():
+    """Moving a part shifts the pages recorded for its labels and TOC entries"""
+    
+    print("\n2️⃣  Shifting aux page numbers...")
+    with tempfile.TemporaryDirectory() as tmp:
+        aux_path = Path(tmp) / "part_01.aux"
+        aux_path.write_text(
+            "\\newlabel{sec:a}{{1.2}{3}{Title}{section.1.2}{}}\n"
+            "\\@writefile{toc}{\\contentsline {chapter}{\\numberline {1}One}{1}{chapter.1}\\protected@file@percent }\n"
+        )
+        shift_aux_pages(aux_path, 40)
+        text = aux_path.read_text()
+        assert "{{1.2}{43}{Title}" in text
+        assert "{\\numberline {1}One}{41}{chapter.1}" in text
+    print("✅ Labels and TOC entries moved by 40 pages")
+
+
+def test_last_page_numbering():
+    """A part ending on a roman-numbered page still gives its page counter"""
+    
+    print("\n3️⃣  Reading the closing page label...")
+    assert [page_number(text) for text in ("12", "xii", "XIV", "ix", "", "A-1")] == [12, 12, 14, 9, None, None]
+    with tempfile.TemporaryDirectory() as tmp:
+        tex_path = Path(tmp) / "part_00.tex"
+        tex_path.with_suffix('.aux').write_text("\\newlabel{ebook-part-end}{{}{xiv}{}{page.xiv}{}}\n")
+        assert ParallelBuild._last_page({'tex': tex_path}) == 14
+    print("✅ Page xiv read as 14")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🧪 Testing managed LaTeX builds")
+    print("=" * 60)
+    test_runs_until_stable()
+    test_shift_aux_pages()
+    test_last_page_numbering()
+    print("\n🎉 All managed build tests passed!")
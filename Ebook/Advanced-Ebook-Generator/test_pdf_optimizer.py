@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+PDF optimizer test for the Advanced E-Book Generator
+Covers the font subsetting audit, the size report, merging duplicate images across merged parts and keeping files that do not shrink
+"""
+
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+from PIL import Image
+from pypdf import PdfWriter
+from pypdf.generic import DictionaryObject, NameObject, StreamObject
+
+from utils.pdf_optimizer import available_backend, inspect_pdf, is_linearized, optimize_batch, optimize_pdf
+
+
+def make_font_pdf(path: Path):
+    """One page using a subsetted embedded font, a full embedded font and an unembedded one"""
+    
+    writer = PdfWriter()
+    page = writer.add_blank_page(width=432, height=648)
+    fonts = DictionaryObject()
+    for key, name, embedded in (("/F1", "ABCDEF+DejaVuSerif", True), ("/F2", "DejaVuSans", True), ("/F3", "Helvetica", False)):
+        font = DictionaryObject({
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/TrueType"),
+            NameObject("/BaseFont"): NameObject(f"/{name}"),
+        })
+        if embedded:
+            program = StreamObject()
+            program.set_data(b"\0" * 2048)
+            descriptor = DictionaryObject({
+                NameObject("/Type"): NameObject("/FontDescriptor"),
+                NameObject("/FontName"): NameObject(f"/{name}"),
+                NameObject("/FontFile2"): writer._add_object(program),
+            })
+            font[NameObject("/FontDescriptor")] = writer._add_object(descriptor)
+        fonts[NameObject(key)] = writer._add_object(font)
+    page[NameObject("/Resources")] = DictionaryObject({NameObject("/Font"): fonts})
+    contents = StreamObject()
+    contents.set_data(b"BT /F1 12 Tf (Hi) Tj /F2 12 Tf (Hi) Tj /F3 12 Tf (Hi) Tj ET")
+    page[NameObject("/Contents")] = writer._add_object(contents)
+    writer.write(str(path))
+
+
+def make_merged_book(directory: Path) -> Path:
+    """Three chapter PDFs carrying the same figure, merged the way the parallel build merges parts"""
+    
+    figure = Image.frombytes('RGB', (600, 400), random.Random(3).randbytes(600 * 400 * 3))
+    figure.save(directory / "part.pdf")
+    writer = PdfWriter()
+    for _ in range(3):
+        writer.append(str(directory / "part.pdf"))
+    book = directory / "book.pdf"
+    writer.write(str(book))
+    return book
+
+
+def test_font_audit():
+    """Unsubsetted and unembedded fonts are flagged"""
+    
+    print("\n1️⃣  Auditing fonts...")
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = Path(tmp) / "fonts.pdf"
+        make_font_pdf(pdf_path)
+        report = inspect_pdf(str(pdf_path))
+        fonts = {font['name']: font for font in report['fonts']}
+        assert fonts["ABCDEF+DejaVuSerif"] == {'name': "ABCDEF+DejaVuSerif", 'embedded': True, 'subset': True}
+        assert fonts["DejaVuSans"]['embedded'] and not fonts["DejaVuSans"]['subset']
+        assert not fonts["Helvetica"]['embedded']
+        assert report['components']['fonts'] == 2 * 2048
+        assert report['components']['content'] > 0
+        assert sum(report['components'].values()) == report['size']
+    print("✅ Subset, full and unembedded fonts told apart; font bytes counted once each")
+
+
+def test_batch_merges_duplicate_images():
+    """Each book in a batch ends up with one copy of an image repeated across its parts"""
+    
+    print("\n2️⃣  Optimizing a batch of merged books...")
+    backend = available_backend()
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        book = make_merged_book(tmp)
+        books = [book, book.with_name("copy.pdf")]
+        books[1].write_bytes(book.read_bytes())
+        before = inspect_pdf(str(book))
+        
+        reports = optimize_batch([str(path) for path in books], max_workers=2)
+        assert len(reports) == 2
+        for report in reports:
+            assert report['before'] == before
+            if backend is None:
+                assert report['after'] == before
+            elif backend == 'pikepdf':
+                assert report['after']['components']['images'] < before['components']['images'] / 2
+                assert report['after']['size'] < before['size'] / 2
+            else:
+                # The qpdf command has no image merge; it only restructures the file
+                assert report['after']['components']['images'] == before['components']['images']
+        
+        if backend == 'pikepdf':
+            import pikepdf
+            assert reports[0]['duplicates_removed'] == 2
+            with pikepdf.open(books[0]) as pdf:
+                assert pdf.is_linearized and len(pdf.pages) == 3
+    if backend is None:
+        print("⚠️  pikepdf/qpdf not found; checked the inspect-only path")
+    else:
+        print(f"✅ Both books optimized side by side ({backend})")
+
+
+def test_larger_result_keeps_original():
+    """Optimizing an already optimized PDF leaves the file as it was"""
+    
+    print("\n3️⃣  Optimizing a PDF twice...")
+    backend = available_backend()
+    with tempfile.TemporaryDirectory() as tmp:
+        source, optimized = Path(tmp) / "fonts.pdf", Path(tmp) / "optimized.pdf"
+        make_font_pdf(source)
+        first = optimize_pdf(str(source), str(optimized))
+        assert first['after']['size'] <= first['before']['size'] == source.stat().st_size
+        assert optimized.stat().st_size == first['after']['size']
+        
+        data, mode = optimized.read_bytes(), optimized.stat().st_mode
+        second = optimize_pdf(str(optimized))
+        assert second['after'] == second['before'] and second['kept'] == 'original'
+        assert second['duplicates_removed'] == 0
+        assert optimized.read_bytes() == data and optimized.stat().st_mode == mode
+        assert sorted(path.name for path in Path(tmp).iterdir()) == ["fonts.pdf", "optimized.pdf"]
+    print(f"✅ {first['before']['size']} → {first['after']['size']} bytes, then left alone")
+
+
+def test_linearization_is_kept():
+    """A linearized result replaces an unlinearized input even when it is bigger"""
+    
+    print("\n4️⃣  Linearizing an already compact PDF...")
+    if available_backend() is None:
+        pytest.skip("pikepdf/qpdf not found")
+    with tempfile.TemporaryDirectory() as tmp:
+        compact = Path(tmp) / "compact.pdf"
+        make_font_pdf(compact)
+        optimize_pdf(str(compact), linearize=False)
+        assert not is_linearized(compact)
+        
+        report = optimize_pdf(str(compact), linearize=True)
+        assert report['after']['size'] >= report['before']['size'], "linearizing was expected to add bytes here"
+        assert report['kept'] == 'optimized' and report['linearized'] and is_linearized(compact)
+        assert compact.stat().st_size == report['after']['size']
+    print(f"✅ {report['before']['size']} → {report['after']['size']} bytes, kept for fast web view")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing PDF optimizer...")
+    test_font_audit()
+    test_batch_merges_duplicate_images()
+    test_larger_result_keeps_original()
+    test_linearization_is_kept()
+    print("\n🎉 All PDF optimizer tests passed!")
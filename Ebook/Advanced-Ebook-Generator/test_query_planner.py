@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Query planner test for the Advanced E-Book Generator
+Covers clustering sections into queries, fanning results out and the shared daily budget
+"""
+
+import json
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.query_planner import QueryBudget, QueryPlanner
+
+OUTLINE = [
+    {'title': "Introduction", 'type': 'introduction'},
+    {'title': "Solar Panels", 'type': 'chapter', 'subsections': ["Silicon cells", "Panel efficiency"]},
+    {'title': "Solar Panel Installation", 'type': 'chapter', 'subsections': ["Roof panels", "Panel wiring"]},
+    {'title': "Wind Turbines", 'type': 'chapter', 'subsections': ["Blade design", "Offshore turbines"]},
+    {'title': "Dedication", 'type': 'front_matter'},
+]
+
+
+def spend(path: str, attempts: int) -> int:
+    """Try to spend one query at a time; returns how many were allowed (runs in a worker process)"""
+    budget = QueryBudget(path, daily_limit=50, reserve=10)
+    return sum(1 for _ in range(attempts) if budget.try_spend())
+
+
+def test_plan_and_fan_out():
+    """Related chapters share a query, every researched section is covered, results reach the right section"""
+    
+    print("\n1️⃣  Planning queries for an outline...")
+    planner = QueryPlanner(sections_per_query=2)
+    plan = planner.plan("Renewable Energy", OUTLINE)
+    covered = [title for entry in plan for title in entry['sections']]
+    assert sorted(covered) == ["Introduction", "Solar Panel Installation", "Solar Panels", "Wind Turbines"]
+    assert all(len(entry['sections']) <= 2 for entry in plan)
+    solar = next(entry for entry in plan if "Solar Panels" in entry['sections'])
+    assert "Solar Panel Installation" in solar['sections']
+    assert solar['query'].startswith("Renewable Energy ") and "panel" in solar['query']
+    assert QueryPlanner.report(plan) == {'sections': 4, 'queries': len(plan), 'queries_saved': 4 - len(plan)}
+    
+    wind = next(entry for entry in plan if "Wind Turbines" in entry['sections'])
+    planned_results = {
+        solar['query']: [{'title': "Rooftop panel wiring guide", 'link': "https://example.com/roof", 'snippet': "Roof panels and wiring."}],
+        wind['query']: [
+            {'title': "Offshore turbines", 'link': "https://example.com/offshore", 'snippet': "Blade design for offshore wind."},
+            {'title': "Rooftop panel wiring guide", 'link': "https://example.com/roof", 'snippet': "Duplicate link."}
+        ]
+    }
+    research = planner.fan_out(plan, planned_results, OUTLINE)
+    assert [result['link'] for result in research["Wind Turbines"]] == ["https://example.com/offshore"]
+    assert research["Solar Panel Installation"][0]['link'] == "https://example.com/roof"
+    assert "Dedication" not in research
+    print(f"✅ {len(plan)} queries cover 4 sections")
+
+
+def test_budget_reserve_and_rollover():
+    """Spending stops at the reserve and the counter starts over on a new day"""
+    
+    print("\n2️⃣  Spending the daily budget...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "budget.json"
+        budget = QueryBudget(path, daily_limit=5, reserve=2)
+        assert [budget.try_spend() for _ in range(4)] == [True, True, True, False]
+        assert budget.remaining() == 0
+        assert not budget.try_spend()
+        
+        path.write_text(json.dumps({'date': "2000-01-01", 'used': 3}), encoding='utf-8')
+        assert budget.remaining() == 3
+        path.write_text("{broken", encoding='utf-8')
+        assert budget.try_spend()
+    print("✅ Reserve respected, yesterday's count ignored")
+
+
+def test_budget_shared_across_processes():
+    """Processes spending from one budget file never exceed the limit together"""
+    
+    print("\n3️⃣  Four processes spending one budget...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "budget.json")
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            allowed = sum(executor.map(spend, [path] * 4, [25] * 4))
+        assert allowed == 40, allowed
+        assert json.loads(Path(path).read_text(encoding='utf-8'))['used'] == 40
+    print("✅ 100 attempts, exactly 40 allowed")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing query planner...")
+    test_plan_and_fan_out()
+    test_budget_reserve_and_rollover()
+    test_budget_shared_across_processes()
+    print("\n🎉 All query planner tests passed!")
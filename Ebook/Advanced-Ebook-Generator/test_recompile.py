@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Recompile test for the Advanced E-Book Generator
+Covers debounced section watching, rebuilding from the manifest and keeping the last good PDF
+"""
+
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pypandoc
+import pytest
+import yaml
+
+from utils.citation_manager import CitationManager
+from utils.pdf_builder import PDFBuilder
+from utils.recompiler import Recompiler, SectionWatcher
+
+CONFIG = yaml.safe_load((Path(__file__).parent / "config.yaml").read_text(encoding='utf-8'))
+
+# Stand-in engines: one whose PDF is a hash of the .tex it was given, one that always fails
+WORKING_ENGINE = f"""#!{sys.executable}
+import hashlib, sys
+from pathlib import Path
+tex = Path(sys.argv[-1])
+tex.with_suffix('.pdf').write_bytes(b"%PDF-1.4\\n%" + hashlib.sha256(tex.read_bytes()).hexdigest().encode())
+"""
+BROKEN_ENGINE = f"""#!{sys.executable}
+import sys
+print("! Emergency stop.")
+sys.exit(1)
+"""
+
+
+def make_engine(path: Path, source: str) -> str:
+    path.write_text(source)
+    path.chmod(0o755)
+    return str(path)
+
+
+def edit_later(path: Path, texts: list, delay: float = 0.1):
+    """Write each text to path in turn, delay seconds apart, from a background thread"""
+    
+    def run():
+        for text in texts:
+            time.sleep(delay)
+            path.write_text(text, encoding='utf-8')
+    
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_watcher_debounces_bursts():
+    """A burst of saves across files is reported once, after it settles"""
+    
+    print("\n1️⃣  Watching a burst of edits...")
+    with tempfile.TemporaryDirectory() as tmp:
+        sections_dir = Path(tmp)
+        (sections_dir / "04_chapter_01_one.md").write_text("# One\n", encoding='utf-8')
+        watcher = SectionWatcher(sections_dir, interval=0.02, debounce=0.3)
+        assert watcher.wait(timeout=0.1) == []
+        
+        threads = [
+            edit_later(sections_dir / "04_chapter_01_one.md", ["# One\n\na", "# One\n\nab", "# One\n\nabc"]),
+            edit_later(sections_dir / "04_chapter_02_two.md", ["# Two\n"], delay=0.15)
+        ]
+        # Half-written atomic write temporaries are not sections
+        (sections_dir / ".04_chapter_01_one.md.x1.tmp").write_text("partial", encoding='utf-8')
+        changed = watcher.wait(timeout=5)
+        for thread in threads:
+            thread.join()
+        
+        assert changed == ["04_chapter_01_one.md", "04_chapter_02_two.md"], changed
+        assert watcher.wait(timeout=0.1) == []
+        
+        (sections_dir / "04_chapter_02_two.md").unlink()
+        assert watcher.wait(timeout=5) == ["04_chapter_02_two.md"]
+    print("✅ Four saves reported as one batch; deletions noticed")
+
+
+def test_recompile_from_sections():
+    """Rebuilds use the manifest's metadata, re-run pandoc for edited sections only and keep the last good PDF"""
+    
+    print("\n2️⃣  Recompiling edited sections...")
+    try:
+        pypandoc.get_pandoc_version()
+    except OSError:
+        pytest.skip("pandoc not found")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        output_dir = tmp / "output"
+        config = json.loads(json.dumps(CONFIG))
+        config['pdf_settings'].update({
+            'default_engine': make_engine(tmp / "worktex", WORKING_ENGINE),
+            'fallback_engine': None,
+            'incremental': False,
+            'parallel_chapters': False,
+            'precompiled_preamble': False,
+            'preflight': False,
+            'build_report': False
+        })
+        citations = CitationManager(style="APA")
+        key = citations.add_citation({'title': "Watching Files", 'authors': ["Ada Lovelace"], 'year': "2021", 'url': "https://example.com/watch"})
+        content = [
+            {'section': {'title': "Introduction", 'type': 'introduction'}, 'content': "Why watch files."},
+            {'section': {'title': "Getting Started", 'type': 'chapter'}, 'content': f"First steps [@{key}]."},
+            {'section': {'title': "Going Further", 'type': 'chapter'}, 'content': "More steps."},
+            {'section': {'title': "Glossary", 'type': 'back_matter'}, 'content': "Debounce: waiting for quiet."},
+        ]
+        PDFBuilder(config).build("Watch Book", "technology", content, citations, output_dir=str(output_dir))
+        pdf_path = output_dir / "watch_book_ebook.pdf"
+        first_pdf = pdf_path.read_bytes()
+        first_markdown = (output_dir / "watch_book_ebook_final.md").read_text(encoding='utf-8')
+        plain = tmp / "plain.txt"
+        plain.write_text("plain")
+        assert pdf_path.stat().st_mode == plain.stat().st_mode
+        
+        # Section files carry the headings the book uses, so unnumbered sections stay unnumbered
+        sections_dir = output_dir / "sections"
+        assert (sections_dir / "03_introduction.md").read_text(encoding='utf-8').startswith("# Introduction {.unnumbered}\n")
+        assert next(sections_dir.glob("06_back_01_*.md")).read_text(encoding='utf-8').startswith("# Glossary {.unnumbered}\n")
+        
+        # Metadata and citations come back from the output directory alone; the
+        # recompiler builds fragments even though incremental is off in the config
+        recompiler = Recompiler(config, str(output_dir))
+        assert (recompiler.topic, recompiler.genre, recompiler.formats) == ("Watch Book", "technology", ['pdf'])
+        assert recompiler.run_once()
+        markdown = (output_dir / "watch_book_ebook_final.md").read_text(encoding='utf-8')
+        assert markdown == first_markdown
+        assert f"[@{key}]" not in markdown and "Lovelace" in markdown
+        fragments = next(stage for stage in recompiler.builder.timer.stages if stage['name'] == 'pandoc_fragments')
+        assert fragments['hits'] == 0 and fragments['misses'] > 1, fragments
+        first_pdf = pdf_path.read_bytes()
+        assert recompiler.run_once()
+        assert pdf_path.read_bytes() == first_pdf
+        fragments = next(stage for stage in recompiler.builder.timer.stages if stage['name'] == 'pandoc_fragments')
+        assert fragments['misses'] == 0, fragments
+        
+        # Saving a chapter in watch mode rebuilds only its fragment
+        chapter = next(sections_dir.glob("04_chapter_02_*.md"))
+        thread = edit_later(chapter, [chapter.read_text(encoding='utf-8') + "\nEdited by hand.\n"])
+        recompiler.watch(interval=0.02, debounce=0.2, max_builds=3)
+        thread.join()
+        fragments = next(stage for stage in recompiler.builder.timer.stages if stage['name'] == 'pandoc_fragments')
+        assert fragments['misses'] == 1, fragments
+        assert "Edited by hand." in (output_dir / "watch_book_ebook_final.md").read_text(encoding='utf-8')
+        good_pdf = pdf_path.read_bytes()
+        assert good_pdf != first_pdf
+        # The sections are read, never rewritten
+        assert "Edited by hand." in chapter.read_text(encoding='utf-8')
+        
+        # A failing engine leaves the last good PDF in place
+        recompiler.builder.pdf_settings['default_engine'] = make_engine(tmp / "brokentex", BROKEN_ENGINE)
+        chapter.write_text(chapter.read_text(encoding='utf-8') + "\nAnother edit.\n", encoding='utf-8')
+        assert not recompiler.run_once()
+        assert recompiler.failures == 1
+        assert pdf_path.read_bytes() == good_pdf
+    print("✅ One fragment rebuilt per edit; a failed build kept the previous PDF")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing recompile...")
+    test_watcher_debounces_bursts()
+    test_recompile_from_sections()
+    print("\n🎉 All recompile tests passed!")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Research engine test for the Advanced E-Book Generator
+Runs the search path against a stand-in Custom Search service
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.research_engine import ResearchEngine
+
+
+class FakeSearchService:
+    """Answers cse().list(...).execute() slowly and counts the requests"""
+    
+    def __init__(self, delay: float = 0.2, found: bool = True):
+        self.delay = delay
+        self.found = found
+        self.requests = []
+        self._lock = threading.Lock()
+    
+    def cse(self):
+        return self
+    
+    def list(self, q, cx, num):
+        with self._lock:
+            self.requests.append(q)
+        return FakeRequest(q, self.delay, self.found)
+
+
+class FakeRequest:
+    """One pending Custom Search request"""
+    
+    def __init__(self, query: str, delay: float, found: bool):
+        self.query = query
+        self.delay = delay
+        self.found = found
+    
+    def execute(self):
+        time.sleep(self.delay)
+        if not self.found:
+            return {}
+        return {'items': [{'title': f"About {self.query.lower()}", 'link': "https://example.com/a", 'snippet': "Text."}]}
+
+
+def make_engine(service: FakeSearchService, **kwargs) -> ResearchEngine:
+    engine = ResearchEngine(api_key=None, search_engine_id=None, scholarly_sources=[], **kwargs)
+    engine.search_service = service
+    return engine
+
+
+def test_concurrent_duplicates_share_one_request():
+    """Threads asking the same query at once cause a single backend call"""
+    
+    print("\n1️⃣  Searching the same query from 8 threads...")
+    service = FakeSearchService()
+    engine = make_engine(service)
+    barrier = threading.Barrier(8)
+    results = []
+    
+    def ask(query):
+        barrier.wait()
+        results.append(engine.search(query, max_results=3))
+    
+    threads = [threading.Thread(target=ask, args=(query,)) for query in ["Solar cells"] * 4 + ["solar  CELLS"] * 4]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(service.requests) == 1, service.requests
+    assert len(results) == 8 and all(result == results[0] for result in results)
+    # Callers get their own copies
+    results[0][0]['title'] = "changed"
+    assert results[1][0]['title'] in ("About solar cells", "About solar  cells")
+    assert engine.flight_stats == {'calls': 8, 'executed': 1, 'coalesced': 7}
+    print("✅ 8 searches, 1 request")
+
+
+def test_search_many_coalesces():
+    """search_many runs distinct queries side by side and duplicates once"""
+    
+    print("\n2️⃣  Planned searches through search_many...")
+    service = FakeSearchService()
+    engine = make_engine(service)
+    queries = ["Wind power", "wind power", "Tidal energy", "Geothermal heat"]
+    start = time.perf_counter()
+    results = engine.search_many(queries, max_results=3, max_workers=4)
+    elapsed = time.perf_counter() - start
+    
+    assert list(results) == queries
+    assert sorted(service.requests) == ["Geothermal heat", "Tidal energy", "Wind power"]
+    assert elapsed < 3 * service.delay, elapsed
+    print(f"✅ {len(queries)} queries, {len(service.requests)} requests in {elapsed:.2f}s")
+
+
+def test_cache_ttl_and_rate_limit():
+    """Cached results expire, empty answers are not cached and only live requests wait for min_interval"""
+    
+    print("\n3️⃣  Cache expiry and rate limiting...")
+    with tempfile.TemporaryDirectory() as tmp:
+        service = FakeSearchService(delay=0)
+        engine = make_engine(service, cache_dir=tmp, cache_ttl=3600, min_interval=0.3)
+        
+        start = time.perf_counter()
+        engine.search("Solar cells")
+        engine.search("Wind power")
+        assert time.perf_counter() - start >= 0.3  # two live requests, spaced out
+        
+        start = time.perf_counter()
+        for _ in range(5):
+            engine.search("Solar cells")
+        assert time.perf_counter() - start < 0.1  # cache hits don't wait
+        assert service.requests == ["Solar cells", "Wind power"]
+        
+        # Past the TTL the query is searched again
+        for cache_file in Path(tmp).glob("*.json"):
+            os.utime(cache_file, (time.time() - 7200, time.time() - 7200))
+        engine.search("Solar cells")
+        assert service.requests[-1] == "Solar cells" and len(service.requests) == 3
+        
+        # Empty answers are searched again next time
+        engine.search_service = FakeSearchService(delay=0, found=False)
+        assert engine.search("Nothing here") == []
+        assert engine.search("Nothing here") == []
+        assert engine.search_service.requests == ["Nothing here"] * 2
+        assert len(list(Path(tmp).glob("*.json"))) == 2
+    print("✅ Stale entries refreshed, empty results skipped, cache hits not throttled")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing research engine...")
+    test_concurrent_duplicates_share_one_request()
+    test_search_many_coalesces()
+    test_cache_ttl_and_rate_limit()
+    print("\n🎉 All research engine tests passed!")
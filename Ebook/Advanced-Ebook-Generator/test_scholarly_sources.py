@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Scholarly source test for the Advanced E-Book Generator
+Serves a recorded arXiv Atom feed locally and runs the full search path
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.scholarly_sources import ArxivSource, ScholarlySource, parse_arxiv_feed
+from utils.research_engine import ResearchEngine
+from utils.citation_manager import CitationManager
+
+FEED_DIR = Path(__file__).parent / "test_data"
+
+
+class FeedHandler(SimpleHTTPRequestHandler):
+    """Answers every request with the recorded feed and counts requests"""
+    
+    requests_served = 0
+    
+    def do_GET(self):
+        FeedHandler.requests_served += 1
+        self.path = "/arxiv_feed.xml"
+        super().do_GET()
+    
+    def log_message(self, *args):
+        pass
+
+
+def serve_feed():
+    """Start a local HTTP server for the recorded feed"""
+    server = HTTPServer(('127.0.0.1', 0), partial(FeedHandler, directory=str(FEED_DIR)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_parse_recorded_feed():
+    """The streaming parser extracts authors, year, DOI and links"""
+    
+    print("\n1️⃣  Parsing recorded arXiv feed...")
+    with open(FEED_DIR / "arxiv_feed.xml", 'rb') as f:
+        results = parse_arxiv_feed(f)
+    
+    assert len(results) == 2
+    first = results[0]
+    assert first['title'] == "Perovskite Solar Cells: Stability and Efficiency Trade-offs"
+    assert first['authors'] == ["Jane Smith", "Rahul Gupta"]
+    assert first['year'] == 2023
+    assert first['doi'] == "10.1000/pvsc.2023.42"
+    assert first['link'] == "http://arxiv.org/abs/2301.01234v2"
+    assert first['pdf_link'] == "http://arxiv.org/pdf/2301.01234v2"
+    assert results[1]['doi'] == ""
+    print(f"✅ Parsed {len(results)} entries")
+
+
+def test_scholarly_search_into_citations():
+    """Batched search hits the server once per distinct query and fills citations"""
+    
+    print("\n2️⃣  Searching against local feed server...")
+    server = serve_feed()
+    try:
+        FeedHandler.requests_served = 0
+        base_url = f"http://127.0.0.1:{server.server_address[1]}/api/query"
+        engine = ResearchEngine(
+            api_key=None,
+            search_engine_id=None,
+            scholarly_sources=[ArxivSource(base_url=base_url, min_interval=0)]
+        )
+        citations = CitationManager("APA")
+        
+        articles = engine.get_scholarly_articles_many(
+            ["Solar cells", "solar  CELLS", "Perovskite stability"],
+            max_results=2,
+            citation_manager=citations
+        )
+        
+        assert FeedHandler.requests_served == 2
+        assert len(articles["Solar cells"]) == 2
+        assert articles["solar  CELLS"] == articles["Solar cells"]
+        
+        # A repeated query is served from the parsed-feed cache
+        engine.get_scholarly_articles("Solar cells", max_results=2)
+        assert FeedHandler.requests_served == 2
+        
+        assert len(citations) == 2  # the same papers from both queries are deduplicated
+        first = citations.citations[0]
+        assert first['authors'] == ["Jane Smith", "Rahul Gupta"]
+        assert first['year'] == 2023
+        print(f"✅ {len(citations.citations)} citations recorded from {FeedHandler.requests_served} requests")
+    finally:
+        server.shutdown()
+
+
+class FlakySource(ScholarlySource):
+    """Fails for queries mentioning "timeout", answers the rest"""
+    
+    name = "flaky"
+    
+    def __init__(self, **kwargs):
+        super().__init__(min_interval=0, **kwargs)
+        self.fetched = []
+    
+    def _fetch(self, query, max_results):
+        self.fetched.append(query)
+        if "timeout" in query:
+            raise TimeoutError("read timed out")
+        if "nothing" in query:
+            return []
+        return [{'title': f"Paper on {query}", 'link': f"https://example.org/{len(self.fetched)}", 'snippet': "",
+                 'authors': ["Ada Lovelace"], 'year': 2020, 'doi': "", 'source': "Flaky"}]
+
+
+def test_failing_query_keeps_the_batch():
+    """One failing query leaves the rest of its batch intact, and is tried again next time"""
+    
+    print("\n3️⃣  Batch with a failing query...")
+    source = FlakySource()
+    results = source.search_batch(["Wind power", "timeout please", "Tidal energy"])
+    assert results["timeout please"] == []
+    assert [article['title'] for article in results["Wind power"] + results["Tidal energy"]] == [
+        "Paper on Wind power", "Paper on Tidal energy"
+    ]
+    
+    # Failures are not cached, successes are
+    source.search_batch(["timeout please", "Wind power"])
+    assert source.fetched == ["Wind power", "timeout please", "Tidal energy", "timeout please"]
+    
+    # The engine goes on to the next source for the query that failed
+    engine = ResearchEngine(api_key=None, search_engine_id=None, scholarly_sources=[FlakySource(), FlakySource()])
+    citations = CitationManager("APA")
+    articles = engine.get_scholarly_articles_many(["Wind power", "timeout please"], max_results=1, citation_manager=citations)
+    assert len(articles["Wind power"]) == 1 and articles["timeout please"] == []
+    assert len(citations) == 1
+    print("✅ Failed query isolated; other results and citations kept")
+
+
+def test_cache_expiry_and_empty_results():
+    """Cached results expire after cache_ttl and empty answers are fetched again"""
+    
+    print("\n4️⃣  Cache expiry and empty results...")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = FlakySource(cache_dir=tmp, cache_ttl=3600)
+        source.search("Wind power")
+        source.search("Wind power")
+        assert source.fetched == ["Wind power"]
+        
+        # A fresh process reads the disk cache until it is older than the TTL
+        reopened = FlakySource(cache_dir=tmp, cache_ttl=3600)
+        reopened.search("Wind power")
+        assert reopened.fetched == []
+        for cache_file in (Path(tmp) / "flaky").glob("*.json"):
+            os.utime(cache_file, (time.time() - 7200, time.time() - 7200))
+        assert FlakySource(cache_dir=tmp, cache_ttl=3600).search("Wind power")
+        source.cache_ttl = -1
+        source.search("Wind power")
+        assert source.fetched == ["Wind power"] * 2
+        
+        assert source.search("nothing found") == [] and source.search("nothing found") == []
+        assert source.fetched[-2:] == ["nothing found"] * 2
+        assert len(list((Path(tmp) / "flaky").glob("*.json"))) == 1
+    print("✅ Stale entries refetched, empty answers not cached")
+
+
+if __name__ == "__main__":
+    test_parse_recorded_feed()
+    test_scholarly_search_into_citations()
+    test_failing_query_keeps_the_batch()
+    test_cache_expiry_and_empty_results()
+    print("\n✅ Scholarly source tests passed!")
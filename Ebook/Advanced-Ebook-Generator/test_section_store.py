@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Section store test for the Advanced E-Book Generator
+Covers atomic section writes, skipping unchanged files and the hash manifest
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import yaml
+
+from utils.pdf_builder import PDFBuilder
+from utils.section_store import MANIFEST_NAME, atomic_write
+
+CONFIG = yaml.safe_load((Path(__file__).parent / "config.yaml").read_text(encoding='utf-8'))
+
+
+def make_content(chapter_two: str) -> list:
+    """A small book as build() receives it"""
+    return [
+        {'section': {'title': 'Preface', 'type': 'preface'}, 'content': "Why this book exists."},
+        {'section': {'title': 'Getting Started', 'type': 'chapter'}, 'content': "# Chapter 1: Getting Started\n\nFirst steps."},
+        {'section': {'title': 'Going Further', 'type': 'chapter'}, 'content': chapter_two},
+    ]
+
+
+def test_unchanged_sections_are_skipped():
+    """A rebuild rewrites only the section whose content changed"""
+    
+    print("\n1️⃣  Rebuilding the sections with one chapter edited...")
+    builder = PDFBuilder(CONFIG)
+    with tempfile.TemporaryDirectory() as tmp:
+        sections_dir = Path(tmp) / "sections"
+        first = builder._save_section_files(make_content("More steps."), sections_dir, "Topic")
+        assert all(item['changed'] for item in first)
+        
+        # Push the mtimes into the past so a rewrite would show
+        for item in first:
+            os.utime(item['path'], (1_000_000, 1_000_000))
+        
+        second = builder._save_section_files(make_content("More steps, revised."), sections_dir, "Topic")
+        changed = [item['path'].name for item in second if item['changed']]
+        assert changed == ["04_chapter_02_going_further.md"], changed
+        assert second[0]['path'].stat().st_mtime == 1_000_000
+        assert second[2]['path'].stat().st_mtime != 1_000_000
+        assert second[2]['path'].read_text(encoding='utf-8') == "# Going Further\n\nMore steps, revised."
+        
+        manifest = json.loads((sections_dir / MANIFEST_NAME).read_text(encoding='utf-8'))
+        assert set(manifest['sections']) == {item['path'].name for item in second}
+        assert manifest['sections']["02_preface.md"]['type'] == 'preface'
+        assert not list(sections_dir.glob(".*.tmp"))
+        assert len(PDFBuilder.load_sections(sections_dir)) == 3
+    print("✅ Only the edited chapter was rewritten; the manifest lists all three")
+
+
+def test_stale_files_are_scoped_to_the_book():
+    """Dropped sections of the same book are cleaned up; another book's files and hand-added ones are kept"""
+    
+    print("\n2️⃣  Dropping a chapter, then building a second book in the same directory...")
+    builder = PDFBuilder(CONFIG)
+    with tempfile.TemporaryDirectory() as tmp:
+        sections_dir = Path(tmp) / "sections"
+        builder._save_section_files(make_content("More steps."), sections_dir, "Topic")
+        (sections_dir / "99_other_notes.md").write_text("# Notes", encoding='utf-8')
+        
+        builder._save_section_files(make_content("More steps.")[:2], sections_dir, "Topic")
+        assert not (sections_dir / "04_chapter_02_going_further.md").exists()
+        # Files the build never wrote are left alone
+        assert (sections_dir / "99_other_notes.md").exists()
+        
+        other = [{'section': {'title': 'Tides', 'type': 'chapter'}, 'content': "Moon and sea."}]
+        builder._save_section_files(other, sections_dir, "Other Topic")
+        assert (sections_dir / "04_chapter_01_getting_started.md").exists()
+        manifest = json.loads((sections_dir / MANIFEST_NAME).read_text(encoding='utf-8'))
+        assert manifest['topic'] == "Other Topic" and list(manifest['sections']) == ["04_chapter_01_tides.md"]
+        
+        # The first book coming back only cleans up what its own manifest listed
+        builder._save_section_files(make_content("More steps."), sections_dir, "Topic")
+        assert (sections_dir / "04_chapter_01_tides.md").exists()
+    print("✅ The dropped chapter removed; the other book's and hand-added files kept")
+
+
+def test_atomic_write_permissions():
+    """Atomic writes give new files the usual permissions and keep those of replaced ones"""
+    
+    print("\n3️⃣  Checking file permissions...")
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = Path(tmp) / "plain.md"
+        plain.write_text("plain", encoding='utf-8')
+        plain_mode = plain.stat().st_mode
+        written = Path(tmp) / "written.md"
+        atomic_write(written, b"new")
+        assert written.stat().st_mode == plain_mode, oct(written.stat().st_mode)
+        
+        written.chmod(0o640)
+        atomic_write(written, b"replaced")
+        assert written.stat().st_mode & 0o777 == 0o640
+        assert written.read_bytes() == b"replaced"
+    print(f"✅ New file {oct(plain_mode & 0o777)}, replaced file kept 0o640")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing section store...")
+    test_unchanged_sections_are_skipped()
+    test_stale_files_are_scoped_to_the_book()
+    test_atomic_write_permissions()
+    print("\n🎉 All section store tests passed!")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Streaming assembly test for the Advanced E-Book Generator
+Checks that the streamed book matches the old whole-string assembly byte for byte
+"""
+
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import yaml
+
+from utils.citation_manager import CitationManager
+from utils.pdf_builder import PDFBuilder
+from utils.template_engine import load_template
+
+CONFIG = yaml.safe_load((Path(__file__).parent / "config.yaml").read_text(encoding='utf-8'))
+TEMPLATE = """---
+title: "{{BOOK_TITLE}}"
+---
+
+{{PREFACE}}
+
+{{DEDICATION}}
+
+# Main
+
+{{MAIN_CONTENT}}
+
+{{GLOSSARY}}
+{{BIBLIOGRAPHY}}
+"""
+
+
+def legacy_compile_markdown(builder, topic, genre, content, citation_manager):
+    """_compile_markdown as it was: one growing string"""
+    
+    metadata = builder._generate_metadata(topic, genre)
+    front = [item for item in content if item['section']['type'] == 'front_matter']
+    back = [item for item in content if item['section']['type'] == 'back_matter']
+    main = [item for item in content if item['section']['type'] not in ('front_matter', 'back_matter')]
+    sections_md = ""
+    for item in front + main + back:
+        sections_md += builder._format_section(item)
+    return metadata + "\n\n" + builder._resolve_citations(sections_md, citation_manager)
+
+
+def legacy_main_content(builder, content, citation_manager):
+    """MAIN_CONTENT as it was: every section joined, then resolved"""
+    
+    parts = [
+        builder._format_section(item) for item in content
+        if item['section']['type'] not in ('front_matter', 'back_matter', 'preface')
+    ]
+    return builder._resolve_citations("\n\n".join(parts), citation_manager)
+
+
+def make_book(rng: random.Random, manager: CitationManager) -> list:
+    keys = [manager.add_citation({'title': f'Source {n}', 'url': f'https://example.org/{n}', 'authors': [f'Ann Author{n}'], 'year': 2020 + n}) for n in range(4)]
+    kinds = ['front_matter', 'preface', 'introduction', 'chapter', 'chapter', 'chapter', 'conclusion', 'back_matter']
+    content = []
+    for n in range(rng.randint(3, 12)):
+        lines = []
+        for _ in range(rng.randint(0, 6)):
+            line = rng.choice(["Plain text.", "Cited claim", "**Quiz:**", "", "- item"])
+            if rng.random() < 0.4:
+                line += f" [@{rng.choice(keys + ['invented2001'])}]"
+            lines.append(line)
+        text = "\n".join(lines) + "\n" * rng.randint(0, 3)
+        kind = rng.choice(kinds)
+        content.append({'section': {'title': 'Glossary' if kind == 'back_matter' else f'Section {n}', 'type': kind}, 'content': text})
+    return content
+
+
+def test_resolve_in_pieces():
+    """Resolving line-aligned pieces equals resolving the joined text"""
+    
+    print("\n1️⃣  Resolving citations piece by piece...")
+    rng = random.Random(44)
+    for mode in ("footnote", "author-date", "citeproc"):
+        for _ in range(200):
+            manager = CitationManager("APA")
+            text = "".join(item['content'] for item in make_book(rng, manager))
+            lines = text.splitlines(keepends=True)
+            cuts = sorted(rng.sample(range(len(lines) + 1), min(3, len(lines) + 1)))
+            pieces = ["".join(lines[a:b]) for a, b in zip([0] + cuts, cuts + [len(lines)])]
+            assert "".join(manager.resolve_citations_iter(pieces, mode)) == manager.resolve_citations(text, mode)
+    print("✅ 600 random texts identical in all modes")
+
+
+def test_streamed_book_matches_legacy():
+    """Template and fallback assembly write exactly what the string versions built"""
+    
+    print("\n2️⃣  Comparing streamed and whole-string books...")
+    rng = random.Random(2000)
+    with tempfile.TemporaryDirectory() as tmp:
+        template_path = Path(tmp) / "template.md"
+        template_path.write_text(TEMPLATE, encoding='utf-8')
+        for _ in range(100):
+            builder = PDFBuilder(CONFIG)
+            manager = CitationManager("APA")
+            content = make_book(rng, manager)
+            
+            builder.template_path = Path(tmp) / "missing.md"
+            assert builder._compile_markdown("Topic", "technical", content, manager) == legacy_compile_markdown(builder, "Topic", "technical", content, manager)
+            
+            builder.template_path = template_path
+            streamed = builder._compile_with_template("Topic", "technical", content, manager)
+            main = legacy_main_content(builder, content, manager)
+            after_heading = streamed.split("# Main\n\n", 1)[1]
+            assert after_heading.startswith(main) and after_heading[len(main):len(main) + 2] == "\n\n"
+    print("✅ 100 random books identical")
+
+
+def test_iterable_template_value():
+    """A generator value is written piece by piece"""
+    
+    print("\n3️⃣  Rendering a generator value...")
+    with tempfile.TemporaryDirectory() as tmp:
+        template_path = Path(tmp) / "t.md"
+        template_path.write_text("A {{X}} B {{Y}}", encoding='utf-8')
+        template = load_template(template_path)
+        assert template.render({'X': (s for s in ["1", "2", "3"]), 'Y': "y"}) == "A 123 B y"
+    print("✅ Generator rendered")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🧪 Testing streaming assembly")
+    print("=" * 60)
+    test_resolve_in_pieces()
+    test_streamed_book_matches_legacy()
+    test_iterable_template_value()
+    print("\n🎉 All streaming assembly tests passed!")
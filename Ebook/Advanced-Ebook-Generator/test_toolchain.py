@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Toolchain preflight test for the Advanced E-Book Generator
+Covers font substitution, missing engines and the on-disk report cache
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.toolchain import Toolchain, pick_font
+
+PDF_SETTINGS = {
+    'default_engine': 'no-such-xelatex',
+    'fallback_engine': 'no-such-pdflatex',
+    'font': {'main': 'Georgia', 'sans': 'Arial', 'mono': 'Courier New'}
+}
+
+
+def test_pick_font():
+    """Installed fonts win, then look-alikes, then the role's fallback"""
+    
+    print("\n1️⃣  Picking fonts...")
+    installed = {'georgia', 'liberation sans', 'dejavu sans mono'}
+    assert pick_font('Georgia', 'main', installed) == 'Georgia'
+    assert pick_font('Arial', 'sans', installed) == 'Liberation Sans'
+    assert pick_font('Courier New', 'mono', installed) == 'DejaVu Sans Mono'
+    assert pick_font('Papyrus', 'main', set()) is None
+    print("✅ Georgia kept, Arial -> Liberation Sans, Courier New -> DejaVu Sans Mono")
+
+
+def test_missing_engines_and_cache():
+    """Missing engines are reported without a compile, and the report is reused"""
+    
+    print("\n2️⃣  Probing a toolchain with no engines...")
+    filter_path = Path(__file__).parent / "filters" / "boxify.lua"
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = Path(tmp) / "toolchain.json"
+        report = Toolchain(PDF_SETTINGS, filter_path, cache_path).check()
+        assert report['engines'] == []
+        assert report['broken'] == {'no-such-xelatex': "not installed", 'no-such-pdflatex': "not installed"}
+        assert set(report['fonts']) == {'main', 'sans', 'mono'}
+        assert cache_path.exists()
+        
+        cached = Toolchain(PDF_SETTINGS, filter_path, cache_path)
+        cached._probe = None  # a cache hit never probes
+        assert cached.check() == report
+        
+        changed = Toolchain({**PDF_SETTINGS, 'font': {'main': 'Palatino'}}, filter_path, cache_path).check()
+        assert set(changed['fonts']) == {'main'}
+    print("✅ Engines reported missing; cached report reused until the settings change")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🧪 Testing the toolchain preflight")
+    print("=" * 60)
+    test_pick_font()
+    test_missing_engines_and_cache()
+    print("\n🎉 All toolchain tests passed!")
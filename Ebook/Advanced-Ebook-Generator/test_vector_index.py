@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Vector index test for the Advanced E-Book Generator
+Covers nearest-neighbour search, memory-mapped persistence and reloading an index
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from utils.vector_index import VectorIndex
+
+RESULTS = [
+    {'title': "Photovoltaics", 'link': "https://example.com/pv", 'source': "Google Search",
+     'snippet': "Solar panels convert sunlight into electricity with silicon cells."},
+    {'title': "Wind", 'link': "https://example.com/wind", 'source': "Google Search",
+     'snippet': "Wind turbines turn the kinetic energy of moving air into power."},
+    {'title': "Storage", 'link': "https://example.com/storage", 'source': "Wikipedia",
+     'snippet': "Lithium batteries store energy for use when demand peaks."},
+]
+
+
+def test_nearest_neighbours():
+    """Each query finds the chunk about its subject first"""
+    
+    print("\n1️⃣  Searching an in-memory index...")
+    index = VectorIndex()
+    assert index.add_research(RESULTS, book="Energy") == 3
+    assert index.add_research(RESULTS) == 0  # the same chunks are not indexed twice
+    
+    hits = index.search(["solar cells and sunlight", "turbines in the wind", "battery storage"], k=2)
+    assert [query_hits[0]['title'] for query_hits in hits] == ["Photovoltaics", "Wind", "Storage"]
+    assert all(len(query_hits) <= 2 for query_hits in hits)
+    assert hits[0][0]['score'] > hits[0][-1]['score']
+    
+    sections = [{'title': "Solar Power", 'subsections': ["Silicon cells", "Sunlight"]}]
+    retrieved = index.retrieve_for_sections(sections, k=1)
+    assert [result['title'] for result in retrieved["Solar Power"]] == ["Photovoltaics"]
+    assert set(retrieved["Solar Power"][0]) == {'title', 'link', 'snippet', 'source'}
+    print("✅ Nearest chunks found for all three queries")
+
+
+def test_persistence_and_reload():
+    """A saved index reopens memory-mapped, with the same results, and can be extended"""
+    
+    print("\n2️⃣  Saving, reopening and extending an index...")
+    with tempfile.TemporaryDirectory() as tmp:
+        index = VectorIndex(tmp)
+        index.add_research(RESULTS[:2], book="Energy")
+        index.save()
+        before = index.search(["solar cells"], k=2)
+        
+        reopened = VectorIndex(tmp)
+        assert isinstance(reopened.vectors, np.memmap)
+        assert len(reopened) == 2
+        assert reopened.search(["solar cells"], k=2) == before
+        
+        # The next book adds to the same index; pending chunks are searchable before save
+        reopened.add_research(RESULTS, book="Storage")
+        assert len(reopened) == 3
+        assert reopened.search(["battery storage"], k=1)[0][0]['title'] == "Storage"
+        reopened.save()
+        assert len(VectorIndex(tmp)) == 3
+        
+        try:
+            VectorIndex(tmp, dim=256)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("an index opened with the wrong dimension should fail")
+    print("✅ Reloaded index matches; extended to 3 chunks")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing vector index...")
+    test_nearest_neighbours()
+    test_persistence_and_reload()
+    print("\n🎉 All vector index tests passed!")
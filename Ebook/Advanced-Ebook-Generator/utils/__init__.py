@@ -6,10 +6,46 @@ from .content_generator import ContentGenerator
 from .research_engine import ResearchEngine
 from .citation_manager import CitationManager
 from .pdf_builder import PDFBuilder
+from .context_ranker import ContextRanker
+from .vector_index import VectorIndex
+from .scholarly_sources import ScholarlySource, ArxivSource
+from .query_planner import QueryPlanner, QueryBudget
+from .citation_store import CitationStore
+from .latex_fragments import FragmentCache
+from .parallel_build import ParallelBuild
+from .template_engine import CompiledTemplate, load_template
+from .latex_format import PreambleFormat
+from .format_export import FormatExporter
+from .section_store import SectionStore
+from .image_optimizer import ImageOptimizer
+from .pdf_optimizer import optimize_pdf, optimize_batch
+from .build_report import BuildTimer, parse_latex_log
+from .recompiler import Recompiler, SectionWatcher
 
 __all__ = [
     'ContentGenerator',
     'ResearchEngine',
     'CitationManager',
-    'PDFBuilder'
+    'PDFBuilder',
+    'ContextRanker',
+    'VectorIndex',
+    'ScholarlySource',
+    'ArxivSource',
+    'QueryPlanner',
+    'QueryBudget',
+    'CitationStore',
+    'FragmentCache',
+    'ParallelBuild',
+    'CompiledTemplate',
+    'load_template',
+    'PreambleFormat',
+    'FormatExporter',
+    'SectionStore',
+    'ImageOptimizer',
+    'optimize_pdf',
+    'optimize_batch',
+    'BuildTimer',
+    'parse_latex_log',
+    'Recompiler',
+    'SectionWatcher'
 ]
@@ -0,0 +1,137 @@
+"""
+Build Report Module
+Times the stages of a PDF build and pulls page counts and warnings out of the LaTeX logs, saved as JSON beside the PDF
+"""
+
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+from .parallel_build import RERUN_PATTERN
+
+
+# Bump when the report layout changes
+REPORT_VERSION = "1"
+
+OUTPUT_WRITTEN = re.compile(r'^Output written on .*?\((\d+) pages?', re.MULTILINE)
+OVERFULL = re.compile(r'^Overfull \\([hv])box', re.MULTILINE)
+UNDERFULL = re.compile(r'^Underfull \\([hv])box', re.MULTILINE)
+FONT_SHAPE = re.compile(r"^LaTeX Font Warning: Font shape `([^']*)' undefined\s*\n\(Font\)\s+using `([^']*)' instead", re.MULTILINE)
+MISSING_CHARACTER = re.compile(r'^Missing character: There is no (.+?) in font (.+?)!', re.MULTILINE)
+UNDEFINED_REFERENCE = re.compile(r"^LaTeX Warning: (?:Reference|Citation) `", re.MULTILINE)
+LATEX_ERROR = re.compile(r'^! (.+)$', re.MULTILINE)
+
+
+def parse_latex_log(text: str) -> dict:
+    """Page count and warning counts from one engine log
+    
+    ``font_substitutions`` lists "requested -> used" pairs; missing
+    characters are counted per font.
+    """
+    
+    pages = OUTPUT_WRITTEN.findall(text)
+    overfull = OVERFULL.findall(text)
+    underfull = UNDERFULL.findall(text)
+    missing = {}
+    for _, font in MISSING_CHARACTER.findall(text):
+        missing[font] = missing.get(font, 0) + 1
+    return {
+        'pages': int(pages[-1]) if pages else None,
+        'overfull_hbox': overfull.count('h'),
+        'overfull_vbox': overfull.count('v'),
+        'underfull_hbox': underfull.count('h'),
+        'underfull_vbox': underfull.count('v'),
+        'font_substitutions': sorted({f"{wanted} -> {used}" for wanted, used in FONT_SHAPE.findall(text)}),
+        'missing_characters': missing,
+        'undefined_references': len(UNDEFINED_REFERENCE.findall(text)),
+        'rerun_warnings': sum(1 for line in text.splitlines() if RERUN_PATTERN.search(line)),
+        'errors': LATEX_ERROR.findall(text)[:10]
+    }
+
+
+def merge_log_stats(stats: List[dict]) -> dict:
+    """Totals over the logs of a book compiled in parts"""
+    
+    merged = parse_latex_log("")
+    merged['pages'] = sum(item['pages'] or 0 for item in stats) if any(item['pages'] for item in stats) else None
+    for item in stats:
+        for key in ('overfull_hbox', 'overfull_vbox', 'underfull_hbox', 'underfull_vbox', 'undefined_references', 'rerun_warnings'):
+            merged[key] += item[key]
+        for font, count in item['missing_characters'].items():
+            merged['missing_characters'][font] = merged['missing_characters'].get(font, 0) + count
+        merged['errors'] += item['errors']
+    merged['font_substitutions'] = sorted({entry for item in stats for entry in item['font_substitutions']})
+    merged['errors'] = merged['errors'][:10]
+    return merged
+
+
+def analyze_logs(log_paths: List[Path]) -> dict:
+    """parse_latex_log over every log that exists, merged, plus the logs read"""
+    
+    paths = [Path(path) for path in log_paths if Path(path).exists()]
+    stats = merge_log_stats([parse_latex_log(path.read_text(encoding='utf-8', errors='replace')) for path in paths])
+    stats['logs'] = [str(path) for path in paths]
+    return stats
+
+
+class BuildTimer:
+    """Wall-clock timings for the stages of one build
+    
+    Stages are recorded in the order they finish, each with its name,
+    seconds, whether it succeeded and any details the caller attaches, so
+    a failed engine followed by its fallback shows up as two entries.
+    """
+    
+    def __init__(self):
+        """Start timing"""
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self.stages = []
+    
+    @contextmanager
+    def stage(self, name: str, **details):
+        """Time the block as one stage; the yielded dict takes extra details"""
+        
+        entry = {'name': name, **details}
+        start = time.perf_counter()
+        try:
+            yield entry
+            entry['ok'] = True
+        except BaseException as e:
+            entry['ok'] = False
+            entry['error'] = str(e).strip()[:2000]
+            raise
+        finally:
+            entry['offset'] = round(start - self._start, 3)
+            entry['seconds'] = round(time.perf_counter() - start, 3)
+            self.stages.append(entry)
+    
+    def total(self) -> float:
+        """Seconds since the timer started"""
+        return round(time.perf_counter() - self._start, 3)
+    
+    def summary(self) -> str:
+        """The three slowest stages on one line, repeated stages (engine fallbacks) added up"""
+        
+        totals = {}
+        for entry in self.stages:
+            totals[entry['name']] = totals.get(entry['name'], 0) + entry['seconds']
+        slowest = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:3]
+        return ", ".join(f"{name} {seconds:.1f}s" for name, seconds in slowest)
+
+
+def write_report(path: Path, report: dict) -> Path:
+    """Save a build report as JSON (atomically, so trackers never read half a file)"""
+    
+    path = Path(path)
+    report = {'version': REPORT_VERSION, **report}
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+    os.replace(tmp_path, path)
+    return path
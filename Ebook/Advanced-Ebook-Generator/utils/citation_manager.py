@@ -3,32 +3,248 @@ Citation Manager Module
 Handles citations and bibliography generation
 """
 
-from typing import List, Dict
+import json
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
 from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+STYLES = ("APA", "MLA", "Chicago", "Harvard")
+PLACEHOLDER_AUTHORS = {'unknown author', 'web source'}
+
+# [@key] or [@key1; @key2] as written by the model
+CITATION_PATTERN = re.compile(r'( ?)\[(@[\w:.-]+(?:\s*[;,]\s*@[\w:.-]+)*)\]')
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid')
+BIBTEX_SPECIAL = re.compile(r'([&%$#_{}])')
+
+
+def normalize_doi(doi: str) -> str:
+    """Lowercase DOI without resolver prefix"""
+    doi = doi.strip().lower()
+    for prefix in ('https://doi.org/', 'http://doi.org/', 'https://dx.doi.org/', 'http://dx.doi.org/', 'doi:'):
+        if doi.startswith(prefix):
+            doi = doi[len(prefix):]
+    return doi
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a URL: https, no www, no fragment, no tracking params, no trailing slash"""
+    
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    ))
+    path = parts.path.rstrip('/')
+    return urlunsplit(('https', host, path, query, ''))
+
+
+def _ascii_word(text: str) -> str:
+    """Lowercase ASCII letters/digits only"""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]', '', text.lower())
 
 
 class CitationManager:
-    """Manages citations and bibliography"""
+    """Manages citations and bibliography
     
-    def __init__(self, style: str = "APA"):
-        """Initialize citation manager"""
+    Citations are indexed by normalized DOI, URL or title+year, so adding the
+    same source twice returns the existing entry. Every entry gets a stable
+    citation key (``smith2023``, ``smith2023a``...) usable as ``[@smith2023]``.
+    """
+    
+    def __init__(self, style: str = "APA", store=None):
+        """Initialize citation manager
+        
+        store is an optional CitationStore shared across runs; it supplies
+        known metadata and pre-rendered strings and records usage counts.
+        """
         self.style = style
         self.citations = []
+        self.store = store
+        
+        self._index = {}
+        self._by_key = {}
+        self._identities = {}
+        self._synced_count = 0
+        self._key_suffixes = {}
+        self._formatted = {}
+        
+        # Incremental bibliography state
+        self._rendered = []
+        self._rendered_count = 0
+        self._rendered_style = None
+    
+    def __len__(self) -> int:
+        return len(self.citations)
+    
+    def identity(self, citation_data: Dict) -> str:
+        """Deduplication key: DOI, then normalized URL, then title + year"""
+        
+        doi = citation_data.get('doi')
+        if doi:
+            return f"doi:{normalize_doi(doi)}"
+        
+        url = citation_data.get('url')
+        if url:
+            return f"url:{normalize_url(url)}"
+        
+        title = " ".join(_ascii_word(w) for w in citation_data.get('title', '').split())
+        return f"title:{title}|{citation_data.get('year', '')}"
+    
+    def add_citation(self, citation_data: Dict, key: Optional[str] = None) -> str:
+        """Add a citation (or find the existing one) and return its key
+        
+        ``key`` keeps a key the citation already has elsewhere, such as an
+        exported references file, unless another citation holds it.
+        """
+        
+        identity = self.identity(citation_data)
+        existing = self._index.get(identity)
+        
+        if existing is not None:
+            # Fill in metadata the first sighting lacked
+            for field, value in citation_data.items():
+                if field == 'key' or not value:
+                    continue
+                if field == 'authors' and existing.get('authors') and not self._has_placeholder_authors(existing):
+                    continue
+                if field not in existing or not existing[field] or field == 'authors':
+                    existing[field] = value
+                    self._invalidate(existing['key'])
+            return existing['key']
+        
+        entry = dict(citation_data)
+        entry['key'] = key if key and key not in self._by_key else self._make_key(entry)
+        
+        self.citations.append(entry)
+        self._index[identity] = entry
+        self._by_key[entry['key']] = entry
+        self._identities[entry['key']] = identity
+        return entry['key']
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """Look up a citation by its key"""
+        return self._by_key.get(key)
+    
+    def _has_placeholder_authors(self, entry: Dict) -> bool:
+        authors = entry.get('authors') or []
+        return all(a.lower() in PLACEHOLDER_AUTHORS for a in authors)
+    
+    def _make_key(self, entry: Dict) -> str:
+        """Author surname (or first title word) + year, with a/b/c suffixes on collision"""
+        
+        stem = ""
+        if not self._has_placeholder_authors(entry):
+            stem = _ascii_word(entry['authors'][0].split()[-1]) if entry['authors'][0].split() else ""
+        if not stem:
+            for word in entry.get('title', '').split():
+                stem = _ascii_word(word)
+                if len(stem) > 3:
+                    break
+        stem = (stem or "ref")[:20]
+        
+        base = f"{stem}{entry.get('year', '')}"
+        key = base
+        suffix = self._key_suffixes.get(base, 0)
+        while key in self._by_key:
+            key = base + self._suffix(suffix)
+            suffix += 1
+        self._key_suffixes[base] = suffix
+        return key
+    
+    @staticmethod
+    def _suffix(n: int) -> str:
+        """a, b, ..., z, aa, ab, ..."""
+        letters = ""
+        n += 1
+        while n:
+            n, rem = divmod(n - 1, 26)
+            letters = chr(ord('a') + rem) + letters
+        return letters
+    
+    def sync_store(self):
+        """Exchange entries added since the last sync with the shared store
+        
+        One bulk lookup fetches stored metadata and the pre-rendered string
+        for the current style. Stored metadata wins unless this run found
+        real authors for a generic source; entries the store already knows
+        completely reuse its string, new or improved entries are written
+        back with all four styles rendered. Each synced entry counts as one use.
+        """
+        
+        if self.store is None or self._synced_count >= len(self.citations):
+            return
+        
+        new_entries = self.citations[self._synced_count:]
+        identities = [self._identities[entry['key']] for entry in new_entries]
+        stored = self.store.lookup_identities(identities, style=self.style)
+        
+        upserts = []
+        for entry, identity in zip(new_entries, identities):
+            row = stored.get(identity)
+            improved = row is None
+            
+            if row is not None:
+                if self._has_placeholder_authors(row) and not self._has_placeholder_authors(entry):
+                    # This run found real authorship for a generic stored source
+                    improved = True
+                    for field in ('title', 'url', 'doi', 'year', 'source'):
+                        if not entry.get(field) and row.get(field):
+                            entry[field] = row[field]
+                else:
+                    # Stored metadata is canonical; only fill gaps it has
+                    for field in ('title', 'url', 'doi', 'year', 'source', 'authors'):
+                        if row.get(field):
+                            entry[field] = row[field]
+                        elif entry.get(field):
+                            improved = True
+            
+            if improved:
+                rendered = {style: self.format_citation(entry, style) for style in STYLES}
+                upserts.append({**entry, 'identity': identity, 'rendered': rendered})
+                for style, text in rendered.items():
+                    self._formatted.setdefault(style, {})[entry['key']] = text
+            elif 'rendered' in row:
+                self._formatted.setdefault(self.style, {})[entry['key']] = row['rendered']
+        
+        self.store.upsert(upserts)
+        self.store.record_usage(identities)
+        self._synced_count = len(self.citations)
     
-    def add_citation(self, citation_data: Dict):
-        """Add a citation"""
-        self.citations.append(citation_data)
+    def _invalidate(self, key: str):
+        """Drop cached formatting for an entry whose metadata changed"""
+        for style in list(self._formatted):
+            self._formatted[style].pop(key, None)
+        self._rendered_style = None
     
-    def format_citation(self, citation_data: Dict) -> str:
+    def format_key(self, key: str, style: Optional[str] = None) -> str:
+        """Formatted citation for a key, cached per style"""
+        
+        style = style or self.style
+        cache = self._formatted.setdefault(style, {})
+        if key not in cache:
+            cache[key] = self.format_citation(self._by_key[key], style)
+        return cache[key]
+    
+    def format_citation(self, citation_data: Dict, style: Optional[str] = None) -> str:
         """Format a single citation based on style"""
         
-        if self.style == "APA":
+        style = style or self.style
+        
+        if style == "APA":
             return self._format_apa(citation_data)
-        elif self.style == "MLA":
+        elif style == "MLA":
             return self._format_mla(citation_data)
-        elif self.style == "Chicago":
+        elif style == "Chicago":
             return self._format_chicago(citation_data)
-        elif self.style == "Harvard":
+        elif style == "Harvard":
             return self._format_harvard(citation_data)
         else:
             return self._format_apa(citation_data)
@@ -133,8 +349,179 @@ class CitationManager:
         else:
             return f"{authors[0]} et al."
     
+    def resolve_citations(self, text: str, mode: str = "footnote") -> str:
+        """Replace inline [@key] markers in one linear pass
+        
+        Modes:
+        - "footnote": pandoc footnote references, definitions appended once
+        - "author-date": (Smith, 2023) pointing at the bibliography
+        - "citeproc": kept as [@key] for pandoc --citeproc
+        Unknown keys (e.g. invented by the model) are dropped.
+        """
+        return "".join(self.resolve_citations_iter([text], mode))
+    
+    def resolve_citations_iter(self, chunks: Iterable[str], mode: str = "footnote") -> Iterator[str]:
+        """resolve_citations over text arriving in pieces, yielding resolved pieces
+        
+        Markers never span lines, so each piece is resolved on its own; the
+        footnote definitions for the whole text follow the last piece. Only
+        trailing newlines are held back (the notes replace them), so memory
+        stays bounded by the largest piece.
+        """
+        
+        self.sync_store()
+        used = {}
+        
+        def replace(match):
+            keys = [k.strip().lstrip('@').rstrip('.') for k in re.split(r'[;,]', match.group(2))]
+            known = [k for k in keys if k in self._by_key]
+            if not known:
+                return ""
+            if mode == "citeproc":
+                return match.group(1) + "[" + "; ".join(f"@{k}" for k in known) + "]"
+            if mode == "author-date":
+                return match.group(1) + "(" + "; ".join(self._author_date(self._by_key[k]) for k in known) + ")"
+            for k in known:
+                used.setdefault(k, None)
+            return "".join(f"[^{k}]" for k in known)
+        
+        pending = ""
+        for chunk in chunks:
+            resolved = CITATION_PATTERN.sub(replace, chunk)
+            body = resolved.rstrip('\n')
+            if body:
+                yield pending + body
+                pending = ""
+            pending += resolved[len(body):]
+        
+        if used:
+            yield "\n\n" + "".join(f"[^{k}]: {self.format_key(k)}\n" for k in used)
+        else:
+            yield pending
+    
+    def _author_date(self, entry: Dict) -> str:
+        """Short in-text form: first author surname and year"""
+        
+        if self._has_placeholder_authors(entry) or not entry['authors'][0].split():
+            name = entry.get('title', 'Untitled')
+        else:
+            name = entry['authors'][0].split()[-1]
+        year = entry.get('year', '')
+        return f"{name}, {year}" if year else name
+    
+    def to_csl_json(self) -> List[Dict]:
+        """Citations as CSL-JSON items for pandoc --citeproc"""
+        
+        items = []
+        for entry in self.citations:
+            if entry.get('doi'):
+                item_type = 'article-journal'
+            elif entry.get('url'):
+                item_type = 'webpage'
+            else:
+                item_type = 'document'
+            
+            item = {'id': entry['key'], 'type': item_type, 'title': entry.get('title', 'Untitled')}
+            if not self._has_placeholder_authors(entry):
+                item['author'] = [self._csl_name(name) for name in entry['authors']]
+            if entry.get('year'):
+                item['issued'] = {'date-parts': [[int(entry['year'])]]}
+            if entry.get('source'):
+                item['container-title'] = entry['source']
+            if entry.get('url'):
+                item['URL'] = entry['url']
+            if entry.get('doi'):
+                item['DOI'] = normalize_doi(entry['doi'])
+            items.append(item)
+        
+        return items
+    
+    @staticmethod
+    def _csl_name(name: str) -> Dict:
+        """'Jane Q. Smith' -> family/given; single-word names stay literal"""
+        parts = name.split()
+        if len(parts) < 2:
+            return {'literal': name}
+        return {'family': parts[-1], 'given': " ".join(parts[:-1])}
+    
+    @classmethod
+    def from_csl_json(cls, path: str, style: str = "APA") -> 'CitationManager':
+        """Citations read back from a to_csl_json/export file, keeping their keys
+        
+        Lets a book be rebuilt from its saved sections without the research
+        run that collected the sources.
+        """
+        
+        with open(path, 'r', encoding='utf-8') as f:
+            items = json.load(f)
+        
+        manager = cls(style=style)
+        for item in items:
+            names = [
+                name.get('literal') or f"{name.get('given', '')} {name.get('family', '')}".strip()
+                for name in item.get('author', [])
+            ]
+            entry = {
+                'title': item.get('title', 'Untitled'),
+                'authors': names or ['Unknown Author'],
+                'year': int(item['issued']['date-parts'][0][0]) if item.get('issued') else None,
+                'source': item.get('container-title', ''),
+                'url': item.get('URL', ''),
+                'doi': item.get('DOI', '')
+            }
+            manager.add_citation({field: value for field, value in entry.items() if value}, key=item['id'])
+        return manager
+    
+    def to_bibtex(self) -> str:
+        """Citations as BibTeX entries"""
+        
+        def escape(value) -> str:
+            return BIBTEX_SPECIAL.sub(r'\\\1', str(value))
+        
+        records = []
+        for entry in self.citations:
+            fields = [('title', "{" + escape(entry.get('title', 'Untitled')) + "}")]
+            if not self._has_placeholder_authors(entry):
+                fields.append(('author', " and ".join(escape(a) for a in entry['authors'])))
+            if entry.get('year'):
+                fields.append(('year', escape(entry['year'])))
+            if entry.get('source'):
+                fields.append(('journal' if entry.get('doi') else 'howpublished', escape(entry['source'])))
+            if entry.get('doi'):
+                fields.append(('doi', normalize_doi(entry['doi'])))
+            if entry.get('url'):
+                fields.append(('url', entry['url']))
+            
+            entry_type = 'article' if entry.get('doi') else 'misc'
+            body = ",\n".join(f"  {name} = {{{value}}}" for name, value in fields)
+            records.append(f"@{entry_type}{{{entry['key']},\n{body}\n}}\n")
+        
+        return "\n".join(records)
+    
+    def export(self, base_path: str) -> Dict[str, Path]:
+        """Write <base>.json (CSL-JSON) and <base>.bib next to the compiled markdown"""
+        
+        self.sync_store()
+        base_path = Path(base_path)
+        paths = {
+            'csl_json': base_path.with_suffix('.json'),
+            'bibtex': base_path.with_suffix('.bib')
+        }
+        
+        with open(paths['csl_json'], 'w', encoding='utf-8') as f:
+            json.dump(self.to_csl_json(), f, ensure_ascii=False, indent=2)
+        with open(paths['bibtex'], 'w', encoding='utf-8') as f:
+            f.write(self.to_bibtex())
+        
+        return paths
+    
     def generate_bibliography(self) -> str:
-        """Generate complete bibliography"""
+        """Generate complete bibliography
+        
+        Only citations added since the previous call are formatted; they are
+        merged into the already-sorted entries. Changing the style or
+        updating an entry's metadata triggers a full re-render.
+        """
         
         if not self.citations:
             return """## Bibliography
@@ -143,17 +530,31 @@ class CitationManager:
 Specific citations are available upon request.*
 """
         
-        bib_text = f"## Bibliography\n\n*Citations formatted in {self.style} style*\n\n"
+        self.sync_store()
         
-        for citation in sorted(self.citations, key=lambda x: x.get('authors', [''])[0]):
-            bib_text += f"- {self.format_citation(citation)}\n\n"
+        if self._rendered_style != self.style:
+            self._rendered = []
+            self._rendered_count = 0
+            self._rendered_style = self.style
+        
+        for position in range(self._rendered_count, len(self.citations)):
+            citation = self.citations[position]
+            sort_key = (citation.get('authors', [''])[0], position)
+            self._rendered.append((sort_key, self.format_key(citation['key'])))
+        self._rendered_count = len(self.citations)
+        
+        # Timsort merges the already-sorted run with the new tail in linear time
+        self._rendered.sort()
+        
+        bib_text = f"## Bibliography\n\n*Citations formatted in {self.style} style*\n\n"
+        bib_text += "".join(f"- {line}\n\n" for _, line in self._rendered)
         
         return bib_text
     
-    def add_web_source(self, title: str, url: str, authors: List[str] = None, year: int = None):
+    def add_web_source(self, title: str, url: str, authors: List[str] = None, year: int = None) -> str:
         """Add a web source citation"""
         
-        self.add_citation({
+        return self.add_citation({
             'title': title,
             'url': url,
             'authors': authors or ['Web Source'],
@@ -0,0 +1,177 @@
+"""
+Citation Store Module
+Persistent SQLite store of citation metadata shared by all generator runs
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Dict, Iterable, Optional
+
+from .citation_manager import normalize_url
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS citations (
+    identity TEXT PRIMARY KEY,
+    url TEXT,
+    url_norm TEXT,
+    doi TEXT,
+    title TEXT NOT NULL,
+    authors TEXT NOT NULL,
+    year INTEGER,
+    source TEXT,
+    usage_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_citations_url ON citations(url_norm);
+CREATE TABLE IF NOT EXISTS rendered (
+    identity TEXT NOT NULL REFERENCES citations(identity) ON DELETE CASCADE,
+    style TEXT NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (identity, style)
+);
+"""
+
+# SQLite's default limit on host parameters is 999
+LOOKUP_CHUNK = 900
+
+
+class CitationStore:
+    """Normalized citation metadata, pre-rendered strings per style and usage counts
+    
+    Rows are keyed by the same identity CitationManager uses for
+    deduplication (normalized DOI, URL or title+year); ``url_norm`` holds the
+    normalized URL so a bulk lookup by URL is a single indexed query.
+    """
+    
+    def __init__(self, path: str):
+        """Open (or create) the store"""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+    
+    def close(self):
+        self._conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def upsert(self, entries: Iterable[Dict]):
+        """Insert or refresh entries (dicts with 'identity', metadata and 'rendered')
+        
+        Existing metadata is only overwritten by non-empty values, and the
+        pre-rendered strings are replaced whenever they are supplied.
+        """
+        
+        with self._lock, self._conn:
+            for entry in entries:
+                self._conn.execute(
+                    """
+                    INSERT INTO citations (identity, url, url_norm, doi, title, authors, year, source)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(identity) DO UPDATE SET
+                        url = COALESCE(NULLIF(excluded.url, ''), url),
+                        url_norm = COALESCE(NULLIF(excluded.url_norm, ''), url_norm),
+                        doi = COALESCE(NULLIF(excluded.doi, ''), doi),
+                        title = COALESCE(NULLIF(excluded.title, ''), title),
+                        authors = CASE
+                            WHEN excluded.authors IN ('[]', '["Web Source"]', '["Unknown Author"]') THEN authors
+                            ELSE excluded.authors
+                        END,
+                        year = COALESCE(excluded.year, year),
+                        source = COALESCE(NULLIF(excluded.source, ''), source)
+                    """,
+                    (
+                        entry['identity'],
+                        entry.get('url', ''),
+                        normalize_url(entry['url']) if entry.get('url') else '',
+                        entry.get('doi', ''),
+                        entry.get('title', ''),
+                        json.dumps(entry.get('authors', [])),
+                        entry.get('year'),
+                        entry.get('source', '')
+                    )
+                )
+                for style, text in entry.get('rendered', {}).items():
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO rendered (identity, style, text) VALUES (?, ?, ?)",
+                        (entry['identity'], style, text)
+                    )
+    
+    def record_usage(self, identities: Iterable[str]):
+        """Increment the usage count of each identity by one"""
+        
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE citations SET usage_count = usage_count + 1 WHERE identity = ?",
+                [(identity,) for identity in identities]
+            )
+    
+    def lookup_identities(self, identities: List[str], style: Optional[str] = None) -> Dict[str, Dict]:
+        """Bulk lookup by identity"""
+        return self._lookup("identity", identities, style)
+    
+    def lookup_urls(self, urls: List[str], style: Optional[str] = None) -> Dict[str, Dict]:
+        """Bulk lookup by URL (normalized before matching), keyed by the URLs given"""
+        
+        by_norm = {normalize_url(url): url for url in urls if url}
+        found = self._lookup("url_norm", list(by_norm), style)
+        return {by_norm[norm]: entry for norm, entry in found.items()}
+    
+    def _lookup(self, column: str, values: List[str], style: Optional[str]) -> Dict[str, Dict]:
+        """One indexed query per chunk of values, joined with the rendered string for style"""
+        
+        found = {}
+        values = list(dict.fromkeys(v for v in values if v))
+        
+        with self._lock:
+            for start in range(0, len(values), LOOKUP_CHUNK):
+                chunk = values[start:start + LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"""
+                    SELECT c.*, r.text AS rendered_text
+                    FROM citations c
+                    LEFT JOIN rendered r ON r.identity = c.identity AND r.style = ?
+                    WHERE c.{column} IN ({placeholders})
+                    """,
+                    [style or ""] + chunk
+                ).fetchall()
+                for row in rows:
+                    found[row[column]] = self._row_to_entry(row)
+        
+        return found
+    
+    @staticmethod
+    def _row_to_entry(row: sqlite3.Row) -> Dict:
+        entry = {
+            'identity': row['identity'],
+            'title': row['title'],
+            'authors': json.loads(row['authors']),
+            'source': row['source'],
+            'usage_count': row['usage_count']
+        }
+        for field in ('url', 'doi', 'year'):
+            if row[field]:
+                entry[field] = row[field]
+        if row['rendered_text'] is not None:
+            entry['rendered'] = row['rendered_text']
+        return entry
+    
+    def most_used(self, limit: int = 20) -> List[Dict]:
+        """The most frequently cited sources across all runs"""
+        
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT *, NULL AS rendered_text FROM citations ORDER BY usage_count DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [self._row_to_entry(row) for row in rows]
@@ -6,9 +6,12 @@ Handles AI-powered content generation with genre-specific customization
 import time
 import json
 import re
+from datetime import datetime
 from typing import List, Dict, Optional
 import google.generativeai as genai
 
+from .context_ranker import ContextRanker
+
 
 class ContentGenerator:
     """AI-powered content generator with advanced features"""
@@ -27,6 +30,12 @@ class ContentGenerator:
         # Rate limiting settings
         self.rate_limit_delay = config['api_settings']['rate_limit_delay']
         self.max_retries = config['api_settings']['max_retries']
+        
+        # Research context ranking
+        research_settings = config.get('research_settings', {})
+        self.context_ranker = ContextRanker(
+            token_budget=research_settings.get('context_token_budget', 600)
+        )
     
     def generate_outline(self, topic: str, num_chapters: int, length_config: dict) -> List[Dict]:
         """Generate book outline with custom structure"""
@@ -107,9 +116,15 @@ Make this outline worthy of a bestselling {self.genre} book about {topic}.
         section: Dict,
         research_context: List[Dict],
         features: Dict,
-        words_target: int
+        words_target: int,
+        citation_manager=None
     ) -> str:
-        """Generate content for a specific section with enhancements"""
+        """Generate content for a specific section with enhancements
+        
+        When a citation_manager is given, every research passage used in the
+        prompt is registered as a citation and labelled with its key, and the
+        model is asked to cite facts inline as [@key].
+        """
         
         section_type = section['type']
         section_title = section['title']
@@ -117,10 +132,20 @@ Make this outline worthy of a bestselling {self.genre} book about {topic}.
         
         # Build research context
         research_text = ""
-        if research_context:
+        passages = self.context_ranker.select(research_context, section_title, subsections)
+        if passages:
             research_text = "\n\nResearch Context:\n"
-            for idx, result in enumerate(research_context[:3], 1):
-                research_text += f"{idx}. {result.get('title', 'No title')}: {result.get('snippet', 'No description')}\n"
+            for idx, passage in enumerate(passages, 1):
+                if citation_manager is not None:
+                    key = citation_manager.add_citation(self._passage_citation(passage))
+                    research_text += f"{idx}. [@{key}] {passage['title']}: {passage['text']}\n"
+                else:
+                    research_text += f"{idx}. {passage['title']}: {passage['text']}\n"
+            if citation_manager is not None:
+                research_text += (
+                    "\nWhen you use a fact from the research context, cite it inline with its key "
+                    "exactly as shown, e.g. [@key]. Only use the keys listed above.\n"
+                )
         
         # Build enhancement instructions
         enhancement_instructions = ""
@@ -157,6 +182,20 @@ Make this outline worthy of a bestselling {self.genre} book about {topic}.
         
         return content
     
+    def _passage_citation(self, passage: Dict) -> Dict:
+        """Citation record for a research passage"""
+        
+        citation = {
+            'title': passage['title'],
+            'url': passage.get('link', ''),
+            'authors': passage.get('authors') or ['Web Source'],
+            'year': passage.get('year') or datetime.now().year,
+            'source': passage.get('source') or 'Online'
+        }
+        if passage.get('doi'):
+            citation['doi'] = passage['doi']
+        return citation
+    
     def _get_preface_prompt(self, topic: str, words_target: int) -> str:
         """Generate prompt for preface section"""
         return f"""You are writing the preface for a professional {self.genre} book about "{topic}".
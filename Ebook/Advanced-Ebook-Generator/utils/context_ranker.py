@@ -0,0 +1,203 @@
+"""
+Context Ranker Module
+Ranks research results against a section and packs them into a token budget
+"""
+
+import re
+from typing import List, Dict, Optional
+
+import numpy as np
+
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have how in into is it its of on or
+that the their this to was were what when where which who why will with your
+you chapter section introduction conclusion understanding
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token estimate (~1.3 tokens per English word)"""
+    return max(1, int(len(text.split()) * 1.3 + 0.5))
+
+
+def split_passages(results: List[Dict], passage_words: int = 60) -> List[Dict]:
+    """Turn snippets and extracted page text into passages of bounded length"""
+    
+    passages = []
+    for result in results:
+        base = {
+            'title': result.get('title', 'No title'),
+            'link': result.get('link', ''),
+            'source': result.get('source', ''),
+        }
+        # Bibliographic metadata travels with the passage for citation capture
+        for field in ('authors', 'year', 'doi'):
+            if result.get(field):
+                base[field] = result[field]
+        
+        snippet = " ".join(result.get('snippet', '').split())
+        if snippet:
+            passages.append({**base, 'text': snippet, 'tokens': estimate_tokens(snippet)})
+        
+        page_text = result.get('text', '')
+        if not page_text:
+            continue
+        
+        window = []
+        for sentence in SENTENCE_PATTERN.split(" ".join(page_text.split())):
+            window.append(sentence)
+            if sum(len(s.split()) for s in window) >= passage_words:
+                text = " ".join(window)
+                passages.append({**base, 'text': text, 'tokens': estimate_tokens(text)})
+                window = []
+        if window:
+            text = " ".join(window)
+            passages.append({**base, 'text': text, 'tokens': estimate_tokens(text)})
+    
+    return passages
+
+
+class ContextRanker:
+    """BM25 ranking, near-duplicate removal and budget packing of research passages"""
+    
+    def __init__(
+        self,
+        token_budget: int = 600,
+        k1: float = 1.5,
+        b: float = 0.75,
+        dedupe_threshold: float = 0.8,
+        passage_words: int = 60
+    ):
+        """Initialize the ranker"""
+        self.token_budget = token_budget
+        self.k1 = k1
+        self.b = b
+        self.dedupe_threshold = dedupe_threshold
+        self.passage_words = passage_words
+    
+    def select(
+        self,
+        results: List[Dict],
+        section_title: str,
+        subsections: Optional[List[str]] = None,
+        token_budget: Optional[int] = None
+    ) -> List[Dict]:
+        """Return the best non-redundant passages that fit the token budget"""
+        
+        budget = self.token_budget if token_budget is None else token_budget
+        passages = self.rank(results, section_title, subsections)
+        
+        selected = []
+        used = 0
+        for passage in passages:
+            if used + passage['tokens'] > budget:
+                continue
+            selected.append(passage)
+            used += passage['tokens']
+        
+        return selected
+    
+    def rank(self, results: List[Dict], section_title: str, subsections: Optional[List[str]] = None) -> List[Dict]:
+        """Score every passage against the section and drop near-duplicates
+        
+        Passages scoring zero are dropped unless nothing matches at all, in
+        which case the original result order is kept.
+        """
+        
+        passages = split_passages(results, self.passage_words)
+        if not passages:
+            return []
+        
+        query = self.query_weights(section_title, subsections or [])
+        doc_tokens = [tokenize(p['text'] + " " + p['title']) for p in passages]
+        scores = self.score(doc_tokens, query)
+        
+        if scores.max() > 0:
+            order = [i for i in np.argsort(-scores, kind='stable') if scores[i] > 0]
+        else:
+            order = list(range(len(passages)))
+        
+        keep = self._dedupe(doc_tokens, order)
+        
+        ranked = []
+        for i in keep:
+            passage = dict(passages[i])
+            passage['score'] = float(scores[i])
+            ranked.append(passage)
+        
+        return ranked
+    
+    def score(self, doc_tokens: List[List[str]], query: Dict[str, float]) -> np.ndarray:
+        """BM25 scores of tokenized documents for a weighted query"""
+        
+        if not doc_tokens or not query:
+            return np.zeros(len(doc_tokens), dtype=np.float32)
+        
+        terms = list(query)
+        term_index = {term: j for j, term in enumerate(terms)}
+        
+        tf = np.zeros((len(doc_tokens), len(terms)), dtype=np.float32)
+        for i, tokens in enumerate(doc_tokens):
+            for token in tokens:
+                j = term_index.get(token)
+                if j is not None:
+                    tf[i, j] += 1
+        
+        doc_len = np.array([len(tokens) for tokens in doc_tokens], dtype=np.float32)
+        avg_len = max(float(doc_len.mean()), 1.0)
+        
+        n_docs = len(doc_tokens)
+        df = (tf > 0).sum(axis=0)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        weights = np.array([query[term] for term in terms], dtype=np.float32)
+        
+        norm = self.k1 * (1 - self.b + self.b * doc_len / avg_len)
+        bm25 = tf * (self.k1 + 1) / (tf + norm[:, None])
+        
+        return bm25 @ (idf * weights)
+    
+    def query_weights(self, section_title: str, subsections: List[str]) -> Dict[str, float]:
+        """Title terms count fully, subsection terms count half"""
+        
+        weights = {}
+        for token in tokenize(section_title):
+            weights[token] = weights.get(token, 0.0) + 1.0
+        for subsection in subsections:
+            for token in tokenize(subsection):
+                weights[token] = weights.get(token, 0.0) + 0.5
+        return weights
+    
+    def _dedupe(self, doc_tokens: List[List[str]], order: List[int]) -> List[int]:
+        """Greedily keep passages whose cosine similarity to every kept one is below the threshold"""
+        
+        if not order:
+            return []
+        
+        vocab = {}
+        for i in order:
+            for token in doc_tokens[i]:
+                vocab.setdefault(token, len(vocab))
+        
+        vectors = np.zeros((len(order), max(len(vocab), 1)), dtype=np.float32)
+        for row, i in enumerate(order):
+            for token in doc_tokens[i]:
+                vectors[row, vocab[token]] += 1
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        
+        kept_rows = []
+        for row in range(len(order)):
+            if kept_rows and float((vectors[kept_rows] @ vectors[row]).max()) >= self.dedupe_threshold:
+                continue
+            kept_rows.append(row)
+        
+        return [order[row] for row in kept_rows]
@@ -0,0 +1,125 @@
+"""
+Format Export Module
+Parses the compiled markdown once into pandoc's JSON AST and renders HTML, EPUB and DOCX from it in parallel
+"""
+
+import hashlib
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+import pypandoc
+
+
+# Bump when the reader arguments change to invalidate cached ASTs
+AST_VERSION = "1"
+CSS_PATH = Path(__file__).parent.parent / "styles" / "ebook.css"
+
+# Output format -> (pandoc writer, file extension)
+FORMAT_WRITERS = {
+    'html': ('html5', '.html'),
+    'epub': ('epub3', '.epub'),
+    'docx': ('docx', '.docx'),
+    'latex': ('latex', '.tex'),
+}
+
+
+def render_format(source_path: str, writer: str, output_path: str, extra_args: List[str], source_format: str = 'json') -> str:
+    """Render a JSON AST (or markdown) with one pandoc writer (module level so the process pool can pickle it)"""
+    
+    pypandoc.convert_file(source_path, writer, format=source_format, outputfile=output_path, extra_args=extra_args)
+    return output_path
+
+
+class FormatExporter:
+    """Renders one parsed book to several output formats
+    
+    The markdown is read once into pandoc's JSON AST, cached by content
+    hash; each format is then only a pandoc writer pass over that AST,
+    run side by side in a process pool. boxify.lua runs at render time,
+    so the AST stays format-neutral.
+    """
+    
+    def __init__(self, cache_dir: str, filter_path: str, css_path: str = CSS_PATH, max_workers: int = None):
+        """Initialize the exporter"""
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.filter_path = Path(filter_path)
+        self.css_path = Path(css_path)
+        self.max_workers = max_workers or os.cpu_count() or 4
+        self._executor = None
+    
+    def parse(self, markdown_path: str) -> Path:
+        """Cached JSON AST for a markdown file, parsed only when its content changes"""
+        
+        try:
+            pandoc_version = pypandoc.get_pandoc_version()
+        except OSError:
+            pandoc_version = ""
+        digest = hashlib.sha256(f"{AST_VERSION}\0{pandoc_version}\0".encode())
+        digest.update(Path(markdown_path).read_bytes())
+        ast_path = self.cache_dir / f"{digest.hexdigest()[:16]}.json"
+        if ast_path.exists():
+            print("♻️  Reusing the parsed document")
+            return ast_path
+        
+        tmp_path = ast_path.with_suffix('.tmp')
+        pypandoc.convert_file(str(markdown_path), 'json', format='markdown', outputfile=str(tmp_path))
+        os.replace(tmp_path, ast_path)
+        
+        # One book per cache directory; older parses are dead weight
+        for stale in self.cache_dir.glob("*.json"):
+            if stale != ast_path:
+                stale.unlink()
+        return ast_path
+    
+    def writer_args(self, fmt: str, common_args: List[str]) -> List[str]:
+        """Writer arguments for one format"""
+        
+        args = list(common_args) + [f'--lua-filter={self.filter_path}']
+        if fmt in ('html', 'epub') and self.css_path.exists():
+            args.append(f'--css={self.css_path}')
+        if fmt == 'html':
+            # Inline the stylesheet so the .html stands alone
+            major = pypandoc.get_pandoc_version().split('.')[0]
+            args += ['--standalone', '--embed-resources' if major.isdigit() and int(major) >= 3 else '--self-contained']
+        elif fmt == 'latex':
+            args.append('--standalone')
+        return args
+    
+    def start(self, ast_path: Path, formats: List[str], output_base: str, common_args: List[str] = ()) -> Dict[str, Future]:
+        """Submit one render per format; collect the results with finish()"""
+        
+        unknown = [fmt for fmt in formats if fmt not in FORMAT_WRITERS]
+        if unknown:
+            raise ValueError(f"Unsupported output formats: {', '.join(unknown)}")
+        
+        self._executor = ProcessPoolExecutor(max_workers=min(len(formats), self.max_workers) or 1)
+        futures = {}
+        for fmt in formats:
+            writer, extension = FORMAT_WRITERS[fmt]
+            output_path = f"{output_base}{extension}"
+            futures[fmt] = self._executor.submit(render_format, str(ast_path), writer, output_path, self.writer_args(fmt, common_args))
+        return futures
+    
+    def finish(self, futures: Dict[str, Future]) -> Dict[str, str]:
+        """Wait for the renders; a failed format is reported without stopping the others"""
+        
+        outputs = {}
+        try:
+            for fmt, future in futures.items():
+                try:
+                    outputs[fmt] = future.result()
+                    print(f"✅ {fmt.upper()} created: {outputs[fmt]}")
+                except Exception as e:
+                    print(f"⚠️  {fmt.upper()} export failed: {e}")
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+        return outputs
+    
+    def export(self, markdown_path: str, formats: List[str], output_base: str, common_args: List[str] = ()) -> Dict[str, str]:
+        """Parse once and render every format"""
+        return self.finish(self.start(self.parse(markdown_path), formats, output_base, common_args))
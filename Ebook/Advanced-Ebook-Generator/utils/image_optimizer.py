@@ -0,0 +1,228 @@
+"""
+Image Optimizer Module
+Downsamples the images a book references to the print resolution of its page and caches the results
+"""
+
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+
+# Bump when the conversion changes to invalidate cached images
+OPTIMIZER_VERSION = "1"
+
+# ![alt](path "title") and \includegraphics[...]{path}
+MARKDOWN_IMAGE = re.compile(r'(!\[(?:[^\]\\]|\\.)*\]\(\s*)(<[^>]+>|[^)\s]+)')
+LATEX_IMAGE = re.compile(r'(\\includegraphics(?:\[[^\]]*\])?\{)([^}]+)(\})')
+
+# Images with at most this many distinct colours are diagrams or line art: kept as PNG
+PNG_MAX_COLORS = 256
+
+UNITS_PER_INCH = {'in': 1.0, 'cm': 2.54, 'mm': 25.4, 'pt': 72.27, 'bp': 72.0, 'px': 96.0}
+
+
+def length_in_inches(length: str) -> float:
+    """A LaTeX-style length such as "6in", "2.5cm" or "72pt" in inches"""
+    
+    match = re.fullmatch(r'\s*([\d.]+)\s*([a-z]+)\s*', length)
+    if not match or match.group(2) not in UNITS_PER_INCH:
+        raise ValueError(f"Unsupported length: {length!r}")
+    return float(match.group(1)) / UNITS_PER_INCH[match.group(2)]
+
+
+def max_image_pixels(pdf_settings: dict) -> Tuple[int, int]:
+    """Largest useful image size in pixels: the text block of the configured page at image_dpi"""
+    
+    dpi = pdf_settings.get('image_dpi', 300)
+    width, height = (length_in_inches(part) for part in pdf_settings['page_size'].split('x'))
+    margin = length_in_inches(pdf_settings.get('margin', '1in'))
+    return (round((width - 2 * margin) * dpi), round((height - 2 * margin) * dpi))
+
+
+def optimize_image(source: str, target_base: str, max_size: Tuple[int, int], quality: int) -> str:
+    """Write a print-sized, metadata-free copy of one image (module level so the process pool can pickle it)
+    
+    Photos become JPEG; images with transparency or only a few colours
+    (diagrams, charts, screenshots of text) stay PNG so edges stay sharp.
+    Returns the path written, ``target_base`` plus the chosen extension.
+    """
+    
+    from PIL import Image, ImageOps
+    
+    with Image.open(source) as opened:
+        image = ImageOps.exif_transpose(opened)
+    
+    alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    if alpha:
+        image = image.convert('RGBA')
+        alpha = image.getchannel('A').getextrema()[0] < 255
+    if image.mode not in ('RGB', 'L') and not alpha:
+        image = image.convert('RGB')
+    
+    if image.width > max_size[0] or image.height > max_size[1]:
+        image.thumbnail(max_size, Image.LANCZOS)
+    
+    # Saving without exif/icc_profile/pnginfo drops the metadata
+    if alpha or image.getcolors(PNG_MAX_COLORS) is not None:
+        target, options = f"{target_base}.png", {'format': 'PNG', 'optimize': True}
+    else:
+        target, options = f"{target_base}.jpg", {'format': 'JPEG', 'quality': quality, 'optimize': True}
+    
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    image.save(tmp_path, **options)
+    os.replace(tmp_path, target)
+    return target
+
+
+def resolve_image(reference: str, search_dirs: List[Path]) -> Optional[Path]:
+    """Local file an image reference points to, or None (URLs, missing files)"""
+    
+    reference = unquote(reference.strip('<>'))
+    if '://' in reference or reference.startswith('data:'):
+        return None
+    path = Path(reference)
+    candidates = [path] if path.is_absolute() else [Path(directory) / path for directory in search_dirs]
+    return next((candidate.resolve() for candidate in candidates if candidate.is_file()), None)
+
+
+def find_image_references(texts: List[str], search_dirs: List[Path]) -> Dict[str, Optional[Path]]:
+    """Every markdown and \\includegraphics image reference in the texts, with the file it resolves to"""
+    
+    references = {}
+    for text in texts:
+        for pattern in (MARKDOWN_IMAGE, LATEX_IMAGE):
+            for match in pattern.finditer(text):
+                reference = match.group(2)
+                if reference not in references:
+                    references[reference] = resolve_image(reference, search_dirs)
+    return references
+
+
+def rewrite_image_references(texts: List[str], targets: Dict[str, Path]) -> List[str]:
+    """The texts with each reference in ``targets`` replaced by the absolute path of its target"""
+    
+    def replace(match):
+        target = targets.get(match.group(2))
+        if target is None:
+            return match.group(0)
+        path = Path(target).resolve().as_posix()
+        if match.re is MARKDOWN_IMAGE and ' ' in path:
+            path = f"<{path}>"
+        return match.group(1) + path + (match.group(3) if match.re is LATEX_IMAGE else "")
+    
+    return [LATEX_IMAGE.sub(replace, MARKDOWN_IMAGE.sub(replace, text)) for text in texts]
+
+
+def absolute_image_paths(texts: List[str], search_dirs: List[Path]) -> List[str]:
+    """The texts with every local image reference made absolute, for engines running in a build directory"""
+    
+    references = find_image_references(texts, search_dirs)
+    return rewrite_image_references(texts, {reference: source for reference, source in references.items() if source is not None})
+
+
+class ImageOptimizer:
+    """Print-aware image stage for the PDF build
+    
+    Every image the markdown references is downsampled to the text block
+    of the page at the configured DPI, re-encoded as JPEG or PNG and stored
+    in the cache under a hash of the source bytes and the settings. The
+    references are rewritten to the cached copies (absolute paths, so they
+    resolve from any build directory); unchanged images are never
+    re-encoded, and new ones are converted side by side in a process pool.
+    """
+    
+    def __init__(self, cache_dir: str, max_size: Tuple[int, int], quality: int = 85, max_workers: int = None):
+        """Initialize the optimizer"""
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = tuple(max_size)
+        self.quality = quality
+        self.max_workers = max_workers or os.cpu_count() or 4
+        self.stats = {'images': 0, 'cached': 0, 'failed': 0, 'bytes_before': 0, 'bytes_after': 0, 'seconds': 0.0}
+    
+    def _key(self, source: Path) -> str:
+        """Cache key for one source image"""
+        
+        digest = hashlib.sha256(f"{OPTIMIZER_VERSION}\0{self.max_size}\0{self.quality}\0".encode())
+        digest.update(source.read_bytes())
+        return digest.hexdigest()[:16]
+    
+    def _cached(self, key: str) -> Optional[Path]:
+        """The cached variant for a key, if one was made before"""
+        return next((path for path in self.cache_dir.glob(f"{key}.*") if path.suffix in ('.jpg', '.png')), None)
+    
+    def optimize(self, sources: List[Path]) -> Dict[Path, Path]:
+        """Optimized copy for each source image; images that cannot be read keep their original"""
+        
+        start = time.perf_counter()
+        results, pending = {}, {}
+        for source in dict.fromkeys(sources):
+            key = self._key(source)
+            cached = self._cached(key)
+            if cached is not None:
+                results[source] = cached
+                self.stats['cached'] += 1
+            else:
+                pending[source] = str(self.cache_dir / key)
+        
+        if len(pending) == 1:
+            source, target_base = next(iter(pending.items()))
+            try:
+                results[source] = Path(optimize_image(str(source), target_base, self.max_size, self.quality))
+            except Exception as e:
+                print(f"⚠️  Could not optimize {source.name}: {e}")
+                results[source] = source
+                self.stats['failed'] += 1
+        elif pending:
+            with ProcessPoolExecutor(max_workers=min(len(pending), self.max_workers)) as executor:
+                futures = {
+                    source: executor.submit(optimize_image, str(source), target_base, self.max_size, self.quality)
+                    for source, target_base in pending.items()
+                }
+                for source, future in futures.items():
+                    try:
+                        results[source] = Path(future.result())
+                    except Exception as e:
+                        print(f"⚠️  Could not optimize {source.name}: {e}")
+                        results[source] = source
+                        self.stats['failed'] += 1
+        
+        for source, optimized in results.items():
+            self.stats['images'] += 1
+            self.stats['bytes_before'] += source.stat().st_size
+            self.stats['bytes_after'] += optimized.stat().st_size
+        self.stats['seconds'] += time.perf_counter() - start
+        return results
+    
+    def optimize_markdown(self, texts: List[str], search_dirs: List[Path]) -> List[str]:
+        """The texts with every local image reference pointing at its optimized copy
+        
+        Relative references are looked up in ``search_dirs`` in order, the
+        way pandoc's --resource-path would. Images that could not be
+        optimized point at their source by absolute path, so they still
+        resolve when the engine runs in a build directory.
+        """
+        
+        references = find_image_references(texts, search_dirs)
+        sources = [source for source in references.values() if source is not None]
+        if not sources:
+            return list(texts)
+        optimized = self.optimize(sources)
+        return rewrite_image_references(texts, {
+            reference: optimized[source] for reference, source in references.items() if source is not None
+        })
+    
+    def report(self) -> str:
+        """One-line summary of the stage"""
+        
+        stats = self.stats
+        return (
+            f"🖼️  Optimized {stats['images']} images for print: "
+            f"{stats['bytes_before'] / 1e6:.1f} MB → {stats['bytes_after'] / 1e6:.1f} MB "
+            f"({stats['cached']} from cache) in {stats['seconds']:.1f}s"
+        )
@@ -0,0 +1,163 @@
+"""
+LaTeX Format Module
+Dumps the font-independent part of the book preamble into a cached .fmt for faster engine startup
+"""
+
+import hashlib
+import os
+import re
+import subprocess
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+# Bump when the split or the format build changes to invalidate old formats
+FORMAT_VERSION = "1"
+SUPPORTED_ENGINES = ('xelatex', 'pdflatex')
+END_OF_DUMP = "\\endofdump\n"
+
+# Nothing from here on goes into the format: hyperref and the document
+# metadata belong to each book
+STOP_PATTERN = re.compile(
+    r'\\(?:hypersetup|title|author|date)(?![a-zA-Z@])'
+    r'|\\usepackage(?:\[[^\]]*\])?\{[^}]*(?:hyperref|bookmark)[^}]*\}'
+)
+# XeTeX cannot dump native (system) fonts, so for xelatex the format also
+# ends before fontspec
+NATIVE_FONT_PATTERN = re.compile(
+    r'\\(?:set(?:main|sans|mono|math)font|newfontfamily|defaultfontfeatures)(?![a-zA-Z@])'
+    r'|\\usepackage(?:\[[^\]]*\])?\{[^}]*(?:fontspec|unicode-math)[^}]*\}'
+)
+COMMENT_PATTERN = re.compile(r'(?<!\\)%.*')
+NEWIF_PATTERN = re.compile(r'\\newif\s*\\if[a-zA-Z@]*')
+IF_PATTERN = re.compile(r'\\if[a-zA-Z@]*')
+FI_PATTERN = re.compile(r'\\fi(?![a-zA-Z@])')
+MAKEAT_PATTERN = re.compile(r'\\makeat(letter|other)')
+
+
+def split_preamble(head: str, engine: str = "xelatex") -> Tuple[str, str]:
+    """Split a preamble into a dumpable prefix and the rest
+    
+    The cut falls at a line boundary outside any braces, \\if block or
+    \\makeatletter region, before the first hyperref or metadata command
+    (and for xelatex, before the first font selection). Returns ("", head)
+    if no useful prefix exists.
+    """
+    
+    end = head.find('\\begin{document}')
+    preamble = head if end < 0 else head[:end]
+    
+    cut = 0
+    depth = 0
+    letter = False
+    position = 0
+    for line in preamble.splitlines(keepends=True):
+        if depth == 0 and not letter:
+            cut = position
+        code = NEWIF_PATTERN.sub("", COMMENT_PATTERN.sub("", line))
+        if STOP_PATTERN.search(code) or (engine == 'xelatex' and NATIVE_FONT_PATTERN.search(code)):
+            break
+        depth += len(IF_PATTERN.findall(code)) - len(FI_PATTERN.findall(code))
+        depth += code.count('{') - code.count('\\{') - code.count('}') + code.count('\\}')
+        toggles = MAKEAT_PATTERN.findall(code)
+        if toggles:
+            letter = toggles[-1] == 'letter'
+        position += len(line)
+    else:
+        if depth == 0 and not letter:
+            cut = position
+    
+    if '\\documentclass' not in head[:cut]:
+        return "", head
+    return head[:cut], head[cut:]
+
+
+class PreambleFormat:
+    """Precompiled preamble formats, built with mylatexformat and shared across builds
+    
+    A format is keyed by the dumped preamble text (which follows from
+    pdf_settings and the template), the engine and the engine version, so
+    books with the same layout settings share one format file.
+    """
+    
+    def __init__(self, cache_dir: str):
+        """Initialize the format cache"""
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._versions = {}
+        self._failed = set()
+        self._lock = threading.Lock()
+    
+    def _engine_version(self, engine: str) -> str:
+        """First line of ``engine --version``; formats don't survive engine upgrades"""
+        
+        if engine not in self._versions:
+            result = subprocess.run([engine, '--version'], capture_output=True, text=True, errors='replace')
+            self._versions[engine] = (result.stdout.splitlines() or [""])[0]
+        return self._versions[engine]
+    
+    def key(self, prefix: str, engine: str) -> str:
+        """Cache key for a dumped preamble"""
+        
+        digest = hashlib.sha256(f"{FORMAT_VERSION}\0{engine}\0{self._engine_version(engine)}\0{prefix}".encode('utf-8'))
+        return digest.hexdigest()
+    
+    def prepare(self, head: str, engine: str) -> Tuple[str, Optional[Path]]:
+        """Head to compile with, and the format to load (None to start from scratch)
+        
+        With a format, the head gets an ``\\endofdump`` marker after the
+        dumped prefix; mylatexformat skips everything before it.
+        """
+        
+        if engine not in SUPPORTED_ENGINES:
+            return head, None
+        prefix, rest = split_preamble(head, engine)
+        if not prefix:
+            return head, None
+        
+        with self._lock:
+            try:
+                fmt_path = self.cache_dir / f"{engine}-{self.key(prefix, engine)[:16]}.fmt"
+            except OSError:
+                return head, None
+            failed_path = fmt_path.with_suffix('.failed')
+            if fmt_path.name in self._failed or failed_path.exists():
+                return head, None
+            if not fmt_path.exists():
+                print(f"🧱 Precompiling the {engine} preamble...")
+                try:
+                    self._build(prefix, engine, fmt_path)
+                except (RuntimeError, OSError) as e:
+                    print(f"⚠️  Could not precompile the preamble, loading it on every run ({e})")
+                    # Remembered on disk too; the key changes with the engine version
+                    self._failed.add(fmt_path.name)
+                    failed_path.write_text(str(e), encoding='utf-8')
+                    return head, None
+        
+        return prefix + END_OF_DUMP + rest, fmt_path
+    
+    def _build(self, prefix: str, engine: str, fmt_path: Path):
+        """Dump the prefix into fmt_path with ``engine -ini``"""
+        
+        job = f"{fmt_path.stem}-{os.getpid()}"
+        source = self.cache_dir / f"{job}-preamble.tex"
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write(prefix + END_OF_DUMP)
+        
+        try:
+            result = subprocess.run(
+                [engine, '-ini', '-interaction=nonstopmode', f'-jobname={job}', f'&{engine}', 'mylatexformat.ltx', source.name],
+                cwd=self.cache_dir,
+                capture_output=True,
+                text=True,
+                errors='replace'
+            )
+            built = self.cache_dir / f"{job}.fmt"
+            if result.returncode != 0 or not built.exists():
+                tail = "\n".join(result.stdout.splitlines()[-5:])
+                raise RuntimeError(f"{engine} -ini failed:\n{tail}")
+            os.replace(built, fmt_path)
+        finally:
+            for leftover in self.cache_dir.glob(f"{job}*"):
+                leftover.unlink()
@@ -0,0 +1,155 @@
+"""
+LaTeX Fragments Module
+Converts each section to a cached LaTeX fragment and stitches them into one master .tex
+"""
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+import pypandoc
+
+
+# Bump when the fragment format or stitching changes to invalidate old caches
+FRAGMENT_VERSION = "1"
+BODY_MARKER = "EBOOKFRAGMENTBODY"
+
+# Forces pandoc to emit highlighting and longtable setup into the shared preamble,
+# since the fragments themselves are converted without one
+PREAMBLE_PROBE = """
+```python
+pass
+```
+
+| a |
+|---|
+| b |
+"""
+
+
+class FragmentCache:
+    """Per-section LaTeX fragments keyed by a content hash
+    
+    The key covers the section markdown, the Lua filter, the optional
+    template, the pandoc arguments and the pandoc version, so editing one
+    chapter re-runs pandoc on that chapter only.
+    """
+    
+    def __init__(
+        self,
+        cache_dir: str,
+        filter_path: str,
+        fragment_args: List[str] = None,
+        shell_args: List[str] = None,
+        template_path: str = None,
+        max_workers: int = None
+    ):
+        """Initialize the cache"""
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.filter_path = Path(filter_path)
+        self.fragment_args = ['--top-level-division=chapter', f'--lua-filter={self.filter_path}'] + list(fragment_args or [])
+        self.shell_args = ['--standalone', f'--lua-filter={self.filter_path}'] + list(shell_args or [])
+        self.max_workers = max_workers or os.cpu_count() or 4
+        self.stats = {'hits': 0, 'misses': 0}
+        self._shell_path = None
+        self._salt = self._toolchain_salt(template_path)
+    
+    def _toolchain_salt(self, template_path: str = None) -> str:
+        """Hash of everything besides the markdown that shapes a fragment"""
+        
+        digest = hashlib.sha256(FRAGMENT_VERSION.encode())
+        for path in (self.filter_path, template_path):
+            if path and Path(path).exists():
+                digest.update(Path(path).read_bytes())
+        digest.update("\0".join(self.fragment_args + self.shell_args).encode())
+        try:
+            digest.update(pypandoc.get_pandoc_version().encode())
+        except OSError:
+            pass
+        return digest.hexdigest()
+    
+    def key(self, markdown: str, kind: str = "fragment") -> str:
+        """Cache key for a piece of markdown"""
+        return hashlib.sha256(f"{self._salt}\0{kind}\0{markdown}".encode('utf-8')).hexdigest()
+    
+    def _convert(self, markdown: str, kind: str, extra_args: List[str]) -> Path:
+        """Convert markdown to LaTeX unless a fragment with the same key exists"""
+        
+        path = self.cache_dir / f"{self.key(markdown, kind)}.tex"
+        if path.exists():
+            self.stats['hits'] += 1
+            return path
+        
+        self.stats['misses'] += 1
+        latex = pypandoc.convert_text(markdown, 'latex', format='markdown', extra_args=extra_args)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(latex)
+        os.replace(tmp_path, path)
+        return path
+    
+    def fragment(self, markdown: str) -> Path:
+        """LaTeX fragment (no preamble) for one section"""
+        return self._convert(markdown, "fragment", self.fragment_args)
+    
+    def fragments(self, segments: List[Tuple]) -> List[Path]:
+        """Fragments for (name, markdown, ...) segments, converting misses in parallel"""
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(lambda segment: self.fragment(segment[1]), segments))
+    
+    def shell(self, yaml_header: str) -> Tuple[str, str]:
+        """Document preamble and closing for the book's metadata header
+        
+        Returns (head, tail): everything pandoc writes before the body,
+        including the title and table of contents, and the closing
+        ``\\end{document}``.
+        """
+        
+        markdown = f"{yaml_header}\n\n{BODY_MARKER}\n\n{PREAMBLE_PROBE}"
+        self._shell_path = self._convert(markdown, "shell", self.shell_args)
+        with open(self._shell_path, 'r', encoding='utf-8') as f:
+            latex = f.read()
+        
+        head, _, rest = latex.partition(BODY_MARKER)
+        tail = rest[rest.rindex('\\end{document}'):]
+        return head, tail
+    
+    def stitch(self, yaml_header: str, fragment_paths: List[Path], master_path: str) -> Path:
+        """Write the master .tex: shared preamble, every fragment in order, closing"""
+        
+        head, tail = self.shell(yaml_header)
+        return self.write_master(head, tail, fragment_paths, master_path)
+    
+    def write_master(self, head: str, tail: str, fragment_paths: List[Path], master_path: str) -> Path:
+        """Write the master .tex around an already prepared head and tail"""
+        
+        master_path = Path(master_path)
+        tmp_path = master_path.with_suffix('.tmp')
+        
+        with open(tmp_path, 'w', encoding='utf-8') as out:
+            out.write(head)
+            for path in fragment_paths:
+                with open(path, 'r', encoding='utf-8') as f:
+                    out.write(f.read())
+                out.write("\n\n")
+            out.write(tail)
+        
+        os.replace(tmp_path, master_path)
+        return master_path
+    
+    def prune(self, keep: List[Path]) -> int:
+        """Delete cached fragments (and shells) not used by the latest build"""
+        
+        keep = {Path(p).name for p in keep}
+        if self._shell_path is not None:
+            keep.add(self._shell_path.name)
+        removed = 0
+        for path in self.cache_dir.glob("*.tex"):
+            if path.name not in keep:
+                path.unlink()
+                removed += 1
+        return removed
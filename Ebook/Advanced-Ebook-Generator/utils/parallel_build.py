@@ -0,0 +1,355 @@
+"""
+Parallel Build Module
+Compiles front matter, each chapter and back matter as separate PDFs and merges them
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from .section_store import atomic_write
+
+
+PART_END_LABEL = "ebook-part-end"
+PART_END_PATTERN = re.compile(r'\\newlabel\{' + PART_END_LABEL + r'\}\{\{[^{}]*\}\{([^{}]*)\}')
+TOC_ENTRY_PATTERN = re.compile(r'\\@writefile\{toc\}\{(.*)\}\s*$')
+TOC_PAGE_PATTERN = re.compile(r'\{(\d+)\}(\{[^{}]*\}%?)\s*$')
+NUMBERED_CHAPTER_PATTERN = re.compile(r'\\chapter\{')
+NEWLABEL_PAGE_PATTERN = re.compile(r'(\\newlabel\{[^{}]*\}\{\{[^{}]*\}\{)(\d+)(\})')
+AUX_TOC_PAGE_PATTERN = re.compile(r'(\\contentsline \{[^{}]*\}\{(?:[^{}]|\{[^{}]*\})*\})\{(\d+)\}')
+RERUN_PATTERN = re.compile(r'Rerun to get|Rerun LaTeX|Label\(s\) may have changed')
+AUX_SUFFIXES = ('.aux', '.toc', '.lof', '.lot', '.out')
+ROMAN_VALUES = {'i': 1, 'v': 5, 'x': 10, 'l': 50, 'c': 100, 'd': 500, 'm': 1000}
+
+
+def run_latex(tex_path: Path, engine: str, runs: int = 1, fmt: Path = None) -> List[float]:
+    """Run the LaTeX engine on a file in its own directory, optionally from a precompiled format
+    
+    Returns the seconds each run took.
+    """
+    
+    command = [engine, '-interaction=nonstopmode', '-halt-on-error']
+    env = None
+    if fmt is not None:
+        command.append(f'-fmt={fmt.stem}')
+        # A trailing separator keeps the engine's default format path
+        env = {**os.environ, 'TEXFORMATS': f"{fmt.parent}{os.pathsep}"}
+    
+    seconds = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            command + [tex_path.name],
+            cwd=tex_path.parent,
+            env=env,
+            capture_output=True,
+            text=True,
+            errors='replace'
+        )
+        seconds.append(round(time.perf_counter() - start, 3))
+        if result.returncode != 0:
+            tail = "\n".join(result.stdout.splitlines()[-15:])
+            raise RuntimeError(f"{engine} failed on {tex_path.name}:\n{tail}")
+    return seconds
+
+
+def aux_state(tex_path: Path, suffixes: tuple = AUX_SUFFIXES) -> Dict[str, str]:
+    """Content hashes of the auxiliary files a run reads back on the next run"""
+    
+    state = {}
+    for suffix in suffixes:
+        path = tex_path.with_suffix(suffix)
+        if path.exists():
+            state[suffix] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return state
+
+
+def build_stamp(tex_path: Path, engine: str, fmt: Path = None, inputs: str = "") -> str:
+    """Hash of everything that determines a run's output besides the aux files"""
+    
+    digest = hashlib.sha256(f"{engine}\0{fmt.name if fmt else ''}\0{inputs}\0".encode('utf-8'))
+    digest.update(tex_path.read_bytes())
+    return digest.hexdigest()
+
+
+def is_current(tex_path: Path, stamp: str) -> bool:
+    """Whether the PDF next to tex_path was built from exactly this stamp"""
+    
+    stamp_path = tex_path.with_suffix('.stamp')
+    return (
+        tex_path.with_suffix('.pdf').exists()
+        and stamp_path.exists()
+        and stamp_path.read_text(encoding='utf-8') == stamp
+    )
+
+
+def run_latex_until_stable(
+    tex_path: Path,
+    engine: str,
+    fmt: Path = None,
+    max_runs: int = 5,
+    watch: tuple = AUX_SUFFIXES,
+    timings: list = None
+) -> int:
+    """Run the engine until its aux files stop changing, latexmk style
+    
+    Aux files from the previous build stay next to the .tex, so a rebuild
+    with unchanged cross-references settles after one run, and a rebuild
+    of an unchanged .tex is skipped. Stopping at max_runs leaves the build
+    unsettled, so it is not skipped next time. Returns the number of
+    engine runs; the seconds of each run are appended to ``timings``.
+    """
+    
+    stamp = build_stamp(tex_path, engine, fmt)
+    if is_current(tex_path, stamp):
+        return 0
+    tex_path.with_suffix('.stamp').unlink(missing_ok=True)
+    
+    runs = 0
+    while runs < max_runs:
+        before = aux_state(tex_path, watch)
+        try:
+            seconds = run_latex(tex_path, engine, fmt=fmt)
+            if timings is not None:
+                timings.extend(seconds)
+        except RuntimeError:
+            # A run that died mid-way can leave truncated aux files behind
+            for suffix in AUX_SUFFIXES:
+                tex_path.with_suffix(suffix).unlink(missing_ok=True)
+            raise
+        runs += 1
+        log_path = tex_path.with_suffix('.log')
+        rerun = log_path.exists() and RERUN_PATTERN.search(log_path.read_text(encoding='utf-8', errors='replace'))
+        if aux_state(tex_path, watch) == before and not rerun:
+            # Only a settled build may be skipped next time
+            tex_path.with_suffix('.stamp').write_text(stamp, encoding='utf-8')
+            break
+    
+    return runs
+
+
+def shift_toc_line(line: str, offset: int) -> str:
+    """Add offset to the page number of a \\contentsline entry"""
+    return TOC_PAGE_PATTERN.sub(lambda m: "{" + str(int(m.group(1)) + offset) + "}" + m.group(2), line)
+
+
+def shift_aux_pages(aux_path: Path, offset: int):
+    """Add offset to the page numbers of labels and TOC entries in an .aux file
+    
+    Moving a part to a new starting page shifts every page it records by
+    the same amount; shifting the old aux up front lets the next run find
+    it already settled.
+    """
+    
+    if not offset or not aux_path.exists():
+        return
+    text = aux_path.read_text(encoding='utf-8', errors='replace')
+    text = NEWLABEL_PAGE_PATTERN.sub(lambda m: m.group(1) + str(int(m.group(2)) + offset) + m.group(3), text)
+    text = AUX_TOC_PAGE_PATTERN.sub(lambda m: m.group(1) + "{" + str(int(m.group(2)) + offset) + "}", text)
+    aux_path.write_text(text, encoding='utf-8')
+
+
+def page_number(text: str) -> Optional[int]:
+    """Page counter value behind a printed page number: arabic or roman (\\roman, \\Roman), else None"""
+    
+    text = text.strip()
+    if text.isdigit():
+        return int(text)
+    values = [ROMAN_VALUES.get(char) for char in text.lower()]
+    if not values or None in values:
+        return None
+    return sum(-value if value < following else value for value, following in zip(values, values[1:] + [0]))
+
+
+class ParallelBuild:
+    """Compiles book parts concurrently and merges them into one PDF
+    
+    Part 0 holds the title page, table of contents and front matter; every
+    other part starts on a fresh page with its page and chapter counters
+    set so the merged book numbers continuously. Build latency follows the
+    longest part rather than the whole book.
+    """
+    
+    def __init__(self, build_dir: str, engine: str, max_workers: int = None, fmt: Path = None):
+        """Initialize the build"""
+        self.build_dir = Path(build_dir)
+        self.build_dir.mkdir(parents=True, exist_ok=True)
+        self.engine = engine
+        self.fmt = fmt
+        self.max_workers = max_workers or os.cpu_count() or 4
+        self.timings = {}
+    
+    def build(self, head: str, tail: str, parts: List[List[Path]], pdf_path: str) -> str:
+        """Compile parts (lists of fragment paths) and merge them into pdf_path
+        
+        1. Compile every body part in parallel from the starting pages of
+           the previous build; chapter counters are known up front from the
+           fragments, page counts are not. Part 0 is compiled too unless it
+           is unchanged since the last build.
+        2. Re-run part 0 with the other parts' TOC entries merged in until
+           its own length is stable.
+        3. Re-run the body parts whose starting page moved.
+        
+        The build directory persists, so parts whose .tex, starting page and
+        aux files are unchanged since the last build are not compiled again.
+        """
+        
+        from pypdf import PdfWriter
+        
+        begin = head.index('\\begin{document}') + len('\\begin{document}')
+        body_head = head[:begin]
+        layout_path = self.build_dir / "layout.json"
+        previous_layout = {}
+        if layout_path.exists():
+            with open(layout_path, 'r', encoding='utf-8') as f:
+                previous_layout = json.load(f)
+        
+        chapters_before = 0
+        jobs = []
+        for n, fragments in enumerate(parts):
+            texts = []
+            for path in fragments:
+                with open(path, 'r', encoding='utf-8') as f:
+                    texts.append(f.read())
+            tex_path = self.build_dir / f"part_{n:02d}.tex"
+            jobs.append({
+                'tex': tex_path,
+                'texts': texts,
+                'chapter': chapters_before,
+                'first_page': previous_layout.get(tex_path.name, 1)
+            })
+            chapters_before += sum(len(NUMBERED_CHAPTER_PATTERN.findall(text)) for text in texts)
+        self.runs = 0
+        
+        # Pass 1
+        for job in jobs[1:]:
+            self._write_part(body_head, tail, job, first_page=job['first_page'])
+        self._write_part(head, tail, jobs[0], first_page=None)
+        # One run is enough to measure a part; pass 3 settles it
+        self._compile_all(jobs[1:], max_runs=1)
+        front = jobs[0]['tex']
+        merged_toc_path = front.with_suffix('.merged-toc')
+        last_toc = merged_toc_path.read_text(encoding='utf-8') if merged_toc_path.exists() else ""
+        if not front.with_suffix('.aux').exists() or not is_current(front, build_stamp(front, self.engine, self.fmt, last_toc)):
+            self._run_front(front, last_toc)
+        body_pages = [self._last_page(job) - job['first_page'] + 1 for job in jobs[1:]]
+        body_toc = [self._read_toc(job) for job in jobs[1:]]
+        
+        # Pass 2: settle part 0 against the full table of contents
+        last_page = self._last_page(jobs[0])
+        for _ in range(3):
+            offsets = self._offsets(last_page, body_pages)
+            own_toc = self._read_toc(jobs[0])
+            merged_toc = "\n".join(own_toc + [
+                shift_toc_line(line, offset - job['first_page'])
+                for job, lines, offset in zip(jobs[1:], body_toc, offsets)
+                for line in lines
+            ]) + "\n"
+            if is_current(front, build_stamp(front, self.engine, self.fmt, merged_toc)):
+                break
+            self._run_front(front, merged_toc)
+            previous, last_page = last_page, self._last_page(jobs[0])
+            if last_page == previous:
+                break
+        
+        # Pass 3
+        offsets = self._offsets(last_page, body_pages)
+        for job, first_page in zip(jobs[1:], offsets):
+            shift_aux_pages(job['tex'].with_suffix('.aux'), first_page - job['first_page'])
+            job['first_page'] = first_page
+            self._write_part(body_head, tail, job, first_page=first_page)
+        self._compile_all(jobs[1:])
+        
+        with open(layout_path, 'w', encoding='utf-8') as f:
+            json.dump({job['tex'].name: job['first_page'] for job in jobs[1:]}, f, indent=2)
+        print(f"🔁 {self.runs} engine runs for {len(jobs)} parts")
+        
+        writer = PdfWriter()
+        for job in jobs:
+            writer.append(str(job['tex'].with_suffix('.pdf')), import_outline=True)
+        # Merged in memory and renamed into place, so a failed merge keeps the previous PDF
+        merged = io.BytesIO()
+        writer.write(merged)
+        atomic_write(Path(pdf_path), merged.getvalue())
+        
+        return pdf_path
+    
+    def _run_front(self, tex_path: Path, merged_toc: str):
+        """One run of part 0 reading the given table of contents"""
+        
+        tex_path.with_suffix('.stamp').unlink(missing_ok=True)
+        with open(tex_path.with_suffix('.toc'), 'w', encoding='utf-8') as f:
+            f.write(merged_toc)
+        self.timings.setdefault(tex_path.name, []).extend(run_latex(tex_path, self.engine, fmt=self.fmt))
+        self.runs += 1
+        tex_path.with_suffix('.merged-toc').write_text(merged_toc, encoding='utf-8')
+        tex_path.with_suffix('.stamp').write_text(build_stamp(tex_path, self.engine, self.fmt, merged_toc), encoding='utf-8')
+    
+    @staticmethod
+    def _offsets(last_page: int, body_pages: List[int]) -> List[int]:
+        """First page number of each body part"""
+        
+        offsets = []
+        for pages in body_pages:
+            offsets.append(last_page + 1)
+            last_page += pages
+        return offsets
+    
+    def _write_part(self, head: str, tail: str, job: Dict, first_page: int = None):
+        """Write one part's .tex; body parts get their page and chapter counters set"""
+        
+        with open(job['tex'], 'w', encoding='utf-8') as out:
+            out.write(head)
+            if first_page is not None:
+                out.write(f"\n\\setcounter{{page}}{{{first_page}}}\n\\setcounter{{chapter}}{{{job['chapter']}}}\n")
+            for text in job['texts']:
+                out.write(text)
+                out.write("\n\n")
+            out.write(f"\\label{{{PART_END_LABEL}}}\n")
+            out.write(tail)
+    
+    def _compile_all(self, jobs: List[Dict], max_runs: int = 5):
+        """One engine process per part, up to max_workers at a time"""
+        
+        for job in jobs:
+            self.timings.setdefault(job['tex'].name, [])
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            self.runs += sum(executor.map(
+                lambda job: run_latex_until_stable(job['tex'], self.engine, self.fmt, max_runs, timings=self.timings[job['tex'].name]),
+                jobs
+            ))
+    
+    @staticmethod
+    def _last_page(job: Dict) -> int:
+        """Page number of the part's closing label, read from its .aux"""
+        
+        aux_path = job['tex'].with_suffix('.aux')
+        with open(aux_path, 'r', encoding='utf-8', errors='replace') as f:
+            match = PART_END_PATTERN.search(f.read())
+        page = page_number(match.group(1)) if match else None
+        if page is None:
+            raise RuntimeError(f"No page label in {aux_path.name}")
+        return page
+    
+    @staticmethod
+    def _read_toc(job: Dict) -> List[str]:
+        """TOC entries the part recorded in its .aux, in .toc line form
+        
+        Parts without \\tableofcontents never open a .toc file, but every
+        \\addcontentsline still lands in the .aux as \\@writefile{toc}.
+        """
+        
+        aux_path = job['tex'].with_suffix('.aux')
+        with open(aux_path, 'r', encoding='utf-8', errors='replace') as f:
+            return [
+                match.group(1).replace('\\protected@file@percent', '%').rstrip()
+                for match in map(TOC_ENTRY_PATTERN.match, f)
+                if match
+            ]
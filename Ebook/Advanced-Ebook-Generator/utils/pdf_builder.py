@@ -4,11 +4,49 @@ Handles PDF compilation with professional template system
 Generates markdown files first, then converts to PDF
 """
 
+import io
 import os
 import re
+import shutil
+import time
 from pathlib import Path
 from datetime import datetime
+from typing import TextIO
 import pypandoc
+import requests
+
+from .latex_format import PreambleFormat
+from .latex_fragments import FragmentCache
+from .parallel_build import ParallelBuild, run_latex, run_latex_until_stable
+from .template_engine import load_template, print_report
+from .toolchain import Toolchain, print_report as print_toolchain_report
+from .format_export import FormatExporter, FORMAT_WRITERS, render_format
+from .section_store import SectionStore, atomic_write, read_manifest
+from .image_optimizer import ImageOptimizer, absolute_image_paths, max_image_pixels
+from .pdf_optimizer import optimize_pdf, print_report as print_pdf_report
+from .build_report import BuildTimer, analyze_logs, write_report
+
+
+# Plain stand-ins for the template's box environments, so draft PDFs load no box packages
+DRAFT_BOX_ENVIRONMENTS = {
+    'quizbox': 'Quiz',
+    'didyouknowbox': 'Did You Know?',
+    'summarybox': 'Summary',
+    'casestudybox': 'Case Study',
+}
+
+# The final markdown is streamed through a buffer of this size rather than built as one string
+WRITE_BUFFER = 1 << 20
+
+# Section file prefixes written by _save_section_files
+SECTION_FILE_TYPES = {
+    '01_front': 'front_matter',
+    '02_preface': 'preface',
+    '03_introduction': 'introduction',
+    '04_chapter': 'chapter',
+    '05_conclusion': 'conclusion',
+    '06_back': 'back_matter',
+}
 
 
 class PDFBuilder:
@@ -18,7 +56,14 @@ class PDFBuilder:
         """Initialize PDF builder"""
         self.config = config
         self.pdf_settings = config['pdf_settings']
+        self.citation_settings = config.get('citation_settings', {})
+        self.citation_mode = self.citation_settings.get('inline_citations', 'footnote')
         self.template_path = Path(__file__).parent.parent / "templates" / "ebook_template.md"
+        self.filter_path = Path(__file__).parent.parent / 'filters' / 'boxify.lua'
+        self.toolchain = None
+        self.timer = BuildTimer()
+        self.engine_attempts = []
+        self.latex_logs = []
     
     def build(
         self,
@@ -26,7 +71,11 @@ class PDFBuilder:
         genre: str,
         content: list,
         citation_manager,
-        output_dir: str = "output"
+        output_dir: str = "output",
+        formats: list = None,
+        mode: str = "final",
+        chapters: tuple = None,
+        write_sections: bool = True
     ) -> str:
         """Build the complete PDF using template system
         
@@ -36,9 +85,38 @@ class PDFBuilder:
         3. Save individual section .md files
         4. Compile into template
         5. Save final compiled .md file
-        6. Convert to PDF using Pandoc
+        6. Convert to PDF using Pandoc, and to any other requested formats
+        
+        Every output path ends up in ``self.outputs``; the PDF path is
+        returned (the markdown path if the PDF failed). Stage timings and
+        the LaTeX log analysis are saved next to the PDF as
+        ``<book>_ebook.build.json`` (see _write_build_report).
+        
+        ``mode="draft"`` skips all of that for a quick look at structure and
+        boxes: see _build_draft. ``chapters`` (first, last) limits a draft
+        to that chapter range. ``write_sections=False`` leaves the section
+        files alone, for content read back from them (see Recompiler).
+        
+        The PDF is only replaced once a build succeeds, so a failed build
+        leaves the last good one in place.
         """
         
+        if mode not in ("final", "draft"):
+            raise ValueError(f"Unknown build mode: {mode}")
+        self.timer = BuildTimer()
+        self.engine_attempts = []
+        self.latex_logs = []
+        if mode == "draft":
+            draft_format = formats[0] if formats else self.pdf_settings.get('draft_format', 'html')
+            return self._build_draft(topic, content, citation_manager, Path(output_dir), draft_format, chapters)
+        
+        formats = list(dict.fromkeys(formats or self.pdf_settings.get('formats', ['pdf'])))
+        unknown = [fmt for fmt in formats if fmt != 'pdf' and fmt not in FORMAT_WRITERS]
+        if unknown:
+            raise ValueError(f"Unsupported output formats: {', '.join(unknown)}")
+        extra_formats = [fmt for fmt in formats if fmt != 'pdf']
+        self.outputs = {}
+        
         # Create output directories
         output_path = Path(output_dir)
         output_path.mkdir(exist_ok=True)
@@ -47,46 +125,164 @@ class PDFBuilder:
         sections_dir = output_path / "sections"
         sections_dir.mkdir(exist_ok=True)
         
-        print(f"\n📝 Generating markdown files...")
+        # Check pandoc, engines and fonts first; the metadata uses the resolved fonts
+        if 'pdf' in formats and self.pdf_settings.get('preflight', True):
+            with self.timer.stage('preflight'):
+                self.toolchain = Toolchain(self.pdf_settings, self.filter_path, output_path / "build" / "toolchain.json").check()
+            print_toolchain_report(self.toolchain)
         
         # Step 1: Generate individual section markdown files
-        section_files = self._save_section_files(content, sections_dir, topic)
+        if write_sections:
+            print(f"\n📝 Generating markdown files...")
+            
+            book = {
+                'topic': topic,
+                'genre': genre,
+                'citation_style': citation_manager.style if citation_manager is not None else None,
+                'formats': formats
+            }
+            with self.timer.stage('section_writes') as stage:
+                section_files = self._save_section_files(content, sections_dir, topic, book)
+                changed = sum(1 for item in section_files if item['changed'])
+                stage.update(files=len(section_files), changed=changed)
+            
+            print(f"✅ Created {len(section_files)} markdown section files ({changed} changed)")
         
-        print(f"✅ Created {len(section_files)} markdown section files")
+        # The engine runs in build/, so the build gets absolute image paths, downsampled
+        # to print resolution with optimize_images (the section files and final markdown keep the originals)
+        if self.pdf_settings.get('optimize_images', True):
+            with self.timer.stage('image_optimization') as stage:
+                build_content, image_stats = self._optimize_images(content, output_path)
+                stage.update({key: value for key, value in image_stats.items() if key != 'seconds'})
+        else:
+            build_content = self._absolute_images(content, output_path)
         
-        # Step 2: Compile all content using template
+        # Steps 2-3: Compile all content using template, streamed section by section into the final markdown
         print(f"\n🔨 Compiling content with template...")
-        final_markdown = self._compile_with_template(
-            topic, genre, content, citation_manager
-        )
-        
-        # Step 3: Save final compiled markdown
         md_filename = self._slugify(topic) + "_ebook_final.md"
         md_path = output_path / md_filename
+        build_dir = output_path / "build" / self._slugify(topic)
         
-        with open(md_path, 'w', encoding='utf-8') as f:
-            f.write(final_markdown)
+        with self.timer.stage('template_compile'):
+            with open(md_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER) as f:
+                self._write_with_template(f, topic, genre, content, citation_manager)
+            # Absolute image paths only work on this machine, so pandoc reads a build-time copy instead
+            source_md_path = md_path
+            if build_content is not content:
+                build_dir.mkdir(parents=True, exist_ok=True)
+                source_md_path = build_dir / md_filename
+                with open(source_md_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER) as f:
+                    self._write_with_template(f, topic, genre, build_content, citation_manager)
         
         print(f"✅ Saved compiled markdown: {md_path}")
         
-        # Step 4: Convert to PDF
+        # Export CSL-JSON/BibTeX alongside the markdown
+        bibliography_path = None
+        if citation_manager is not None and len(citation_manager):
+            exported = citation_manager.export(output_path / (self._slugify(topic) + "_references"))
+            bibliography_path = str(exported['csl_json'])
+            print(f"✅ Exported references: {exported['csl_json'].name}, {exported['bibtex'].name}")
+        
+        citation_style = citation_manager.style if citation_manager is not None else None
+        
+        # Step 4: Parse once and start the other formats while the PDF builds
+        ast_path, exporter, futures = None, None, {}
+        if extra_formats:
+            exporter = FormatExporter(build_dir / "ast", self.filter_path, max_workers=self.pdf_settings.get('max_workers'))
+            try:
+                with self.timer.stage('pandoc_parse'):
+                    ast_path = exporter.parse(str(source_md_path))
+                common_args = [
+                    '--toc',
+                    f'--toc-depth={self.pdf_settings["toc_depth"]}',
+                    '-N'
+                ] + self._citeproc_args(bibliography_path, citation_style)
+                print(f"\n📚 Rendering {', '.join(fmt.upper() for fmt in extra_formats)} in the background...")
+                futures = exporter.start(ast_path, extra_formats, str(output_path / (self._slugify(topic) + "_ebook")), common_args)
+            except (RuntimeError, OSError) as e:
+                print(f"⚠️  Could not parse the markdown for {', '.join(extra_formats)}: {e}")
+        
+        # Step 5: Convert to PDF
         pdf_filename = self._slugify(topic) + "_ebook.pdf"
         pdf_path = output_path / pdf_filename
         
-        print(f"\n📄 Converting to PDF...")
         try:
-            self._convert_to_pdf(str(md_path), str(pdf_path))
-            print(f"✅ PDF created successfully: {pdf_path}")
-            return str(pdf_path)
-        except Exception as e:
-            print(f"⚠️  PDF conversion error: {e}")
-            print(f"📝 Markdown file available at: {md_path}")
-            return str(md_path)
+            if 'pdf' in formats:
+                print(f"\n📄 Converting to PDF...")
+                try:
+                    if self._use_fragments():
+                        self._build_from_fragments(topic, genre, build_content, citation_manager, output_path, str(pdf_path))
+                    else:
+                        self._convert_to_pdf(str(source_md_path), str(pdf_path), bibliography_path, citation_style, build_dir, ast_path)
+                    print(f"✅ PDF created successfully: {pdf_path}")
+                    self.outputs['pdf'] = str(pdf_path)
+                    if self.pdf_settings.get('post_optimize', False):
+                        with self.timer.stage('post_optimize'):
+                            self._post_optimize(str(pdf_path))
+                except Exception as e:
+                    print(f"⚠️  PDF conversion error: {e}")
+                    print(f"📝 Markdown file available at: {md_path}")
+        finally:
+            if exporter is not None and futures:
+                with self.timer.stage('other_formats', formats=extra_formats):
+                    self.outputs.update(exporter.finish(futures))
+        
+        if self.pdf_settings.get('build_report', True):
+            self._write_build_report(topic, formats, output_path / (self._slugify(topic) + "_ebook.build.json"), pdf_path)
+        
+        if 'pdf' in formats:
+            return self.outputs.get('pdf', str(md_path))
+        return next(iter(self.outputs.values()), str(md_path))
     
+    def _write_build_report(self, topic: str, formats: list, report_path: Path, pdf_path: Path):
+        """Stage timings, engine attempts and LaTeX log analytics as JSON, for tracking builds over time"""
+        
+        pdf = None
+        if 'pdf' in self.outputs:
+            pdf = {'path': str(pdf_path), 'bytes': pdf_path.stat().st_size, 'pages': None}
+            try:
+                from pypdf import PdfReader
+                pdf['pages'] = len(PdfReader(str(pdf_path)).pages)
+            except Exception:
+                pass
+        
+        report = {
+            'topic': topic,
+            'started': self.timer.started.isoformat(timespec='seconds'),
+            'total_seconds': self.timer.total(),
+            'formats': formats,
+            'mode': 'fragments' if self._use_fragments() else 'single',
+            'stages': self.timer.stages,
+            'engine_attempts': self.engine_attempts,
+            'engine': next((attempt['engine'] for attempt in self.engine_attempts if attempt['ok']), None),
+            'latex': analyze_logs(self.latex_logs) if self.latex_logs else None,
+            'pdf': pdf,
+            'outputs': self.outputs
+        }
+        try:
+            write_report(report_path, report)
+        except OSError as e:
+            print(f"⚠️  Could not save the build report: {e}")
+            return
+        
+        print(f"⏱️  Built in {report['total_seconds']:.1f}s ({self.timer.summary()}); report: {report_path.name}")
+        latex = report['latex']
+        if latex and (latex['overfull_hbox'] or latex['font_substitutions'] or latex['missing_characters']):
+            print(
+                f"⚠️  LaTeX: {latex['overfull_hbox']} overfull hboxes, "
+                f"{len(latex['font_substitutions'])} font substitutions, "
+                f"{sum(latex['missing_characters'].values())} missing characters"
+            )
     
-    def _save_section_files(self, content: list, sections_dir: Path, topic: str) -> list:
-        """Save each section as individual markdown file"""
+    def _save_section_files(self, content: list, sections_dir: Path, topic: str, book: dict = None) -> list:
+        """Save each section as individual markdown file
+        
+        Writes go through SectionStore: temp file, fsync and rename, skipped
+        when the content is unchanged, with hashes and the ``book`` metadata
+        kept in the manifest.
+        """
         section_files = []
+        store = SectionStore(sections_dir)
         
         # Counters for different types
         counters = {
@@ -119,32 +315,119 @@ class PDFBuilder:
             else:
                 filename = f"99_other_{self._slugify(section['title'])}.md"
             
-            # Save file
-            file_path = sections_dir / filename
-            with open(file_path, 'w', encoding='utf-8') as f:
-                # Add title if not in content
-                if not section_content.strip().startswith('#'):
-                    f.write(f"# {section['title']}\n\n")
-                f.write(section_content)
+            # Add title if not in content, with the attributes the compiled book gives it
+            if not section_content.strip().startswith('#'):
+                section_content = self._section_heading(section) + section_content
+            
+            # Save file (atomically, and only if its content changed)
+            changed = store.write(filename, section_content, section_type, section['title'])
             
             section_files.append({
-                'path': file_path,
+                'path': sections_dir / filename,
                 'type': section_type,
-                'title': section['title']
+                'title': section['title'],
+                'changed': changed
             })
         
+        removed = store.commit(book, topic=topic)
+        if removed:
+            print(f"🧹 Removed {len(removed)} outdated section files")
+        
         return section_files
     
+    def _post_optimize(self, pdf_path: str):
+        """Object streams, merged duplicate images, linearization and a font audit on the finished PDF"""
+        
+        print(f"\n🗜️  Optimizing the PDF...")
+        try:
+            print_pdf_report(optimize_pdf(pdf_path, linearize=self.pdf_settings.get('linearize', True)))
+        except Exception as e:
+            # The unoptimized PDF is still in place
+            print(f"⚠️  PDF optimization failed: {e}")
+    
+    def _optimize_images(self, content: list, output_path: Path) -> tuple:
+        """Content with image references pointing at print-sized copies cached under build/images, and the stage stats
+        
+        The content itself comes back when no reference changed.
+        """
+        
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            print("⚠️  Pillow not installed, embedding images as they are")
+            return self._absolute_images(content, output_path), {}
+        
+        optimizer = ImageOptimizer(
+            output_path / "build" / "images",
+            max_image_pixels(self.pdf_settings),
+            quality=self.pdf_settings.get('jpeg_quality', 85),
+            max_workers=self.pdf_settings.get('max_workers')
+        )
+        # Relative paths resolve as pandoc would resolve them: from the working directory, then the output directory
+        texts = optimizer.optimize_markdown([item['content'] for item in content], [Path.cwd(), output_path])
+        if optimizer.stats['images']:
+            print(optimizer.report())
+        return self._with_texts(content, texts), optimizer.stats
+    
+    def _absolute_images(self, content: list, output_path: Path) -> list:
+        """Content with local image references made absolute, resolved like _optimize_images resolves them"""
+        texts = absolute_image_paths([item['content'] for item in content], [Path.cwd(), output_path])
+        return self._with_texts(content, texts)
+    
+    @staticmethod
+    def _with_texts(content: list, texts: list) -> list:
+        """Content with new section texts; the content itself if none changed"""
+        if all(text == item['content'] for item, text in zip(content, texts)):
+            return content
+        return [dict(item, content=text) for item, text in zip(content, texts)]
+    
+    @staticmethod
+    def load_sections(sections_dir: str) -> list:
+        """Read back the section files written by _save_section_files as build() content
+        
+        Types and titles come from the manifest where it lists the file, so
+        they match the original build; files added by hand fall back to the
+        file name prefix and first heading.
+        """
+        
+        known = read_manifest(sections_dir).get('sections', {})
+        content = []
+        for file_path in sorted(Path(sections_dir).glob("*.md")):
+            text = file_path.read_text(encoding='utf-8')
+            entry = known.get(file_path.name, {})
+            section_type = entry.get('type') or next(
+                (kind for prefix, kind in SECTION_FILE_TYPES.items() if file_path.name.startswith(prefix)),
+                'other'
+            )
+            title = entry.get('title')
+            if not title:
+                heading = next((line for line in text.splitlines() if line.startswith('#')), file_path.stem)
+                title = re.sub(r'\s*\{[^}]*\}\s*$', '', heading.lstrip('#').strip())
+            content.append({'section': {'title': title, 'type': section_type}, 'content': text})
+        return content
+    
     def _compile_with_template(self, topic: str, genre: str, content: list, citation_manager) -> str:
-        """Compile content using the professional template"""
+        """Compile content using the professional template, as one string"""
+        
+        buffer = io.StringIO()
+        self._write_with_template(buffer, topic, genre, content, citation_manager)
+        return buffer.getvalue()
+    
+    def _write_with_template(self, out: TextIO, topic: str, genre: str, content: list, citation_manager):
+        """Write the book through the professional template to a text stream
+        
+        Front and back matter are single sections and go in as strings; the
+        main content is a generator, so at most one formatted section is in
+        memory at a time.
+        """
         
         # Load template
         if not self.template_path.exists():
             print(f"⚠️  Template not found at {self.template_path}, using basic format")
-            return self._compile_markdown(topic, genre, content, citation_manager)
+            self._write_markdown(out, topic, genre, content, citation_manager)
+            return
         
-        with open(self.template_path, 'r', encoding='utf-8') as f:
-            template = f.read()
+        template = load_template(self.template_path)
         
         # Prepare metadata replacements
         current_year = datetime.now().year
@@ -155,192 +438,383 @@ class PDFBuilder:
         
         # Prepare replacements dictionary
         replacements = {
-            '{{BOOK_TITLE}}': topic,
-            '{{BOOK_SUBTITLE}}': f"A Comprehensive Guide to {topic}",
-            '{{AUTHOR_NAME}}': "AI Ebook Creator",
-            '{{PUBLICATION_DATE}}': current_date,
-            '{{VERSION}}': "1.0",
-            '{{COPYRIGHT_YEAR}}': str(current_year),
-            '{{PUBLISHER}}': "Advanced Ebook Generator",
-            '{{ISBN}}': "N/A",
-            '{{LICENSE}}': "CC BY-NC-SA 4.0",
-            '{{LICENSE_FULL}}': self._get_license_text(),
-            '{{KEYWORDS}}': keywords,
-            '{{BOOK_DESCRIPTION}}': f"A comprehensive {genre} guide exploring {topic} in depth.",
-            '{{SUBJECT}}': topic,
-            '{{GENRE}}': genre.title(),
-            '{{CONTACT_EMAIL}}': "info@example.com",
-            '{{WEBSITE}}': "https://example.com",
+            'BOOK_TITLE': topic,
+            'BOOK_SUBTITLE': f"A Comprehensive Guide to {topic}",
+            'AUTHOR_NAME': "AI Ebook Creator",
+            'PUBLICATION_DATE': current_date,
+            'VERSION': "1.0",
+            'COPYRIGHT_YEAR': str(current_year),
+            'PUBLISHER': "Advanced Ebook Generator",
+            'ISBN': "N/A",
+            'LICENSE': "CC BY-NC-SA 4.0",
+            'LICENSE_FULL': self._get_license_text(),
+            'KEYWORDS': keywords,
+            'BOOK_DESCRIPTION': f"A comprehensive {genre} guide exploring {topic} in depth.",
+            'SUBJECT': topic,
+            'GENRE': genre.title(),
+            'CONTACT_EMAIL': "info@example.com",
+            'WEBSITE': "https://example.com",
         }
         
         # Separate content by type
         front_matter_content = []
-        main_content_parts = []
+        main_content_items = []
         back_matter_content = []
         
         for item in content:
             section = item['section']
-            section_content = item['content']
             section_type = section['type']
-            formatted = self._format_section(item)
             
             if section_type == 'front_matter':
-                front_matter_content.append((section['title'], formatted))
+                front_matter_content.append((section['title'], self._format_section(item)))
             elif section_type == 'back_matter':
-                back_matter_content.append((section['title'], formatted))
+                back_matter_content.append((section['title'], self._format_section(item)))
             elif section_type == 'preface':
                 # Preface goes to front matter template placeholder, not main content
-                front_matter_content.append(('Preface', formatted))
+                front_matter_content.append(('Preface', self._format_section(item)))
             else:
                 # Introduction, chapters, conclusion go to main content
-                main_content_parts.append(formatted)
+                main_content_items.append(item)
         
         # Build front matter sections
         for title, content_text in front_matter_content:
-            placeholder = f"{{{{{title.upper().replace(' ', '_').replace('&', 'AND')}}}}}"
+            placeholder = title.upper().replace(' ', '_').replace('&', 'AND')
             replacements[placeholder] = content_text
         
         # Build back matter sections
         for title, content_text in back_matter_content:
-            placeholder = f"{{{{{title.upper().replace(' ', '_').replace('&', 'AND')}}}}}"
+            placeholder = title.upper().replace(' ', '_').replace('&', 'AND')
             replacements[placeholder] = content_text
         
-        # Main content
-        replacements['{{MAIN_CONTENT}}'] = "\n\n".join(main_content_parts)
+        # Main content, formatted and citation-resolved one section at a time as it is written
+        def main_content():
+            for n, item in enumerate(main_content_items):
+                if n:
+                    yield "\n\n"
+                yield self._format_section(item)
+        
+        replacements['MAIN_CONTENT'] = self._resolve_citations_iter(main_content(), citation_manager)
         
-        # Remove unused placeholders (set to empty string)
+        # Optional sections that were not generated render empty
         all_placeholders = [
-            '{{DEDICATION}}', '{{EPIGRAPH}}', '{{FOREWORD}}', '{{PREFACE}}', 
-            '{{ACKNOWLEDGMENTS}}', '{{EPILOGUE}}', '{{AFTERWORD}}', '{{APPENDICES}}',
-            '{{GLOSSARY}}', '{{NOTES_REFERENCES}}', '{{BIBLIOGRAPHY}}', '{{INDEX}}',
-            '{{ABOUT_AUTHOR}}', '{{OTHER_BOOKS}}'
+            'DEDICATION', 'EPIGRAPH', 'FOREWORD', 'PREFACE',
+            'ACKNOWLEDGMENTS', 'EPILOGUE', 'AFTERWORD', 'APPENDICES',
+            'GLOSSARY', 'NOTES_REFERENCES', 'BIBLIOGRAPHY', 'INDEX',
+            'ABOUT_AUTHOR', 'OTHER_BOOKS'
         ]
         
         for placeholder in all_placeholders:
             if placeholder not in replacements:
                 replacements[placeholder] = ""
         
-        # Apply all replacements
-        compiled_content = template
-        for placeholder, value in replacements.items():
-            compiled_content = compiled_content.replace(placeholder, value)
-        
-        return compiled_content
+        # Substitute every placeholder in one pass over the template
+        print_report(template.report(replacements))
+        template.render_to(out, replacements)
     
     def _compile_markdown(self, topic: str, genre: str, content: list, citation_manager) -> str:
-        """Compile all content into markdown with proper ordering (fallback method)"""
+        """Compile all content into markdown with proper ordering (fallback method), as one string"""
+        
+        buffer = io.StringIO()
+        self._write_markdown(buffer, topic, genre, content, citation_manager)
+        return buffer.getvalue()
+    
+    def _write_markdown(self, out: TextIO, topic: str, genre: str, content: list, citation_manager):
+        """Write all content as markdown to a text stream (fallback method)"""
         
         # Generate metadata header
-        metadata = self._generate_metadata(topic, genre)
+        out.write(self._generate_metadata(topic, genre) + "\n\n")
         
-        # Separate content by type
-        front_matter = []
-        main_content = []
-        back_matter = []
+        # Sections in order: front matter -> main content -> back matter
+        order = {'front_matter': 0, 'back_matter': 2}
+        ordered = sorted(content, key=lambda item: order.get(item['section']['type'], 1))
+        sections = (self._format_section(item) for item in ordered)
+        out.writelines(self._resolve_citations_iter(sections, citation_manager))
+    
+    def _build_draft(self, topic: str, content: list, citation_manager, output_path: Path, draft_format: str, chapters: tuple = None) -> str:
+        """Fast preview: no section files, TOC, numbering or custom fonts; HTML, or a PDF from one LaTeX pass"""
+        
+        if draft_format not in ('html', 'pdf'):
+            raise ValueError(f"Draft builds produce html or pdf, not {draft_format}")
+        start = time.perf_counter()
+        
+        if chapters:
+            content = self._select_chapters(content, *chapters)
+            if not content:
+                raise ValueError(f"No chapters between {chapters[0]} and {chapters[1]}")
+        
+        build_dir = output_path / "build" / self._slugify(topic) / "draft"
+        build_dir.mkdir(parents=True, exist_ok=True)
+        content = self._absolute_images(content, output_path)
+        draft_dir = output_path / "draft"
+        draft_dir.mkdir(exist_ok=True)
+        
+        md_path = build_dir / "draft.md"
+        with open(md_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER) as f:
+            f.write(self._draft_metadata(topic) + "\n\n")
+            f.writelines(self._resolve_citations_iter((self._format_section(item) for item in content), citation_manager))
+        output_file = draft_dir / f"{self._slugify(topic)}_draft.{draft_format}"
         
+        if draft_format == 'html':
+            writer_args = FormatExporter(build_dir, self.filter_path).writer_args('html', [])
+            render_format(str(md_path), 'html5', str(output_file), writer_args, 'markdown')
+        else:
+            tex_path = build_dir / "draft.tex"
+            pypandoc.convert_file(
+                str(md_path),
+                'latex',
+                outputfile=str(tex_path),
+                extra_args=['--standalone', f'--lua-filter={self.filter_path}']
+            )
+            
+            def compile_pdf(engine):
+                run_latex(tex_path, engine)
+                self._publish_pdf(tex_path.with_suffix('.pdf'), output_file)
+            
+            # pdflatex starts fastest with the default fonts; drafts skip preflight, so drop missing engines here
+            engines = sorted(self._engine_order(), key=lambda engine: engine != 'pdflatex')
+            self._compile_with_engines(compile_pdf, [engine for engine in engines if shutil.which(engine)] or engines)
+        
+        self.outputs = {draft_format: str(output_file)}
+        print(f"⚡ Draft {draft_format.upper()} ready in {time.perf_counter() - start:.2f}s: {output_file}")
+        return str(output_file)
+    
+    def _select_chapters(self, content: list, first: int, last: int) -> list:
+        """Chapters first..last (1-based, in book order)"""
+        
+        selected = []
+        number = 0
         for item in content:
-            section_type = item['section']['type']
-            if section_type == 'front_matter':
-                front_matter.append(item)
-            elif section_type == 'back_matter':
-                back_matter.append(item)
+            if item['section']['type'] == 'chapter':
+                number += 1
+                if first <= number <= last:
+                    selected.append(item)
+        return selected
+    
+    def _draft_metadata(self, topic: str) -> str:
+        """Minimal YAML header for drafts: same page geometry, default fonts, plain box environments"""
+        
+        environments = "\n".join(
+            f"    \\newenvironment{{{name}}}{{\\par\\medskip\\hrule\\smallskip\\noindent\\textbf{{{label}}}\\par}}{{\\par\\smallskip\\hrule\\medskip}}"
+            for name, label in DRAFT_BOX_ENVIRONMENTS.items()
+        )
+        width, height = (part.strip() for part in self.pdf_settings['page_size'].split('x'))
+        return f"""---
+title: "{topic.title()} (draft)"
+documentclass: book
+classoption: [oneside, openany]
+geometry: [margin={self.pdf_settings['margin']}, paperwidth={width}, paperheight={height}]
+header-includes:
+  - |
+    ```{{=latex}}
+{environments}
+    ```
+---"""
+    
+    def _use_fragments(self) -> bool:
+        """Incremental builds need per-section citations, which citeproc can't provide"""
+        return self.pdf_settings.get('incremental', False) and self.citation_mode != "citeproc"
+    
+    def _compile_segments(self, topic: str, genre: str, content: list, citation_manager) -> tuple:
+        """Split the book into its YAML header and independently convertible sections
+        
+        Same order and formatting as _compile_markdown, but inline citations
+        are resolved per section so each one carries its own footnotes.
+        """
+        
+        metadata = self._generate_metadata(topic, genre)
+        yaml_end = metadata.index("\n---\n") + len("\n---\n")
+        segments = [("title_page", metadata[yaml_end:], 'title')]
+        
+        order = {'front_matter': 0, 'back_matter': 2}
+        ordered = sorted(content, key=lambda item: order.get(item['section']['type'], 1))
+        for item in ordered:
+            markdown = self._resolve_citations(self._format_section(item), citation_manager)
+            segments.append((self._slugify(item['section']['title']), markdown, item['section']['type']))
+        
+        return metadata[:yaml_end], segments
+    
+    def _build_from_fragments(self, topic: str, genre: str, content: list, citation_manager, output_path: Path, pdf_path: str):
+        """Incremental PDF build: pandoc only re-runs for sections whose markdown changed"""
+        
+        build_dir = output_path / "build" / self._slugify(topic)
+        cache = FragmentCache(
+            build_dir / "fragments",
+            self.filter_path,
+            fragment_args=['--highlight-style=tango'],
+            shell_args=[
+                '--toc',
+                f'--toc-depth={self.pdf_settings["toc_depth"]}',
+                '-N',
+                '--highlight-style=tango',
+                '-V', 'linkcolor=blue',
+                '-V', 'urlcolor=blue'
+            ],
+            template_path=self.template_path
+        )
+        
+        yaml_header, segments = self._compile_segments(topic, genre, content, citation_manager)
+        with self.timer.stage('pandoc_fragments') as stage:
+            fragment_paths = cache.fragments(segments)
+            head, tail = cache.shell(yaml_header)
+            stage.update(cache.stats)
+        print(f"♻️  Reused {cache.stats['hits']}/{cache.stats['hits'] + cache.stats['misses']} LaTeX fragments")
+        
+        cache.prune(fragment_paths)
+        formats = PreambleFormat(output_path / "build" / "formats") if self.pdf_settings.get('precompiled_preamble', False) else None
+        
+        parts = self._group_parts(segments, fragment_paths) if self._use_parallel() else []
+        if len(parts) > 1:
+            print(f"⚡ Compiling {len(parts)} parts in parallel...")
+            
+            def compile_pdf(engine):
+                engine_head, fmt = formats.prepare(head, engine) if formats else (head, None)
+                build = ParallelBuild(build_dir / "parts", engine, self.pdf_settings.get('max_workers'), fmt)
+                self.latex_logs = [build.build_dir / f"part_{n:02d}.log" for n in range(len(parts))]
+                with self.timer.stage('latex', engine=engine, parts=len(parts), runs=build.timings):
+                    build.build(engine_head, tail, parts, pdf_path)
+        else:
+            master_path = build_dir / "book.tex"
+            
+            def compile_pdf(engine):
+                engine_head, fmt = formats.prepare(head, engine) if formats else (head, None)
+                cache.write_master(engine_head, tail, fragment_paths, master_path)
+                self._run_latex(master_path, engine, fmt=fmt)
+                self._publish_pdf(master_path.with_suffix('.pdf'), pdf_path)
+        
+        self._compile_with_engines(compile_pdf)
+    
+    @staticmethod
+    def _publish_pdf(built_path: Path, pdf_path: str):
+        """Copy a finished PDF over the book's PDF in one rename, so viewers never see a partial file"""
+        atomic_write(Path(pdf_path), Path(built_path).read_bytes())
+    
+    def _engine_order(self) -> list:
+        """Engines to try: the ones preflight found working, else the configured pair"""
+        
+        if self.toolchain:
+            if not self.toolchain['engines']:
+                reasons = "; ".join(f"{engine}: {reason}" for engine, reason in self.toolchain['broken'].items())
+                raise RuntimeError(f"No working LaTeX engine ({reasons})")
+            return self.toolchain['engines']
+        engines = [self.pdf_settings['default_engine'], self.pdf_settings.get('fallback_engine')]
+        return [engine for engine in dict.fromkeys(engines) if engine]
+    
+    def _compile_with_engines(self, compile_pdf, engines: list = None):
+        """Call compile_pdf(engine) with each engine in turn until one succeeds"""
+        
+        engines = engines or self._engine_order()
+        for n, engine in enumerate(engines):
+            self.latex_logs = []
+            start = time.perf_counter()
+            try:
+                result = compile_pdf(engine)
+                self.engine_attempts.append({'engine': engine, 'ok': True, 'seconds': round(time.perf_counter() - start, 3)})
+                return result
+            except Exception as e:
+                self.engine_attempts.append({
+                    'engine': engine,
+                    'ok': False,
+                    'seconds': round(time.perf_counter() - start, 3),
+                    'error': str(e).strip()[:2000]
+                })
+                if n == len(engines) - 1:
+                    raise
+                print(f"Error with {engine} ({e}), trying {engines[n + 1]}...")
+    
+    def _use_parallel(self) -> bool:
+        """Parallel chapter builds need pypdf to merge the parts"""
+        
+        if not self.pdf_settings.get('parallel_chapters', False):
+            return False
+        try:
+            import pypdf  # noqa: F401
+        except ImportError:
+            print("⚠️  pypdf not installed, compiling the book as one document")
+            return False
+        return True
+    
+    def _group_parts(self, segments: list, fragment_paths: list) -> list:
+        """Front matter (title, TOC, preface, introduction), one part per chapter, back matter"""
+        
+        parts = [[]]
+        after_chapter = False
+        for (_, _, section_type), path in zip(segments, fragment_paths):
+            if section_type == 'chapter':
+                parts.append([path])
+                after_chapter = True
+            elif after_chapter:
+                parts.append([path])
+                after_chapter = False
             else:
-                main_content.append(item)
+                parts[-1].append(path)
+        return parts
+    
+    def _run_latex(self, tex_path: Path, engine: str, fmt: Path = None):
+        """Run the LaTeX engine in the build directory until the TOC and references settle"""
         
-        # Compile sections in order: front matter -> main content -> back matter
-        sections_md = ""
+        self.latex_logs.append(tex_path.with_suffix('.log'))
+        with self.timer.stage('latex', engine=engine, runs=[]) as stage:
+            runs = run_latex_until_stable(tex_path, engine, fmt, timings=stage['runs'])
+        print(f"🔁 {runs} {engine} run{'s' if runs != 1 else ''}" if runs else f"♻️  {tex_path.name} unchanged, reusing the last PDF")
+    
+    def _resolve_citations(self, markdown: str, citation_manager) -> str:
+        """Turn inline [@key] markers into footnotes or author-date references"""
         
-        # Add front matter
-        for item in front_matter:
-            sections_md += self._format_section(item)
+        if citation_manager is None:
+            return markdown
         
-        # Add main content
-        for item in main_content:
-            sections_md += self._format_section(item)
+        return citation_manager.resolve_citations(markdown, mode=self.citation_mode)
+    
+    def _resolve_citations_iter(self, chunks, citation_manager):
+        """_resolve_citations over markdown arriving in pieces"""
         
-        # Add back matter
-        for item in back_matter:
-            sections_md += self._format_section(item)
+        if citation_manager is None:
+            return iter(chunks)
         
-        # Combine everything
-        complete_md = metadata + "\n\n" + sections_md
+        return citation_manager.resolve_citations_iter(chunks, mode=self.citation_mode)
+    
+    @staticmethod
+    def _section_heading(section: dict) -> str:
+        """Heading for a section whose content has none; the section files get the same one"""
+        section_type = section['type']
         
-        return complete_md
+        # Front matter and back matter should be unnumbered
+        if section_type in ['front_matter', 'back_matter']:
+            return f"# {section['title']} {{.unnumbered}}\n\n"
+        elif section_type in ['preface', 'introduction', 'conclusion']:
+            return f"# {section['title']} {{.unnumbered}}\n\n"
+        elif section_type == 'chapter':
+            return f"# {section['title']}\n\n"
+        else:
+            return f"## {section['title']}\n\n"
     
     def _format_section(self, item: dict) -> str:
         """Format a single section"""
         section = item['section']
         section_content = item['content']
-        section_type = section['type']
         
         formatted = ""
         
-        # Add page break before chapters (ALWAYS)
-        if section_type == 'chapter':
-            formatted += "\\newpage\n\n"
+        # With citeproc, pandoc renders the reference list into the #refs div
+        if self.citation_mode == "citeproc" and section['title'] == "Bibliography":
+            section_content = "## Bibliography\n\n::: {#refs}\n:::"
         
         # Add section heading with appropriate formatting
         if not section_content.strip().startswith('#'):
-            # Front matter and back matter should be unnumbered
-            if section_type in ['front_matter', 'back_matter']:
-                formatted += f"# {section['title']} {{.unnumbered}}\n\n"
-            elif section_type in ['preface', 'introduction', 'conclusion']:
-                formatted += f"# {section['title']} {{.unnumbered}}\n\n"
-            elif section_type == 'chapter':
-                formatted += f"# {section['title']}\n\n"
-            else:
-                formatted += f"## {section['title']}\n\n"
+            formatted += self._section_heading(section)
         
-        # Process content for special formatting (quizzes, did you know boxes)
-        # Pass section title so we can skip Preface/Prologue
-        processed_content = self._format_special_boxes(section_content, section['title'])
-        formatted += processed_content + "\n\n"
+        # Boxes, chapter page breaks and table cells are handled by boxify.lua
+        # in the same pandoc pass that reads the markdown
+        formatted += section_content + "\n\n"
         
         return formatted
     
-    def _format_special_boxes(self, content: str, section_name: str = "") -> str:
-        """Convert special content to fenced divs for Pandoc Lua filter processing
+    def _font_metadata(self) -> str:
+        """mainfont/sansfont/monofont lines, with preflight's substitutes for missing fonts"""
         
-        ONLY apply to chapter content, not to Preface or Prologue
-        """
-        
-        # Skip special formatting for Preface and Prologue
-        if "Preface" in section_name or "Prologue" in section_name or "prologue" in section_name.lower():
-            return content
-        
-        # Convert quiz sections to fenced divs
-        content = re.sub(
-            r'##\s*📝\s*Chapter Quiz\s*\n(.*?)(?=\n##|\n---|\Z)',
-            r'::: quiz\n\n\1\n:::\n',
-            content,
-            flags=re.DOTALL
-        )
-        
-        # Convert "Did You Know?" to fenced divs
-        content = re.sub(
-            r'\n\*\*Did You Know\?\*\*\s*\n((?:(?!\n\*\*).)*?)(?=\n\n|\Z)',
-            r'\n::: didyouknow\n\n\1\n:::\n\n',
-            content,
-            flags=re.DOTALL
-        )
-        
-        # Convert "Key Takeaway" to fenced divs
-        content = re.sub(
-            r'\*\*Key Takeaways?:\*\*\s*\n((?:(?!\n\*\*).)*?)(?=\n\n|\Z)',
-            r'::: keytakeaway\n\n\1\n:::\n\n',
-            content,
-            flags=re.DOTALL
-        )
-        
-        # Convert Case Study to fenced divs
-        content = re.sub(
-            r'\*\*Case Study:\s*(.*?)\*\*\s*\n\n((?:(?!\n\*\*Case Study).)*?)(?=\n\n\*\*|\n##|\Z)',
-            r'::: casestudy\n\n**\1**\n\n\2\n:::\n\n',
-            content,
-            flags=re.DOTALL
-        )
-        
-        return content
+        fonts = self.toolchain['fonts'] if self.toolchain else self.pdf_settings['font']
+        lines = [f'{role}font: "{fonts[role]}"' for role in ('main', 'sans', 'mono') if fonts.get(role)]
+        return "\n".join(lines)
     
     def _generate_metadata(self, topic: str, genre: str) -> str:
         """Generate YAML metadata for PDF"""
@@ -358,9 +832,7 @@ lang: en-US
 documentclass: book
 classoption: [11pt, oneside, openany]
 geometry: [margin={self.pdf_settings['margin']}, paperwidth={self.pdf_settings['page_size'].split('x')[0].strip()}, paperheight={self.pdf_settings['page_size'].split('x')[1].strip()}]
-mainfont: "{self.pdf_settings['font']['main']}"
-sansfont: "{self.pdf_settings['font']['sans']}"
-monofont: "{self.pdf_settings['font']['mono']}"
+{self._font_metadata()}
 
 # Table of Contents
 toc: true
@@ -426,20 +898,33 @@ This work is licensed under the Creative Commons Attribution-NonCommercial-Share
         
         return metadata
     
-    def _convert_to_pdf(self, md_path: str, pdf_path: str):
-        """Convert markdown to PDF using pandoc with Lua filter"""
+    def _convert_to_pdf(
+        self,
+        md_path: str,
+        pdf_path: str,
+        bibliography_path: str = None,
+        citation_style: str = None,
+        build_dir: str = None,
+        ast_path: str = None
+    ):
+        """Convert markdown to PDF: pandoc writes the .tex, the engine runs in a persistent build directory
+        
+        Keeping the aux and toc files between builds means a rebuild runs the
+        engine only as often as cross-references actually change. With
+        ``ast_path`` pandoc reads the already parsed JSON AST instead of the
+        markdown.
+        """
         
         # Get path to Lua filter
-        filter_path = Path(__file__).parent.parent / 'filters' / 'boxify.lua'
+        filter_path = self.filter_path
+        citeproc_args = self._citeproc_args(bibliography_path, citation_style)
+        build_dir = Path(build_dir) if build_dir else Path(pdf_path).parent / "build" / Path(pdf_path).stem
+        build_dir.mkdir(parents=True, exist_ok=True)
+        tex_path = build_dir / "book.tex"
         
-        try:
-            # Try with primary engine
-            pypandoc.convert_file(
-                md_path,
-                'pdf',
-                outputfile=pdf_path,
-                extra_args=[
-                    f'--pdf-engine={self.pdf_settings["default_engine"]}',
+        def compile_pdf(engine):
+            if engine == self.pdf_settings["default_engine"]:
+                extra_args = [
                     '--toc',
                     f'--toc-depth={self.pdf_settings["toc_depth"]}',
                     '-N',
@@ -450,23 +935,72 @@ This work is licensed under the Creative Commons Attribution-NonCommercial-Share
                     '-V', 'urlcolor=blue',
                     f'--lua-filter={filter_path}'
                 ]
-            )
-        except Exception as e:
-            print(f"Error with {self.pdf_settings['default_engine']}, trying {self.pdf_settings['fallback_engine']}...")
-            
-            # Try with fallback engine
-            pypandoc.convert_file(
-                md_path,
-                'pdf',
-                outputfile=pdf_path,
-                extra_args=[
-                    f'--pdf-engine={self.pdf_settings["fallback_engine"]}',
+            else:
+                extra_args = [
                     '--toc',
                     f'--toc-depth={self.pdf_settings["toc_depth"]}',
                     '-N',
                     f'--lua-filter={filter_path}'
                 ]
-            )
+            with self.timer.stage('pandoc_latex', engine=engine, source='ast' if ast_path else 'markdown'):
+                pypandoc.convert_file(
+                    str(ast_path or md_path),
+                    'latex',
+                    format='json' if ast_path else None,
+                    outputfile=str(tex_path),
+                    extra_args=['--standalone'] + extra_args + citeproc_args
+                )
+            self._run_latex(tex_path, engine)
+            self._publish_pdf(tex_path.with_suffix('.pdf'), pdf_path)
+        
+        # Preflight puts a working engine first; the others are fallbacks
+        self._compile_with_engines(compile_pdf)
+    
+    def _citeproc_args(self, bibliography_path: str, citation_style: str) -> list:
+        """Pandoc arguments for rendering [@key] citations with citeproc
+        
+        Runs after the Lua filter so box divs are already in place; the
+        reference list is formatted by the cached CSL style in the same
+        conversion instead of by CitationManager.
+        """
+        
+        if self.citation_mode != "citeproc" or not bibliography_path:
+            return []
+        
+        args = ['--citeproc', f'--bibliography={bibliography_path}', '-M', 'link-citations=true']
+        csl_path = self._csl_style(citation_style)
+        if csl_path:
+            args.append(f'--csl={csl_path}')
+        return args
+    
+    def _csl_style(self, citation_style: str) -> str:
+        """Path to the CSL file for a style, downloaded once into the CSL cache
+        
+        Returns None (pandoc's built-in Chicago author-date) when the style
+        has no configured CSL or the download fails.
+        """
+        
+        url = self.citation_settings.get('csl_styles', {}).get(citation_style)
+        if not url:
+            return None
+        
+        cache_dir = Path(self.citation_settings.get('csl_cache_dir', 'csl_cache'))
+        csl_path = cache_dir / url.rsplit('/', 1)[-1]
+        if csl_path.exists():
+            return str(csl_path)
+        
+        try:
+            response = requests.get(url, timeout=15)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"⚠️  Could not fetch CSL style for {citation_style}: {e}")
+            return None
+        
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = csl_path.with_suffix('.tmp')
+        tmp_path.write_bytes(response.content)
+        os.replace(tmp_path, csl_path)
+        return str(csl_path)
     
     
     def _generate_keywords(self, topic: str, genre: str) -> str:
@@ -0,0 +1,265 @@
+"""
+PDF Optimizer Module
+Post-processes finished PDFs: object streams, duplicate image removal, linearization and a font subsetting audit
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from .section_store import atomic_write
+
+# Subsetted fonts carry a six capital letter tag, e.g. ABCDEF+DejaVuSerif
+SUBSET_TAG = re.compile(r'^[A-Z]{6}\+')
+FONT_FILES = ('/FontFile', '/FontFile2', '/FontFile3')
+COMPONENTS = ('images', 'fonts', 'content', 'other')
+
+
+def available_backend() -> Optional[str]:
+    """pikepdf if installed, else the qpdf command line, else None"""
+    
+    try:
+        import pikepdf  # noqa: F401
+        return 'pikepdf'
+    except ImportError:
+        pass
+    return 'qpdf' if shutil.which('qpdf') else None
+
+
+def _stream_length(stream) -> int:
+    """Encoded size of a pypdf stream object"""
+    # pypdf drops /Length once the stream is read and keeps the raw bytes in _data
+    return len(getattr(stream.get_object(), '_data', b''))
+
+
+def inspect_pdf(pdf_path: str) -> dict:
+    """Bytes per component and every font with its embedding and subsetting state (read with pypdf)
+    
+    Returns ``{'size': ..., 'components': {images, fonts, content, other},
+    'fonts': [{'name', 'embedded', 'subset'}]}``; "other" is everything not
+    reached from a page (structure, outlines, xref).
+    """
+    
+    from pypdf import PdfReader
+    
+    reader = PdfReader(pdf_path)
+    components = dict.fromkeys(COMPONENTS, 0)
+    fonts = {}
+    seen = set()
+    
+    def count(ref, component):
+        """Add one indirect stream to a component once"""
+        key = getattr(ref, 'idnum', None)
+        if key is not None:
+            if key in seen:
+                return False
+            seen.add(key)
+        components[component] += _stream_length(ref)
+        return True
+    
+    def walk_font(font):
+        font = font.get_object()
+        for descendant in font.get('/DescendantFonts', []):
+            walk_font(descendant)
+        # Type0 fonts are wrappers and Type3 glyphs are drawn inline
+        if font.get('/Subtype') in ('/Type0', '/Type3'):
+            return
+        descriptor = font.get('/FontDescriptor')
+        descriptor = descriptor.get_object() if descriptor is not None else {}
+        name = str(font.get('/BaseFont', descriptor.get('/FontName', '?'))).lstrip('/')
+        font_file = next((descriptor[key] for key in FONT_FILES if key in descriptor), None)
+        if font_file is not None:
+            count(font_file, 'fonts')
+        fonts[name] = {'embedded': font_file is not None, 'subset': bool(SUBSET_TAG.match(name))}
+    
+    def walk_resources(resources):
+        if resources is None:
+            return
+        resources = resources.get_object()
+        if '/Font' in resources:
+            for font in resources['/Font'].get_object().values():
+                walk_font(font)
+        if '/XObject' not in resources:
+            return
+        for ref in resources['/XObject'].get_object().values():
+            xobject = ref.get_object()
+            if xobject.get('/Subtype') == '/Image':
+                if count(ref, 'images') and '/SMask' in xobject:
+                    count(xobject['/SMask'], 'images')
+            elif count(ref, 'content'):
+                walk_resources(xobject.get('/Resources'))
+    
+    for page in reader.pages:
+        contents = page.get('/Contents')
+        if contents is not None:
+            for ref in contents.get_object() if isinstance(contents.get_object(), list) else [contents]:
+                count(ref, 'content')
+        walk_resources(page.get('/Resources'))
+    
+    size = os.path.getsize(pdf_path)
+    components['other'] = max(size - sum(components.values()), 0)
+    return {
+        'size': size,
+        'components': components,
+        'fonts': [dict(name=name, **state) for name, state in sorted(fonts.items())]
+    }
+
+
+def dedupe_images(pdf) -> int:
+    """Point every reference to a byte-identical image XObject at one copy (pikepdf); returns copies dropped
+    
+    Soft masks are merged first, so images that only differed in which
+    (identical) mask they pointed at are merged in the second round.
+    """
+    
+    import pikepdf
+    
+    images = [obj for obj in pdf.objects if isinstance(obj, pikepdf.Stream) and obj.get('/Subtype') == '/Image']
+    replaced = {}
+    
+    def merge(group):
+        canonical = {}
+        for image in group:
+            if '/SMask' in image and image.SMask.objgen in replaced:
+                image.SMask = replaced[image.SMask.objgen]
+            digest = hashlib.sha256(image.read_raw_bytes())
+            for key in sorted(image.keys()):
+                value = image[key]
+                if key == '/SMask':
+                    digest.update(f"{key}={value.objgen}".encode())
+                elif key != '/Length':
+                    # pikepdf hands back numbers as Python ints and decimals
+                    digest.update(f"{key}=".encode() + (value.unparse() if isinstance(value, pikepdf.Object) else repr(value).encode()))
+            keeper = canonical.setdefault(digest.hexdigest(), image)
+            if keeper.objgen != image.objgen:
+                replaced[image.objgen] = keeper
+    
+    merge([image for image in images if '/SMask' not in image])
+    merge([image for image in images if '/SMask' in image])
+    if not replaced:
+        return 0
+    
+    # Resources hang off pages, page tree nodes (inherited) and form XObjects
+    for obj in pdf.objects:
+        if not isinstance(obj, (pikepdf.Dictionary, pikepdf.Stream)) or '/Resources' not in obj:
+            continue
+        xobjects = obj.Resources.get('/XObject')
+        if xobjects is None:
+            continue
+        for name in list(xobjects.keys()):
+            if xobjects[name].objgen in replaced:
+                xobjects[name] = replaced[xobjects[name].objgen]
+    return len(replaced)
+
+
+def is_linearized(pdf_path: Path) -> bool:
+    """True if the file starts with a linearization dictionary (fast web view)"""
+    
+    with open(pdf_path, 'rb') as f:
+        return b'/Linearized' in f.read(1024)
+
+
+def optimize_pdf(pdf_path: str, output_path: str = None, linearize: bool = True) -> dict:
+    """Optimize one PDF (in place unless output_path is given) and report on it
+    
+    Module level so a process pool can run it. With pikepdf: identical
+    images merged, unused resources dropped, object streams generated,
+    streams compressed, linearized. With only the qpdf command: the same
+    minus the image merge. With neither, the file is left as it is and
+    only inspected. The result replaces the input when it is smaller, or
+    when it adds linearization the input lacked; otherwise the original is
+    kept. ``report['kept']`` says which.
+    """
+    
+    pdf_path = Path(pdf_path)
+    output_path = Path(output_path) if output_path else pdf_path
+    before = inspect_pdf(str(pdf_path))
+    backend = available_backend()
+    report = {'path': str(output_path), 'backend': backend, 'before': before, 'duplicates_removed': 0, 'kept': 'original'}
+    
+    tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+    try:
+        if backend == 'pikepdf':
+            import pikepdf
+            with pikepdf.open(pdf_path) as pdf:
+                report['duplicates_removed'] = dedupe_images(pdf)
+                pdf.remove_unreferenced_resources()
+                pdf.save(
+                    tmp_path,
+                    object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                    compress_streams=True,
+                    linearize=linearize
+                )
+        elif backend == 'qpdf':
+            command = ['qpdf', '--object-streams=generate', '--compress-streams=y']
+            if linearize:
+                command.append('--linearize')
+            result = subprocess.run(command + [str(pdf_path), str(tmp_path)], capture_output=True, text=True)
+            # Exit code 3 means qpdf finished with warnings
+            if result.returncode not in (0, 3):
+                raise RuntimeError(result.stderr.strip() or f"qpdf exit code {result.returncode}")
+        
+        after = inspect_pdf(str(tmp_path)) if tmp_path.exists() else before
+        # Fast web view is worth a few bytes; a bigger file without it is not
+        gains_linearization = linearize and tmp_path.exists() and is_linearized(tmp_path) and not is_linearized(pdf_path)
+        if tmp_path.exists() and (after['size'] < before['size'] or gains_linearization):
+            atomic_write(output_path, tmp_path.read_bytes())
+            report['kept'] = 'optimized'
+        else:
+            after = before
+            report['duplicates_removed'] = 0
+            if output_path != pdf_path:
+                atomic_write(output_path, pdf_path.read_bytes())
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    
+    report['after'] = after
+    report['linearized'] = is_linearized(output_path)
+    return report
+
+
+def optimize_batch(pdf_paths: List[str], max_workers: int = None, linearize: bool = True) -> List[dict]:
+    """optimize_pdf over many books side by side; a failed book is reported without stopping the rest"""
+    
+    reports = []
+    max_workers = min(len(pdf_paths), max_workers or os.cpu_count() or 4) or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {path: executor.submit(optimize_pdf, str(path), None, linearize) for path in pdf_paths}
+        for path, future in futures.items():
+            try:
+                reports.append(future.result())
+            except Exception as e:
+                print(f"⚠️  Could not optimize {Path(path).name}: {e}")
+    return reports
+
+
+def print_report(report: dict):
+    """Per-component size table and font audit for one optimized PDF"""
+    
+    before, after = report['before'], report['after']
+    print(f"\n📦 {Path(report['path']).name} ({report['backend'] or 'not optimized'})")
+    for component in COMPONENTS + ('total',):
+        old = before['size'] if component == 'total' else before['components'][component]
+        new = after['size'] if component == 'total' else after['components'][component]
+        change = f"{(new - old) / old * 100:+.0f}%" if old else ""
+        print(f"   {component:<8} {old / 1024:>9.1f} KB → {new / 1024:>9.1f} KB  {change}")
+    if report['duplicates_removed']:
+        print(f"   ♻️  {report['duplicates_removed']} duplicate images merged")
+    
+    problems = [font for font in after['fonts'] if not font['embedded'] or not font['subset']]
+    for font in problems:
+        print(f"   ⚠️  Font {font['name']} is {'not subsetted' if font['embedded'] else 'not embedded'}")
+    if not problems:
+        print(f"   ✅ All {len(after['fonts'])} fonts embedded and subsetted")
+    if report['backend'] is None:
+        print("   ⚠️  Install pikepdf or qpdf to optimize; the file was only inspected")
+    elif report['kept'] == 'original':
+        print("   ↩️  The optimized file was not smaller and added no linearization; kept the original")
+    elif report['after']['size'] >= report['before']['size']:
+        print("   🌐 Kept the optimized file for fast web view, though it is not smaller")
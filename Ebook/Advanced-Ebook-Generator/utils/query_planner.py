@@ -0,0 +1,223 @@
+"""
+Query Planner Module
+Clusters a book's sections into few broad search queries and guards the daily quota
+"""
+
+import json
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import List, Dict
+
+import numpy as np
+
+from .context_ranker import ContextRanker, tokenize
+from .section_store import atomic_write
+
+
+RESEARCHED_TYPES = ('chapter', 'introduction')
+
+
+class QueryPlanner:
+    """Plans the smallest set of broad queries that still covers every section"""
+    
+    def __init__(
+        self,
+        results_per_query: int = 10,
+        sections_per_query: int = 3,
+        similarity_threshold: float = 0.15,
+        query_terms: int = 6,
+        results_per_section: int = 5
+    ):
+        """Initialize the planner"""
+        self.results_per_query = min(results_per_query, 10)  # Custom Search maximum
+        self.sections_per_query = sections_per_query
+        self.similarity_threshold = similarity_threshold
+        self.query_terms = query_terms
+        self.results_per_section = results_per_section
+        self.ranker = ContextRanker()
+    
+    def plan(self, topic: str, outline: List[Dict]) -> List[Dict]:
+        """Group researched sections into clusters, one query per cluster
+        
+        Each planned query is ``{'query': str, 'sections': [titles]}``.
+        Sections are merged greedily by the cosine similarity of their
+        title + subsection terms, at most ``sections_per_query`` per query.
+        """
+        
+        sections = [s for s in outline if s['type'] in RESEARCHED_TYPES]
+        if not sections:
+            return []
+        
+        topic_terms = set(tokenize(topic))
+        bags = [
+            Counter(
+                t for t in tokenize(" ".join([s['title']] + s.get('subsections', [])))
+                if t not in topic_terms and not t.isdigit()
+            )
+            for s in sections
+        ]
+        
+        vocab = {term: j for j, term in enumerate({t for bag in bags for t in bag})}
+        vectors = np.zeros((len(bags), max(len(vocab), 1)), dtype=np.float32)
+        for i, bag in enumerate(bags):
+            for term, count in bag.items():
+                vectors[i, vocab[term]] = count
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        similarity = vectors @ vectors.T
+        
+        # Sections with no distinctive terms (e.g. "Introduction") ride along
+        # with whichever cluster ends up smallest instead of costing a query
+        generic = [i for i, bag in enumerate(bags) if not bag]
+        clusters = [[i] for i in range(len(sections)) if bags[i]]
+        while True:
+            best = None
+            for a in range(len(clusters)):
+                for b in range(a + 1, len(clusters)):
+                    if len(clusters[a]) + len(clusters[b]) > self.sections_per_query:
+                        continue
+                    # Average linkage between the two clusters
+                    score = float(similarity[np.ix_(clusters[a], clusters[b])].mean())
+                    if score >= self.similarity_threshold and (best is None or score > best[0]):
+                        best = (score, a, b)
+            if best is None:
+                break
+            _, a, b = best
+            clusters[a] = clusters[a] + clusters[b]
+            del clusters[b]
+        
+        for i in generic:
+            smallest = min(clusters, key=len) if clusters else None
+            if smallest is None or len(smallest) >= self.sections_per_query:
+                clusters.append([i])
+            else:
+                smallest.append(i)
+        
+        planned = []
+        for members in clusters:
+            terms = Counter()
+            for i in members:
+                terms.update(bags[i])
+            top_terms = [term for term, _ in terms.most_common(self.query_terms)]
+            planned.append({
+                'query': " ".join([topic] + top_terms),
+                'sections': [sections[i]['title'] for i in members]
+            })
+        
+        return planned
+    
+    def fan_out(self, plan: List[Dict], planned_results: Dict[str, List[Dict]], outline: List[Dict]) -> Dict[str, List[Dict]]:
+        """Distribute the pooled results of all planned queries to sections
+        
+        Every section is scored against the whole pool, so a result fetched
+        for a neighbouring cluster can still reach the section it fits best.
+        """
+        
+        pool = []
+        seen = set()
+        for entry in plan:
+            for result in planned_results.get(entry['query'], []):
+                key = result.get('link') or result.get('title')
+                if key in seen:
+                    continue
+                seen.add(key)
+                pool.append(result)
+        
+        research_data = {}
+        if not pool:
+            return research_data
+        
+        query_for_section = {title: entry['query'] for entry in plan for title in entry['sections']}
+        doc_tokens = [tokenize(f"{r.get('title', '')} {r.get('snippet', '')}") for r in pool]
+        for section in outline:
+            if section['type'] not in RESEARCHED_TYPES:
+                continue
+            query = self.ranker.query_weights(section['title'], section.get('subsections', []))
+            scores = self.ranker.score(doc_tokens, query)
+            order = [i for i in np.argsort(-scores, kind='stable') if scores[i] > 0]
+            if order:
+                research_data[section['title']] = [pool[i] for i in order[:self.results_per_section]]
+            else:
+                # Nothing matches the section's own terms; use its cluster's results
+                own = planned_results.get(query_for_section.get(section['title']), [])
+                research_data[section['title']] = own[:self.results_per_section]
+        
+        return research_data
+    
+    @staticmethod
+    def report(plan: List[Dict]) -> Dict:
+        """How many queries the plan issues versus one query per section"""
+        
+        naive = sum(len(entry['sections']) for entry in plan)
+        return {
+            'sections': naive,
+            'queries': len(plan),
+            'queries_saved': naive - len(plan)
+        }
+
+
+class QueryBudget:
+    """Persistent per-day counter of paid search queries
+    
+    The file is read and updated under an exclusive lock on ``<file>.lock``
+    (flock), so threads and processes sharing one budget file cannot spend
+    more than the limit between them.
+    """
+    
+    def __init__(self, path: str, daily_limit: int = 100, reserve: int = 10):
+        """Open the budget file; the counter resets when the date changes"""
+        self.path = Path(path)
+        self.daily_limit = daily_limit
+        self.reserve = reserve
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def _locked(self):
+        """Hold the thread lock and, where flock exists, the budget file's lock"""
+        
+        try:
+            import fcntl
+        except ImportError:
+            # No flock on Windows; threads are still serialized
+            fcntl = None
+        
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path.with_name(self.path.name + ".lock"), 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _load(self) -> Dict:
+        today = date.today().isoformat()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        if state.get('date') == today:
+            return state
+        return {'date': today, 'used': 0}
+    
+    def remaining(self) -> int:
+        """Queries left today before the reserve is touched"""
+        with self._locked():
+            return max(0, self.daily_limit - self.reserve - self._load()['used'])
+    
+    def try_spend(self, n: int = 1) -> bool:
+        """Record n queries if the budget allows them"""
+        
+        with self._locked():
+            state = self._load()
+            if state['used'] + n > self.daily_limit - self.reserve:
+                return False
+            state['used'] += n
+            atomic_write(self.path, json.dumps(state).encode('utf-8'))
+            return True
@@ -0,0 +1,197 @@
+"""
+Recompiler Module
+Rebuilds a book from its saved section files, once or every time one is edited
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from .citation_manager import CitationManager
+from .pdf_builder import PDFBuilder
+from .section_store import MANIFEST_NAME, read_manifest
+
+
+class SectionWatcher:
+    """Waits for edits to the section files and reports them once they settle
+    
+    The directory is polled (mtime and size of every *.md). With watchdog
+    installed, file system events (inotify on Linux) wake the poll early, so
+    the interval only bounds how late a missed event is noticed. A batch is
+    reported once nothing has changed for ``debounce`` seconds, so an editor
+    saving several files, or one file in several writes, causes one build.
+    """
+    
+    def __init__(self, sections_dir: str, interval: float = 1.0, debounce: float = 1.0):
+        """Initialize the watcher with the directory as it is now"""
+        self.sections_dir = Path(sections_dir)
+        self.interval = interval
+        self.debounce = debounce
+        self._wake = threading.Event()
+        self._observer = None
+        self._state = self.snapshot()
+    
+    def snapshot(self) -> Dict[str, tuple]:
+        """(mtime, size) of every section file; hidden files such as atomic write temporaries are skipped"""
+        
+        state = {}
+        for path in self.sections_dir.glob("*.md"):
+            if path.name.startswith('.'):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            state[path.name] = (stat.st_mtime_ns, stat.st_size)
+        return state
+    
+    def start(self) -> str:
+        """Listen for file system events if watchdog is installed; returns "events" or "polling" """
+        
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return "polling"
+        
+        wake = self._wake
+        
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                wake.set()
+        
+        self._observer = Observer()
+        self._observer.schedule(Handler(), str(self.sections_dir), recursive=False)
+        self._observer.start()
+        return "events"
+    
+    def stop(self):
+        """Stop listening for events"""
+        
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+    
+    def wait(self, timeout: float = None) -> List[str]:
+        """Block until section files change and then stay quiet for ``debounce`` seconds
+        
+        Returns the names of the files added, edited or removed since the
+        last call ([] if ``timeout`` seconds pass without a change).
+        """
+        
+        deadline = None if timeout is None else time.monotonic() + timeout
+        current = self.snapshot()
+        while current == self._state:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return []
+            self._wake.wait(self.interval if remaining is None else min(self.interval, remaining))
+            self._wake.clear()
+            current = self.snapshot()
+        
+        # Debounce: every further change restarts the quiet period
+        quiet_since = time.monotonic()
+        while time.monotonic() - quiet_since < self.debounce:
+            time.sleep(max(0, min(self.interval, quiet_since + self.debounce - time.monotonic())))
+            latest = self.snapshot()
+            if latest != current:
+                current, quiet_since = latest, time.monotonic()
+        
+        changed = sorted(name for name in set(current) | set(self._state) if current.get(name) != self._state.get(name))
+        self._state = current
+        return changed
+
+
+class Recompiler:
+    """Rebuilds a book from output/sections with the metadata saved in the section manifest
+    
+    Nothing is regenerated: content comes from the section files and
+    citations from the exported <book>_references.json. Incremental builds
+    are always on here, whatever pdf_settings says, so pandoc only re-runs
+    for sections whose markdown changed and unchanged chapter parts are
+    reused; a failed build leaves the last good PDF in place.
+    """
+    
+    def __init__(self, config: dict, output_dir: str = "output", topic: str = None, genre: str = None, formats: list = None):
+        """Initialize the recompiler; topic, genre and formats override the manifest"""
+        
+        self.output_path = Path(output_dir)
+        self.sections_dir = self.output_path / "sections"
+        if not any(self.sections_dir.glob("*.md")):
+            raise FileNotFoundError(f"No section files in {self.sections_dir}")
+        
+        book = read_manifest(self.sections_dir).get('book', {})
+        self.topic = topic or book.get('topic')
+        if not self.topic:
+            raise ValueError(f"No book metadata in {self.sections_dir / MANIFEST_NAME}; pass the topic")
+        self.genre = genre or book.get('genre') or ""
+        self.citation_style = book.get('citation_style')
+        # Every save would otherwise re-run pandoc over the whole book
+        pdf_settings = dict(config.get('pdf_settings') or {}, incremental=True)
+        self.builder = PDFBuilder(dict(config, pdf_settings=pdf_settings))
+        if not self.builder._use_fragments():
+            print("⚠️  citeproc citations need the whole book in one pandoc run; every rebuild converts all sections")
+        self.formats = formats or book.get('formats') or self.builder.pdf_settings.get('formats', ['pdf'])
+        self.builds = 0
+        self.failures = 0
+    
+    def _citation_manager(self):
+        """Citations from the references exported by the original build, if it had any"""
+        
+        if not self.citation_style:
+            return None
+        references_path = self.output_path / (self.builder._slugify(self.topic) + "_references.json")
+        if not references_path.exists():
+            print(f"⚠️  {references_path.name} not found; [@key] citations are left as written")
+            return None
+        return CitationManager.from_csl_json(str(references_path), style=self.citation_style)
+    
+    def run_once(self, changed: list = None) -> bool:
+        """Rebuild the book from the section files; True if every requested output was produced"""
+        
+        if changed:
+            shown = ", ".join(changed[:5]) + (f" and {len(changed) - 5} more" if len(changed) > 5 else "")
+            print(f"\n✏️  Changed: {shown}")
+        
+        self.builds += 1
+        try:
+            self.builder.build(
+                self.topic,
+                self.genre,
+                PDFBuilder.load_sections(self.sections_dir),
+                self._citation_manager(),
+                output_dir=str(self.output_path),
+                formats=self.formats,
+                write_sections=False
+            )
+            missing = [fmt for fmt in self.formats if fmt not in self.builder.outputs]
+        except Exception as e:
+            print(f"❌ Rebuild failed: {e}")
+            missing = self.formats
+        
+        if not missing:
+            return True
+        self.failures += 1
+        pdf_path = self.output_path / (self.builder._slugify(self.topic) + "_ebook.pdf")
+        if 'pdf' in missing and pdf_path.exists():
+            print(f"📄 Keeping the last good PDF: {pdf_path}")
+        return False
+    
+    def watch(self, interval: float = 1.0, debounce: float = 1.0, max_builds: int = None):
+        """Rebuild each time the section files change, until Ctrl+C (or max_builds builds in all)"""
+        
+        watcher = SectionWatcher(self.sections_dir, interval, debounce)
+        mode = watcher.start()
+        print(f"\n👀 Watching {self.sections_dir} ({mode}); press Ctrl+C to stop")
+        try:
+            while max_builds is None or self.builds < max_builds:
+                changed = watcher.wait()
+                if changed:
+                    self.run_once(changed)
+                    print("👀 Watching for changes...")
+        except KeyboardInterrupt:
+            print("\n👋 Stopped watching")
+        finally:
+            watcher.stop()
@@ -3,20 +3,98 @@ Research Engine Module
 Handles web research and information gathering
 """
 
+import json
 import time
-from typing import List, Dict, Optional
+import hashlib
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Optional
 from googleapiclient.discovery import build
 import requests
 from bs4 import BeautifulSoup
 
+from .scholarly_sources import ArxivSource
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into a single execution
+    
+    The first caller for a key runs the function; callers arriving while it is
+    still in flight wait for it and share its result (or its exception).
+    """
+    
+    def __init__(self):
+        """Initialize the in-flight table and counters"""
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.stats = {'calls': 0, 'executed': 0, 'coalesced': 0}
+    
+    def do(self, key: str, fn: Callable):
+        """Run fn for key, or wait for the call already in flight for key"""
+        
+        with self._lock:
+            self.stats['calls'] += 1
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self._in_flight[key] = call
+                self.stats['executed'] += 1
+            else:
+                self.stats['coalesced'] += 1
+        
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+        
+        try:
+            call['result'] = fn()
+        except BaseException as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call['done'].set()
+        
+        return call['result']
+
 
 class ResearchEngine:
     """Research engine for gathering information from web sources"""
     
-    def __init__(self, api_key: str, search_engine_id: str):
-        """Initialize the research engine"""
+    def __init__(
+        self,
+        api_key: str,
+        search_engine_id: str,
+        scholarly_sources: Optional[List] = None,
+        budget=None,
+        cache_dir: Optional[str] = None,
+        local_index=None,
+        cache_ttl: float = 7 * 24 * 3600,
+        min_interval: float = 0.0
+    ):
+        """Initialize the research engine
+        
+        budget is an optional QueryBudget guarding the daily Custom Search
+        quota; cache_dir keeps results of past searches on disk for
+        cache_ttl seconds and local_index (a VectorIndex) serves searches
+        once the quota is low. min_interval spaces out live Custom Search
+        requests; cached and coalesced searches don't wait.
+        """
         self.api_key = api_key
         self.search_engine_id = search_engine_id
+        self.scholarly_sources = scholarly_sources if scholarly_sources is not None else [ArxivSource()]
+        self.budget = budget
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.local_index = local_index
+        self.cache_ttl = cache_ttl
+        self.min_interval = min_interval
+        self._rate_lock = threading.Lock()
+        self._last_request = 0.0
         
         if api_key and search_engine_id:
             try:
@@ -26,19 +104,66 @@ class ResearchEngine:
                 self.search_service = None
         else:
             self.search_service = None
+        
+        # Identical queries in flight at the same time share one request
+        self._flight = SingleFlight()
+    
+    @property
+    def flight_stats(self) -> Dict:
+        """Counters for searches requested, executed and coalesced"""
+        return dict(self._flight.stats)
+    
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normalize a query so trivially different spellings share a key"""
+        return " ".join(query.lower().split())
     
     def search(self, query: str, max_results: int = 5) -> List[Dict]:
-        """Search for information using Google Custom Search"""
+        """Search for information, coalescing identical in-flight queries"""
+        
+        key = f"{self.normalize_query(query)}|{max_results}"
+        results = self._flight.do(key, lambda: self._search(query, max_results))
+        
+        # Every caller gets its own copy of the shared result
+        return [dict(result) for result in results]
+    
+    def search_many(self, queries: List[str], max_results: int = 5, max_workers: int = 4) -> Dict[str, List[Dict]]:
+        """Run several searches concurrently, returning results keyed by query"""
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {query: executor.submit(self.search, query, max_results) for query in queries}
+        
+        return {query: future.result() for query, future in futures.items()}
+    
+    def _search(self, query: str, max_results: int) -> List[Dict]:
+        """Search for information using Google Custom Search
+        
+        Order of preference: cached results, a live search while the daily
+        budget allows it, the local corpus, then Wikipedia.
+        """
+        
+        cached = self._read_cache(query, max_results)
+        if cached is not None:
+            return cached
         
         if not self.search_service:
             return self._fallback_research(query)
         
+        if self.budget is not None and not self.budget.try_spend():
+            print(f"Search budget low, using local sources for: {query}")
+            if self.local_index is not None and len(self.local_index):
+                local_results = self.local_index.search_results(query, k=max_results)
+                if local_results:
+                    return local_results
+            return self._fallback_research(query)
+        
         try:
             results = []
+            self._wait_for_slot()
             response = self.search_service.cse().list(
                 q=query,
                 cx=self.search_engine_id,
-                num=max_results
+                num=min(max_results, 10)
             ).execute()
             
             if 'items' in response:
@@ -50,12 +175,47 @@ class ResearchEngine:
                         'source': 'Google Search'
                     })
             
+            self._write_cache(query, max_results, results)
             return results
             
         except Exception as e:
             print(f"Search error: {e}")
             return self._fallback_research(query)
     
+    def _wait_for_slot(self):
+        """Block until min_interval has passed since the previous live request"""
+        
+        with self._rate_lock:
+            wait = self._last_request + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request = time.monotonic()
+    
+    def _cache_file(self, query: str, max_results: int) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        key = hashlib.sha1(f"{self.normalize_query(query)}|{max_results}".encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{key}.json"
+    
+    def _read_cache(self, query: str, max_results: int) -> Optional[List[Dict]]:
+        cache_file = self._cache_file(query, max_results)
+        if cache_file is None or not cache_file.exists():
+            return None
+        # Stale results are searched again (and overwritten)
+        if time.time() - cache_file.stat().st_mtime > self.cache_ttl:
+            return None
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _write_cache(self, query: str, max_results: int, results: List[Dict]):
+        cache_file = self._cache_file(query, max_results)
+        # An empty answer may be a transient problem; don't pin it for cache_ttl
+        if cache_file is None or not results:
+            return
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f)
+    
     def _fallback_research(self, query: str) -> List[Dict]:
         """Fallback research method when API is not available"""
         
@@ -84,16 +244,44 @@ class ResearchEngine:
             print(f"Fallback research error: {e}")
             return []
     
-    def get_scholarly_articles(self, query: str, max_results: int = 3) -> List[Dict]:
-        """Search for scholarly articles (placeholder for future implementation)"""
+    def get_scholarly_articles(self, query: str, max_results: int = 3, citation_manager=None) -> List[Dict]:
+        """Search the configured scholarly sources, optionally recording citations"""
+        
+        return self.get_scholarly_articles_many([query], max_results, citation_manager)[query]
+    
+    def get_scholarly_articles_many(self, queries: List[str], max_results: int = 3, citation_manager=None) -> Dict[str, List[Dict]]:
+        """Batch scholarly search; each source is asked in turn until max_results are found"""
+        
+        articles = {query: [] for query in queries}
+        
+        for source in self.scholarly_sources:
+            pending = [q for q in queries if len(articles[q]) < max_results]
+            if not pending:
+                break
+            
+            try:
+                batch = source.search_batch(pending, max_results)
+            except Exception as e:
+                print(f"Scholarly search error ({source.name}): {e}")
+                continue
+            
+            for query, results in batch.items():
+                articles[query].extend(results[:max_results - len(articles[query])])
         
-        # This would integrate with scholarly APIs like:
-        # - Google Scholar API
-        # - PubMed API
-        # - arXiv API
-        # - Semantic Scholar API
+        if citation_manager is not None:
+            for results in articles.values():
+                for article in results:
+                    citation = {
+                        'title': article['title'],
+                        'url': article['link'],
+                        'authors': article['authors'],
+                        'year': article['year'],
+                        'doi': article.get('doi', ''),
+                        'source': article['source']
+                    }
+                    citation_manager.add_citation({k: v for k, v in citation.items() if v})
         
-        return []
+        return articles
     
     def extract_facts(self, url: str) -> Dict:
         """Extract key facts from a URL"""
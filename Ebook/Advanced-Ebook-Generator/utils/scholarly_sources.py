@@ -0,0 +1,194 @@
+"""
+Scholarly Sources Module
+Pluggable scholarly search backends (arXiv first) with caching and rate limiting
+"""
+
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional, IO
+from xml.etree import ElementTree
+
+import requests
+
+from .context_ranker import tokenize
+
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+ARXIV = "{http://arxiv.org/schemas/atom}"
+
+
+def parse_arxiv_feed(stream: IO[bytes]) -> List[Dict]:
+    """Parse an arXiv Atom feed incrementally from a byte stream
+    
+    Entries are cleared as soon as they are read, so memory stays flat no
+    matter how large the response is.
+    """
+    
+    results = []
+    for _, element in ElementTree.iterparse(stream, events=('end',)):
+        if element.tag != f"{ATOM}entry":
+            continue
+        
+        title = " ".join((element.findtext(f"{ATOM}title") or "").split())
+        summary = " ".join((element.findtext(f"{ATOM}summary") or "").split())
+        published = element.findtext(f"{ATOM}published") or ""
+        authors = [
+            " ".join((author.findtext(f"{ATOM}name") or "").split())
+            for author in element.findall(f"{ATOM}author")
+        ]
+        
+        pdf_link = ""
+        for link in element.findall(f"{ATOM}link"):
+            if link.get('title') == 'pdf':
+                pdf_link = link.get('href', '')
+        
+        results.append({
+            'title': title,
+            'link': (element.findtext(f"{ATOM}id") or "").strip(),
+            'pdf_link': pdf_link,
+            'snippet': summary,
+            'authors': [a for a in authors if a] or ['Unknown Author'],
+            'year': int(published[:4]) if published[:4].isdigit() else None,
+            'doi': (element.findtext(f"{ARXIV}doi") or "").strip(),
+            'source': 'arXiv'
+        })
+        element.clear()
+    
+    return results
+
+
+class ScholarlySource:
+    """Base class for scholarly backends
+    
+    Subclasses implement ``_fetch``; this class adds a per-source rate limit,
+    an in-memory and optional on-disk cache of parsed results, and batching.
+    Cached results expire after ``cache_ttl`` seconds and empty ones are
+    never cached, so a transient outage is retried on the next search.
+    """
+    
+    name = "scholarly"
+    min_interval = 1.0  # seconds between requests to this source
+    
+    def __init__(self, cache_dir: Optional[str] = None, min_interval: Optional[float] = None, cache_ttl: float = 7 * 24 * 3600):
+        """Initialize the source"""
+        if min_interval is not None:
+            self.min_interval = min_interval
+        self.cache_dir = Path(cache_dir) / self.name if cache_dir else None
+        self.cache_ttl = cache_ttl
+        self._cache = {}
+        self._rate_lock = threading.Lock()
+        self._last_request = 0.0
+        self.session = requests.Session()
+    
+    def search(self, query: str, max_results: int = 3) -> List[Dict]:
+        """Search the source, serving repeated queries from the cache"""
+        
+        key = self._cache_key(query, max_results)
+        cached = self._read_cache(key)
+        if cached is not None:
+            return cached
+        
+        self._wait_for_slot()
+        results = self._fetch(query, max_results)
+        self._write_cache(key, results)
+        return results
+    
+    def search_batch(self, queries: List[str], max_results: int = 3) -> Dict[str, List[Dict]]:
+        """Search many queries over one session, de-duplicated and rate limited
+        
+        A query that fails (timeout, bad response) gets no results and is not
+        cached; the rest of the batch still runs.
+        """
+        
+        by_key = {}
+        results = {}
+        for query in queries:
+            key = " ".join(query.lower().split())
+            if key not in by_key:
+                try:
+                    by_key[key] = self.search(query, max_results)
+                except Exception as e:
+                    print(f"Scholarly search error ({self.name}, {query!r}): {e}")
+                    by_key[key] = []
+            results[query] = by_key[key]
+        return results
+    
+    def _fetch(self, query: str, max_results: int) -> List[Dict]:
+        """Fetch and parse results for one query"""
+        raise NotImplementedError
+    
+    def _wait_for_slot(self):
+        """Block until min_interval has passed since the previous request"""
+        
+        with self._rate_lock:
+            wait = self._last_request + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request = time.monotonic()
+    
+    def _cache_key(self, query: str, max_results: int) -> str:
+        normalized = " ".join(query.lower().split())
+        return hashlib.sha1(f"{normalized}|{max_results}".encode('utf-8')).hexdigest()
+    
+    def _read_cache(self, key: str) -> Optional[List[Dict]]:
+        if key in self._cache:
+            written, results = self._cache[key]
+            if time.time() - written <= self.cache_ttl:
+                return results
+            del self._cache[key]
+        
+        if self.cache_dir:
+            cache_file = self.cache_dir / f"{key}.json"
+            # Stale results are fetched again (and overwritten)
+            if cache_file.exists() and time.time() - cache_file.stat().st_mtime <= self.cache_ttl:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    results = json.load(f)
+                self._cache[key] = (cache_file.stat().st_mtime, results)
+                return results
+        
+        return None
+    
+    def _write_cache(self, key: str, results: List[Dict]):
+        # An empty answer may be a transient problem; don't pin it for cache_ttl
+        if not results:
+            return
+        self._cache[key] = (time.time(), results)
+        
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_dir / f"{key}.json", 'w', encoding='utf-8') as f:
+                json.dump(results, f)
+
+
+class ArxivSource(ScholarlySource):
+    """arXiv API backend (Atom feed)"""
+    
+    name = "arxiv"
+    min_interval = 3.0  # arXiv asks clients to wait 3 seconds between calls
+    base_url = "http://export.arxiv.org/api/query"
+    
+    def __init__(self, base_url: Optional[str] = None, timeout: int = 30, **kwargs):
+        """Initialize the arXiv source; base_url can point at a local mirror"""
+        super().__init__(**kwargs)
+        if base_url:
+            self.base_url = base_url
+        self.timeout = timeout
+    
+    def _fetch(self, query: str, max_results: int) -> List[Dict]:
+        """Stream the Atom response straight into the parser"""
+        
+        # AND the most significant terms; a whole-title phrase rarely matches
+        terms = list(dict.fromkeys(tokenize(query)))[:4] or [query]
+        params = {
+            'search_query': " AND ".join(f"all:{term}" for term in terms),
+            'start': 0,
+            'max_results': max_results,
+            'sortBy': 'relevance'
+        }
+        with self.session.get(self.base_url, params=params, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            return parse_arxiv_feed(response.raw)[:max_results]
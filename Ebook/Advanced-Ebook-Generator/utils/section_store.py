@@ -0,0 +1,168 @@
+"""
+Section Store Module
+Writes section markdown files atomically, skips unchanged ones and keeps a hash manifest beside them
+"""
+
+import hashlib
+import json
+import os
+import stat
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+
+# Bump when the manifest layout changes
+MANIFEST_VERSION = "1"
+MANIFEST_NAME = "manifest.json"
+
+# Read once at import; os.umask can only be read by setting it, which is not thread-safe
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def content_hash(data: bytes) -> str:
+    """sha256 of a section file's bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def atomic_write(path: Path, data: bytes):
+    """Write a file so readers see either the old or the new content, never a partial one
+    
+    The data goes to a temporary file in the same directory, is fsynced and
+    then renamed over the target; the directory is fsynced afterwards so the
+    rename itself survives a crash (where the platform allows it). The file
+    keeps the target's permissions, or gets the umask default if it is new,
+    rather than the 0600 of the temporary file.
+    """
+    
+    path = Path(path)
+    try:
+        mode = stat.S_IMODE(path.stat().st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    
+    try:
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        # Directories cannot be opened on Windows; the rename is still atomic
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def read_manifest(sections_dir: str) -> dict:
+    """A sections directory's manifest (empty if missing, unreadable or outdated)"""
+    
+    try:
+        with open(Path(sections_dir) / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest
+
+
+class SectionStore:
+    """The sections directory and its manifest
+    
+    ``manifest.json`` maps each section file to the sha256 of its content
+    plus its type and title, as of the last write. A file is only rewritten
+    when its bytes change, so mtimes stay put for unchanged sections.
+    ``topic`` names the book that wrote them and ``book`` holds the metadata
+    (topic, genre, citation style, formats) needed to rebuild it from these
+    files alone.
+    """
+    
+    def __init__(self, sections_dir: str):
+        """Initialize the store"""
+        self.sections_dir = Path(sections_dir)
+        self.sections_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.sections_dir / MANIFEST_NAME
+        saved = read_manifest(self.sections_dir)
+        self.manifest = saved.get('sections', {})
+        self.book = saved.get('book', {})
+        self.topic = saved.get('topic')
+        self.written = []
+        self.unchanged = []
+    
+    def write(self, filename: str, text: str, section_type: str = None, title: str = None) -> bool:
+        """Write one section file unless its content is unchanged; True if it was written"""
+        
+        data = text.encode('utf-8')
+        digest = content_hash(data)
+        path = self.sections_dir / filename
+        
+        if self._on_disk_hash(path) == digest:
+            self.unchanged.append(filename)
+            changed = False
+        else:
+            atomic_write(path, data)
+            self.written.append(filename)
+            changed = True
+        
+        self.manifest[filename] = {'sha256': digest, 'type': section_type, 'title': title}
+        return changed
+    
+    def _on_disk_hash(self, path: Path) -> Optional[str]:
+        """Hash of the file as it is now, or None if there is none"""
+        
+        try:
+            return content_hash(path.read_bytes())
+        except OSError:
+            return None
+    
+    def commit(self, book: dict = None, topic: str = None) -> list:
+        """Save the manifest for the files written since the store was opened
+        
+        When the same book (``topic``) wrote the previous manifest, section
+        files it listed but this build did not write are removed (renamed or
+        dropped sections). Files another book left in a shared directory are
+        only dropped from the manifest, never deleted. ``book`` replaces the
+        stored book metadata (kept as it was if None). Returns the removed
+        file names.
+        """
+        
+        same_book = topic is None or self.topic in (None, topic)
+        current = set(self.written) | set(self.unchanged)
+        removed = []
+        for filename in sorted(set(self.manifest) - current):
+            if same_book:
+                try:
+                    (self.sections_dir / filename).unlink()
+                    removed.append(filename)
+                except FileNotFoundError:
+                    pass
+            del self.manifest[filename]
+        
+        if topic is not None:
+            self.topic = topic
+        if book is not None:
+            self.book = dict(book)
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'topic': self.topic,
+            'book': self.book,
+            'sections': dict(sorted(self.manifest.items()))
+        }
+        atomic_write(self.manifest_path, (json.dumps(manifest, indent=2, ensure_ascii=False) + "\n").encode('utf-8'))
+        return removed
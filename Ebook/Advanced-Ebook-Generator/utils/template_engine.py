@@ -0,0 +1,102 @@
+"""
+Template Engine Module
+Parses {{PLACEHOLDER}} templates once and renders them in a single linear pass
+"""
+
+import io
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, TextIO, Union
+
+
+PLACEHOLDER_PATTERN = re.compile(r'\{\{([A-Z0-9_]+)\}\}')
+
+
+class CompiledTemplate:
+    """A template split into literal text and placeholder segments
+    
+    Rendering walks the segments once, so the output is written in one pass
+    and placeholder-like text inside substituted values (e.g. generated
+    content mentioning ``{{BIBLIOGRAPHY}}``) is never substituted again.
+    """
+    
+    def __init__(self, source: str):
+        """Parse the template"""
+        self.segments = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            if match.start() > position:
+                self.segments.append((False, source[position:match.start()]))
+            self.segments.append((True, match.group(1)))
+            position = match.end()
+        if position < len(source):
+            self.segments.append((False, source[position:]))
+        
+        self.placeholders = list(dict.fromkeys(value for is_placeholder, value in self.segments if is_placeholder))
+    
+    def report(self, values: Dict[str, str]) -> Dict[str, List[str]]:
+        """Placeholders with no value (rendered empty) and values with no placeholder"""
+        
+        placeholders = set(self.placeholders)
+        return {
+            'unknown': [name for name in self.placeholders if name not in values],
+            'unused': [name for name in values if name not in placeholders]
+        }
+    
+    def render_to(self, out: TextIO, values: Dict[str, Union[str, Iterable[str]]]):
+        """Write the rendered template to a text stream
+        
+        A value may also be an iterable of strings (e.g. a generator over
+        sections), written piece by piece; it is consumed, so give it to a
+        single placeholder.
+        """
+        
+        for is_placeholder, value in self.segments:
+            if not is_placeholder:
+                out.write(value)
+                continue
+            value = values.get(value, "")
+            if isinstance(value, str):
+                out.write(value)
+            else:
+                out.writelines(value)
+    
+    def render(self, values: Dict[str, str]) -> str:
+        """Rendered template as a string"""
+        
+        buffer = io.StringIO()
+        self.render_to(buffer, values)
+        return buffer.getvalue()
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_template(path: str) -> CompiledTemplate:
+    """Compiled template for a file, re-parsed only when the file changes"""
+    
+    path = Path(path).resolve()
+    stat = path.stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    
+    with _cache_lock:
+        cached = _cache.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        template = CompiledTemplate(f.read())
+    with _cache_lock:
+        _cache[path] = (stamp, template)
+    return template
+
+
+def print_report(report: Dict[str, List[str]]):
+    """Warn about template placeholders and values that did not line up"""
+    
+    if report['unknown']:
+        print(f"⚠️  Template placeholders without a value (left empty): {', '.join(report['unknown'])}")
+    if report['unused']:
+        print(f"⚠️  Values with no matching template placeholder: {', '.join(report['unused'])}")
@@ -0,0 +1,221 @@
+"""
+Toolchain Module
+Probes pandoc, the LaTeX engines, fonts and the Lua filter once and caches the results on disk
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import pypandoc
+
+
+# Bump when the probes change to invalidate cached reports
+PREFLIGHT_VERSION = "1"
+
+# Metric-compatible or close look-alikes for the usual configured fonts,
+# tried in order when the font itself is not installed
+FONT_SUBSTITUTES = {
+    'georgia': ['Gelasio', 'TeX Gyre Pagella', 'Liberation Serif', 'DejaVu Serif'],
+    'times new roman': ['Liberation Serif', 'TeX Gyre Termes', 'DejaVu Serif'],
+    'arial': ['Liberation Sans', 'Arimo', 'TeX Gyre Heros', 'DejaVu Sans'],
+    'helvetica': ['Liberation Sans', 'TeX Gyre Heros', 'DejaVu Sans'],
+    'courier new': ['Liberation Mono', 'Cousine', 'TeX Gyre Cursor', 'DejaVu Sans Mono'],
+}
+ROLE_FALLBACKS = {
+    'main': ['DejaVu Serif', 'Latin Modern Roman'],
+    'sans': ['DejaVu Sans', 'Latin Modern Sans'],
+    'mono': ['DejaVu Sans Mono', 'Latin Modern Mono'],
+}
+
+FILTER_PROBE = "::: quiz\nWhat is stored?\n:::\n"
+FILTER_EXPECTED = "\\begin{quizbox}"
+
+
+def pick_font(requested: str, role: str, installed: Set[str]) -> Optional[str]:
+    """The requested font if installed, else the first installed substitute (None if nothing fits)"""
+    
+    candidates = [requested] + FONT_SUBSTITUTES.get(requested.lower(), []) + ROLE_FALLBACKS.get(role, [])
+    for family in candidates:
+        if family.lower() in installed:
+            return family
+    return None
+
+
+def installed_families() -> Optional[Set[str]]:
+    """Lower-cased font families known to fontconfig, or None without fontconfig"""
+    
+    if not shutil.which('fc-list'):
+        return None
+    result = subprocess.run(['fc-list', '--format', '%{family}\\n'], capture_output=True, text=True, errors='replace')
+    return {
+        family.strip().lower()
+        for line in result.stdout.splitlines()
+        for family in line.split(',')
+        if family.strip()
+    }
+
+
+def tool_version(command: str) -> Optional[str]:
+    """First line of ``command --version``, or None if the tool is missing"""
+    
+    if not shutil.which(command):
+        return None
+    try:
+        result = subprocess.run([command, '--version'], capture_output=True, text=True, errors='replace', timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return (result.stdout.splitlines() or [""])[0].strip() or None
+
+
+class Toolchain:
+    """Preflight of everything the PDF build shells out to
+    
+    Version probes are cheap and run every time; they form the cache key
+    for the expensive part (engine smoke compiles, font resolution, Lua
+    filter check), which is stored as JSON and reused until pandoc, an
+    engine, the installed fonts, the filter or the configuration change.
+    """
+    
+    def __init__(self, pdf_settings: dict, filter_path: str, cache_path: str):
+        """Initialize the preflight"""
+        self.pdf_settings = pdf_settings
+        self.filter_path = Path(filter_path)
+        self.cache_path = Path(cache_path)
+    
+    def _requested_engines(self) -> List[str]:
+        """Configured engines in order of preference"""
+        
+        engines = [self.pdf_settings['default_engine'], self.pdf_settings.get('fallback_engine')]
+        return [engine for engine in dict.fromkeys(engines) if engine]
+    
+    def _key(self, versions: Dict[str, Optional[str]], families: Optional[Set[str]]) -> str:
+        """Cache key over tool versions, installed fonts, the filter and the configuration"""
+        
+        digest = hashlib.sha256(PREFLIGHT_VERSION.encode())
+        digest.update(json.dumps(versions, sort_keys=True).encode())
+        digest.update(json.dumps(sorted(families) if families is not None else None).encode())
+        digest.update(json.dumps([self.pdf_settings.get('font', {}), self._requested_engines()], sort_keys=True).encode())
+        if self.filter_path.exists():
+            digest.update(self.filter_path.read_bytes())
+        return digest.hexdigest()
+    
+    def check(self) -> dict:
+        """Preflight report, from the disk cache when nothing changed
+        
+        Keys: ``pandoc`` (version or None), ``engines`` (working engines in
+        order of preference), ``broken`` (engine -> reason), ``fonts``
+        (role -> family to use, or None to keep pandoc's default) and
+        ``filter_ok`` (True/False, None when pandoc is missing).
+        """
+        
+        try:
+            pandoc_version = pypandoc.get_pandoc_version()
+        except OSError:
+            pandoc_version = None
+        versions = {'pandoc': pandoc_version}
+        versions.update({engine: tool_version(engine) for engine in self._requested_engines()})
+        families = installed_families()
+        key = self._key(versions, families)
+        
+        if self.cache_path.exists():
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+                if cached.get('key') == key:
+                    return cached['report']
+            except (OSError, ValueError):
+                pass
+        
+        report = self._probe(versions, families)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'report': report}, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+        return report
+    
+    def _probe(self, versions: Dict[str, Optional[str]], families: Optional[Set[str]]) -> dict:
+        """Run the expensive probes"""
+        
+        print("🔍 Checking the PDF toolchain...")
+        fonts = {}
+        for role, requested in self.pdf_settings.get('font', {}).items():
+            # Without fontconfig there is nothing to check against; trust the configuration
+            fonts[role] = requested if families is None else pick_font(requested, role, families)
+        
+        engines, broken = [], {}
+        for engine in self._requested_engines():
+            if versions.get(engine) is None:
+                broken[engine] = "not installed"
+                continue
+            error = self._smoke_test(engine, fonts)
+            if error and any(fonts.values()) and self._smoke_test(engine, {}) is None:
+                # The engine is fine; only the fonts are unusable
+                print(f"⚠️  {engine} cannot load the configured fonts, using its defaults")
+                fonts = {role: None for role in fonts}
+                error = None
+            if error:
+                broken[engine] = error
+            else:
+                engines.append(engine)
+        
+        return {
+            'pandoc': versions.get('pandoc'),
+            'engines': engines,
+            'broken': broken,
+            'fonts': fonts,
+            'filter_ok': self._check_filter() if versions.get('pandoc') else None
+        }
+    
+    def _smoke_test(self, engine: str, fonts: Dict[str, Optional[str]]) -> Optional[str]:
+        """Compile a one-line book with the engine and fonts; None on success, else the reason"""
+        
+        preamble = "\\documentclass{book}\n"
+        commands = {'main': 'setmainfont', 'sans': 'setsansfont', 'mono': 'setmonofont'}
+        if engine != 'pdflatex' and any(fonts.values()):
+            preamble += "\\usepackage{fontspec}\n"
+            for role, family in fonts.items():
+                if family and role in commands:
+                    preamble += f"\\{commands[role]}{{{family}}}\n"
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            tex_path = Path(tmp) / "preflight.tex"
+            tex_path.write_text(preamble + "\\begin{document}\nPreflight\n\\end{document}\n", encoding='utf-8')
+            try:
+                result = subprocess.run(
+                    [engine, '-interaction=nonstopmode', '-halt-on-error', tex_path.name],
+                    cwd=tmp, capture_output=True, text=True, errors='replace', timeout=120
+                )
+            except (OSError, subprocess.TimeoutExpired) as e:
+                return str(e)
+            if result.returncode != 0 or not tex_path.with_suffix('.pdf').exists():
+                errors = [line for line in result.stdout.splitlines() if line.startswith('!')]
+                return errors[0] if errors else f"exit code {result.returncode}"
+        return None
+    
+    def _check_filter(self) -> bool:
+        """Whether boxify.lua loads and turns a quiz div into its LaTeX environment"""
+        
+        try:
+            latex = pypandoc.convert_text(FILTER_PROBE, 'latex', format='markdown', extra_args=[f'--lua-filter={self.filter_path}'])
+        except (RuntimeError, OSError) as e:
+            print(f"⚠️  Lua filter check failed: {e}")
+            return False
+        return FILTER_EXPECTED in latex
+
+
+def print_report(report: dict):
+    """One-line summary of a preflight report"""
+    
+    engines = ", ".join(report['engines']) or "none"
+    print(f"🧰 pandoc {report['pandoc'] or 'missing'}; working engines: {engines}")
+    for engine, reason in report['broken'].items():
+        print(f"⚠️  {engine} unusable: {reason}")
+    if report['filter_ok'] is False:
+        print("⚠️  boxify.lua did not produce box environments; boxes will render as plain text")
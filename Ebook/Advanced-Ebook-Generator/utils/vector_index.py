@@ -0,0 +1,222 @@
+"""
+Vector Index Module
+Local hashed n-gram embeddings and a memory-mapped index of research chunks
+"""
+
+import os
+import json
+import hashlib
+import zlib
+from pathlib import Path
+from typing import List, Dict, Optional
+
+import numpy as np
+
+from .context_ranker import TOKEN_PATTERN, split_passages
+
+
+class HashingEmbedder:
+    """Embeds text as signed hashed word and character n-gram counts"""
+    
+    def __init__(self, dim: int = 1024, char_ngrams: tuple = (3, 4, 5)):
+        """Initialize the embedder"""
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+    
+    def _features(self, text: str) -> List[str]:
+        """Word unigrams, word bigrams and character n-grams of each word"""
+        
+        words = TOKEN_PATTERN.findall(text.lower())
+        features = list(words)
+        features.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+        for word in words:
+            padded = f"<{word}>"
+            for n in self.char_ngrams:
+                features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts into L2-normalized float32 rows"""
+        
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                # crc32 is stable across processes, unlike hash()
+                h = zlib.crc32(feature.encode('utf-8'))
+                matrix[row, h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        return matrix
+
+
+class VectorIndex:
+    """Cosine-similarity index over research chunks, persisted with memory mapping
+    
+    The directory holds ``vectors.npy`` (float32, one row per chunk, opened
+    with ``mmap_mode='r'``) and ``chunks.json`` with the chunk metadata, so
+    an index built for one book can be reopened and extended by the next.
+    """
+    
+    VECTORS_FILE = "vectors.npy"
+    CHUNKS_FILE = "chunks.json"
+    
+    def __init__(self, path: Optional[str] = None, dim: int = 1024):
+        """Open the index at path, or start an empty in-memory index"""
+        self.path = Path(path) if path else None
+        self.embedder = HashingEmbedder(dim=dim)
+        
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.chunks = []
+        self._pending_vectors = []
+        self._pending_chunks = []
+        self._ids = set()
+        
+        if self.path and (self.path / self.VECTORS_FILE).exists():
+            self._load()
+    
+    def __len__(self) -> int:
+        return len(self.chunks) + len(self._pending_chunks)
+    
+    def _load(self):
+        """Memory-map the stored vectors and read chunk metadata"""
+        
+        vectors = np.load(self.path / self.VECTORS_FILE, mmap_mode='r')
+        if vectors.shape[1] != self.embedder.dim:
+            raise ValueError(
+                f"Index at {self.path} has dimension {vectors.shape[1]}, expected {self.embedder.dim}"
+            )
+        
+        with open(self.path / self.CHUNKS_FILE, 'r', encoding='utf-8') as f:
+            self.chunks = json.load(f)
+        
+        self.vectors = vectors
+        self._ids = {chunk['id'] for chunk in self.chunks}
+    
+    def add(self, chunks: List[Dict]) -> int:
+        """Add chunks (dicts with at least 'text'), skipping ones already indexed"""
+        
+        new_chunks = []
+        for chunk in chunks:
+            text = chunk.get('text', '').strip()
+            if not text:
+                continue
+            chunk_id = hashlib.sha1(text.encode('utf-8')).hexdigest()
+            if chunk_id in self._ids:
+                continue
+            self._ids.add(chunk_id)
+            new_chunks.append({**chunk, 'id': chunk_id, 'text': text})
+        
+        if new_chunks:
+            self._pending_vectors.append(self.embedder.embed([c['text'] for c in new_chunks]))
+            self._pending_chunks.extend(new_chunks)
+        
+        return len(new_chunks)
+    
+    def add_research(self, results: List[Dict], book: str = "") -> int:
+        """Chunk search results (snippets and page text) and add them"""
+        
+        chunks = []
+        for passage in split_passages(results):
+            chunks.append({
+                'title': passage['title'],
+                'link': passage['link'],
+                'source': passage['source'],
+                'text': passage['text'],
+                'book': book,
+            })
+        return self.add(chunks)
+    
+    def save(self):
+        """Write pending chunks to disk and reopen the vectors memory-mapped"""
+        
+        if not self.path or not self._pending_chunks:
+            return
+        
+        self.path.mkdir(parents=True, exist_ok=True)
+        pending = np.vstack(self._pending_vectors)
+        total = len(self.chunks) + len(pending)
+        
+        tmp_vectors = self.path / (self.VECTORS_FILE + ".tmp")
+        out = np.lib.format.open_memmap(tmp_vectors, mode='w+', dtype=np.float32, shape=(total, self.embedder.dim))
+        out[:len(self.chunks)] = self.vectors
+        out[len(self.chunks):] = pending
+        out.flush()
+        del out
+        
+        tmp_chunks = self.path / (self.CHUNKS_FILE + ".tmp")
+        with open(tmp_chunks, 'w', encoding='utf-8') as f:
+            json.dump(self.chunks + self._pending_chunks, f)
+        
+        os.replace(tmp_vectors, self.path / self.VECTORS_FILE)
+        os.replace(tmp_chunks, self.path / self.CHUNKS_FILE)
+        
+        self._pending_vectors = []
+        self._pending_chunks = []
+        self._load()
+    
+    def search(self, queries: List[str], k: int = 5, min_score: float = 0.0) -> List[List[Dict]]:
+        """Batched top-k cosine search; returns one hit list per query"""
+        
+        if not queries:
+            return []
+        if len(self) == 0:
+            return [[] for _ in queries]
+        
+        query_vectors = self.embedder.embed(queries)
+        scores = query_vectors @ self.vectors.T
+        if self._pending_vectors:
+            scores = np.hstack([scores, query_vectors @ np.vstack(self._pending_vectors).T])
+        
+        all_chunks = self.chunks + self._pending_chunks
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        
+        hits = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates])]
+            hits.append([
+                {**all_chunks[i], 'score': float(scores[row, i])}
+                for i in ordered
+                if scores[row, i] > min_score
+            ])
+        return hits
+    
+    def retrieve_for_sections(self, sections: List[Dict], k: int = 3) -> Dict[str, List[Dict]]:
+        """Top-k chunks for every subsection of every section in one batched search
+        
+        Returns research-result dicts (title, link, snippet, source) keyed by
+        section title, ready to be merged into that section's research context.
+        """
+        
+        queries = []
+        owners = []
+        for section in sections:
+            for subsection in section.get('subsections', []):
+                queries.append(f"{section['title']} {subsection}")
+                owners.append(section['title'])
+        
+        retrieved = {}
+        seen = {}
+        for owner, hits in zip(owners, self.search(queries, k=k)):
+            bucket = retrieved.setdefault(owner, [])
+            ids = seen.setdefault(owner, set())
+            for hit in hits:
+                if hit['id'] in ids:
+                    continue
+                ids.add(hit['id'])
+                bucket.append(self._as_result(hit))
+        return retrieved
+    
+    def search_results(self, query: str, k: int = 5) -> List[Dict]:
+        """Top-k chunks for one query, shaped like ResearchEngine.search results"""
+        return [self._as_result(hit) for hit in self.search([query], k=k)[0]]
+    
+    @staticmethod
+    def _as_result(hit: Dict) -> Dict:
+        return {
+            'title': hit.get('title', ''),
+            'link': hit.get('link', ''),
+            'snippet': hit['text'],
+            'source': hit.get('source', ''),
+        }
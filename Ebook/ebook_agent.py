@@ -357,36 +357,29 @@ def main():
     for placeholder, value in replacements.items():
         template = template.replace(placeholder, value)
     
-    # Read all generated content
-    print("Compiling content...")
-    generated_chapters = ''
-    for md_path in md_files_list:
-        try:
-            with open(md_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                generated_chapters += content + '\n\n'
-        except Exception as e:
-            print(f"Warning: Could not read {md_path} - {e}")
-    
     # Find insertion point after template TOC
     toc_marker = '# Table of Contents\n\n<!-- Pandoc generates TOC automatically when `toc: true` is set. -->\n\n\\newpage'
     insert_pos = template.find(toc_marker)
     if insert_pos != -1:
         insert_pos += len(toc_marker)
         # Insert generated chapters after TOC
-        book_content = template[:insert_pos] + '\n\n' + generated_chapters
+        template = template[:insert_pos]
     else:
         # Fallback if marker not found
         print("Warning: Could not find TOC marker, appending content to end")
-        book_content = template + '\n\n' + generated_chapters
-    
-    print("✓ Content compiled")
     
-    # Write the complete book
-    print("Saving book.md...")
+    # Stream the template and each chapter into book.md, one chapter in memory at a time
+    print("Compiling content and saving book.md...")
     try:
-        with open('book.md', 'w', encoding='utf-8') as f:
-            f.write(book_content)
+        with open('book.md', 'w', encoding='utf-8', buffering=1 << 20) as out:
+            out.write(template + '\n\n')
+            for md_path in md_files_list:
+                try:
+                    with open(md_path, 'r', encoding='utf-8') as f:
+                        content = f.read()
+                    out.write(content + '\n\n')
+                except Exception as e:
+                    print(f"Warning: Could not read {md_path} - {e}")
         print("✓ Saved book.md")
     except Exception as e:
         print(f"ERROR: Could not save book.md - {e}")